@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin
-from .models import User
+from .models import TokenTerminal, User
 
 @admin.register(User)
 class UserAdmin(DjangoUserAdmin):
@@ -11,3 +11,15 @@ class UserAdmin(DjangoUserAdmin):
     fieldsets = DjangoUserAdmin.fieldsets + (
         ("Rol del sistema", {"fields": ("role",)}),
     )
+
+
+@admin.register(TokenTerminal)
+class TokenTerminalAdmin(admin.ModelAdmin):
+    # Las claves se emiten con el comando crear_token_terminal; aquí solo se ven y se desactivan
+    list_display = ("nombre", "usuario", "prefijo", "activo", "creado", "ultimo_uso")
+    list_filter = ("activo",)
+    fields = ("nombre", "usuario", "prefijo", "activo", "creado", "ultimo_uso")
+    readonly_fields = ("usuario", "prefijo", "creado", "ultimo_uso")
+
+    def has_add_permission(self, request):
+        return False
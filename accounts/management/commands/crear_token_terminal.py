@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from accounts.models import TokenTerminal, User
+
+
+class Command(BaseCommand):
+    help = "Emite la clave de una terminal de venta para la API de lotes (se muestra una sola vez)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('usuario', help="Usuario a nombre del que registra la terminal")
+        parser.add_argument('nombre', help="Nombre de la terminal (p.ej. Caja 2)")
+
+    def handle(self, *args, **options):
+        usuario = User.objects.filter(username=options['usuario']).first()
+        if usuario is None:
+            raise CommandError(f"No existe el usuario {options['usuario']}.")
+        token, clave = TokenTerminal.emitir(usuario, options['nombre'])
+        self.stdout.write(self.style.SUCCESS(f"✓ Token de {token.nombre} para {usuario.username}"))
+        self.stdout.write(f"  Authorization: Token {clave}")
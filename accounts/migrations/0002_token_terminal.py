@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenTerminal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, verbose_name='Terminal')),
+                ('prefijo', models.CharField(editable=False, max_length=8, verbose_name='Inicio de la clave')),
+                ('clave', models.CharField(editable=False, max_length=64, unique=True)),
+                ('activo', models.BooleanField(default=True, verbose_name='Activo')),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('ultimo_uso', models.DateTimeField(blank=True, null=True, verbose_name='Último uso')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tokens_terminal', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Token de terminal',
+                'verbose_name_plural': 'Tokens de terminal',
+            },
+        ),
+    ]
@@ -1,3 +1,6 @@
+import hashlib
+import secrets
+
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
@@ -20,3 +23,36 @@ class User(AbstractUser):
 
     def __str__(self):
         return f"{self.username} ({self.role})"
+
+
+class TokenTerminal(models.Model):
+    """
+    Clave de una terminal de venta para la API (Authorization: Token <clave>).
+    Solo se guarda el sha256 de la clave; la clave se muestra una vez al emitirla.
+    """
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tokens_terminal',
+                                verbose_name="Usuario")
+    nombre = models.CharField(max_length=100, verbose_name="Terminal")
+    prefijo = models.CharField(max_length=8, editable=False, verbose_name="Inicio de la clave")
+    clave = models.CharField(max_length=64, unique=True, editable=False)
+    activo = models.BooleanField(default=True, verbose_name="Activo")
+    creado = models.DateTimeField(auto_now_add=True)
+    ultimo_uso = models.DateTimeField(null=True, blank=True, verbose_name="Último uso")
+
+    @staticmethod
+    def resumen(clave):
+        return hashlib.sha256(clave.encode()).hexdigest()
+
+    @classmethod
+    def emitir(cls, usuario, nombre):
+        """Crea un token y devuelve (token, clave en claro)."""
+        clave = secrets.token_urlsafe(32)
+        token = cls.objects.create(usuario=usuario, nombre=nombre, prefijo=clave[:8], clave=cls.resumen(clave))
+        return token, clave
+
+    def __str__(self):
+        return f"{self.nombre} ({self.prefijo}…)"
+
+    class Meta:
+        verbose_name = "Token de terminal"
+        verbose_name_plural = "Tokens de terminal"
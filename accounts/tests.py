@@ -1,3 +1,7 @@
-from django.test import TestCase
+from django.urls import reverse
+from proyectof.testing import PruebaVistas
 
-# Create your tests here.
+
+class PresupuestoVistasTests(PruebaVistas):
+    def test_usuarios_listado(self):
+        self.assertPresupuesto(3, reverse('accounts:users_list'))
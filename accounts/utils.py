@@ -0,0 +1,30 @@
+from django.middleware.csrf import CsrfViewMiddleware
+from django.utils import timezone
+from .models import TokenTerminal
+
+
+def usuario_de_token(request):
+    """
+    Usuario de la cabecera "Authorization: Token <clave>" si la clave es de
+    un token activo; None si no hay cabecera. Lanza PermissionError si la
+    clave no es válida.
+    """
+    tipo, _, clave = request.headers.get('Authorization', '').partition(' ')
+    if tipo.lower() != 'token':
+        return None
+    token = (
+        TokenTerminal.objects.select_related('usuario')
+        .filter(clave=TokenTerminal.resumen(clave.strip()), activo=True, usuario__is_active=True).first()
+    )
+    if token is None:
+        raise PermissionError("Token inválido o inactivo.")
+    TokenTerminal.objects.filter(pk=token.pk).update(ultimo_uso=timezone.now())
+    return token.usuario
+
+
+def rechazo_csrf(request):
+    """
+    Control CSRF de una vista marcada csrf_exempt que también acepta sesión:
+    devuelve la respuesta 403 de Django si falta o no coincide el token, o None.
+    """
+    return CsrfViewMiddleware(lambda r: None).process_view(request, None, (), {})
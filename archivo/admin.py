@@ -0,0 +1,13 @@
+from django.contrib import admin
+from .models import Archivo
+
+
+@admin.register(Archivo)
+class ArchivoAdmin(admin.ModelAdmin):
+    list_display = ('corte', 'modelo', 'filas', 'desde', 'ruta', 'creado', 'restaurado')
+    list_filter = ('modelo', 'corte')
+    # Lo escriben los comandos archivar_periodo y restaurar_archivo
+    readonly_fields = [f.name for f in Archivo._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,37 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils.dateparse import parse_date
+from archivo.utils import LOTE, TABLAS, PeriodoInvalido, archivar
+
+
+class Command(BaseCommand):
+    help = "Pasa a archivos comprimidos el Kardex, las ventas y las compras hasta el cierre de un mes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('hasta', help="Último día del mes a archivar (AAAA-MM-DD)")
+        parser.add_argument('--lote', type=int, default=LOTE, help=f"Filas por bloque (por defecto {LOTE})")
+        parser.add_argument('--optimizar', action='store_true',
+                            help="En MySQL, OPTIMIZE TABLE al terminar para devolver el espacio liberado")
+
+    def handle(self, *args, **options):
+        corte = parse_date(options['hasta'])
+        if corte is None:
+            raise CommandError(f"Fecha inválida: {options['hasta']}")
+        try:
+            archivos = archivar(corte, lote=options['lote'])
+        except PeriodoInvalido as e:
+            raise CommandError(str(e))
+
+        if not archivos:
+            self.stdout.write(f"Nada que archivar hasta el {corte}.")
+            return
+        for archivo in archivos:
+            self.stdout.write(self.style.SUCCESS(f"✓ {archivo.modelo}: {archivo.filas} filas → {archivo.ruta}"))
+
+        if options['optimizar'] and connection.vendor == 'mysql':
+            tablas = [connection.ops.quote_name(apps.get_model(e)._meta.db_table) for e in TABLAS]
+            with connection.cursor() as cursor:
+                cursor.execute(f"OPTIMIZE TABLE {', '.join(tablas)}")
+                cursor.fetchall()
+            self.stdout.write(self.style.SUCCESS("✓ Tablas optimizadas"))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from archivo.utils import LOTE, PeriodoInvalido, restaurar
+
+
+class Command(BaseCommand):
+    help = "Devuelve a la base el último período archivado"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corte', help="Corte a restaurar (AAAA-MM-DD); debe ser el más reciente")
+        parser.add_argument('--lote', type=int, default=LOTE, help=f"Filas por INSERT (por defecto {LOTE})")
+
+    def handle(self, *args, **options):
+        corte = None
+        if options['corte']:
+            corte = parse_date(options['corte'])
+            if corte is None:
+                raise CommandError(f"Fecha inválida: {options['corte']}")
+        try:
+            resumen = restaurar(corte, lote=options['lote'])
+        except PeriodoInvalido as e:
+            raise CommandError(str(e))
+        for etiqueta, filas in resumen.items():
+            self.stdout.write(self.style.SUCCESS(f"✓ {etiqueta}: {filas} filas restauradas"))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Archivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('corte', models.DateField(verbose_name='Archivado hasta')),
+                ('modelo', models.CharField(max_length=100, verbose_name='Modelo')),
+                ('ruta', models.CharField(max_length=255, verbose_name='Ruta')),
+                ('filas', models.PositiveIntegerField(default=0, verbose_name='Filas')),
+                ('desde', models.DateField(blank=True, null=True, verbose_name='Fecha más antigua')),
+                ('id_min', models.BigIntegerField(blank=True, null=True)),
+                ('id_max', models.BigIntegerField(blank=True, null=True)),
+                ('sha256', models.CharField(max_length=64)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('restaurado', models.DateTimeField(blank=True, null=True, verbose_name='Restaurado')),
+            ],
+            options={
+                'verbose_name': 'Archivo',
+                'verbose_name_plural': 'Archivos',
+                'ordering': ['-corte', 'id'],
+                'indexes': [models.Index(fields=['modelo', 'corte'], name='archivo_modelo_corte_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import models
+
+
+class Archivo(models.Model):
+    """
+    Manifiesto del archivo de períodos cerrados: un archivo por modelo y
+    corte con las filas que salieron de la base (ver archivo/utils.py).
+    """
+    corte = models.DateField(verbose_name="Archivado hasta")
+    modelo = models.CharField(max_length=100, verbose_name="Modelo")  # etiqueta, p.ej. 'ventas.venta'
+    ruta = models.CharField(max_length=255, verbose_name="Ruta")      # relativa a ARCHIVO_DIR
+    filas = models.PositiveIntegerField(default=0, verbose_name="Filas")
+    desde = models.DateField(null=True, blank=True, verbose_name="Fecha más antigua")
+    # Rango de ids: una búsqueda por id solo abre los archivos que lo incluyen
+    id_min = models.BigIntegerField(null=True, blank=True)
+    id_max = models.BigIntegerField(null=True, blank=True)
+    sha256 = models.CharField(max_length=64)
+    creado = models.DateTimeField(auto_now_add=True)
+    restaurado = models.DateTimeField(null=True, blank=True, verbose_name="Restaurado")
+
+    def __str__(self):
+        return f"{self.modelo} hasta {self.corte} ({self.filas} filas)"
+
+    class Meta:
+        verbose_name = "Archivo"
+        verbose_name_plural = "Archivos"
+        ordering = ['-corte', 'id']
+        indexes = [models.Index(fields=['modelo', 'corte'], name='archivo_modelo_corte_idx')]
@@ -0,0 +1,81 @@
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import override_settings
+from django.utils import timezone
+from compras.forms import CompraForm
+from compras.models import Compra, DetalleCompra
+from compras.services import registrar_compra
+from kardex import costos
+from kardex.models import MovimientoInventario
+from kardex.saldos import fin_de_mes_anterior
+from productos.models import Producto
+from proyectof.testing import PruebaVistas
+from . import utils
+from .models import Archivo
+
+
+class ArchivoTests(PruebaVistas):
+    def setUp(self):
+        super().setUp()
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        ajuste = override_settings(ARCHIVO_DIR=carpeta.name)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+
+        hoy = timezone.localdate()
+        self.corte = fin_de_mes_anterior(fin_de_mes_anterior(hoy))
+        productos = self.datos['productos']
+        self.viejas = []
+        for dias in (100, 70):
+            compra = Compra(proveedor_fk=self.datos['proveedores'][0], numero_factura=f"F-VIEJA-{dias}",
+                            encargado=self.datos['usuario'], fecha=hoy - timedelta(days=dias))
+            self.viejas.append(registrar_compra(compra, [
+                DetalleCompra(producto=productos[0], cantidad=Decimal('10'), costo_unitario=Decimal('3.00') + dias // 10),
+                DetalleCompra(producto=productos[1], cantidad=Decimal('4'), costo_unitario=Decimal('2.50')),
+            ]))
+
+    def valuacion(self):
+        # valuacion() solo lee: primero se pone al día el historial de costos
+        costos.actualizar()
+        return {
+            metodo: {p.pk: (p.stock_al, p.valor_al) for p in costos.valuacion(timezone.localdate(), metodo)}
+            for metodo in costos.METODOS
+        }
+
+    def test_archivar_y_restaurar(self):
+        antes = self.valuacion()
+        stocks = dict(Producto.objects.values_list('pk', 'stock'))
+        lineas_70 = sorted(self.viejas[1].detalles.values_list('pk', flat=True))
+
+        archivos = utils.archivar(self.corte)
+        self.assertEqual({a.modelo for a in archivos},
+                         {'compras.compra', 'compras.detallecompra', 'kardex.movimientoinventario'})
+        self.assertFalse(Compra.objects.filter(fecha__lte=self.corte).exists())
+        self.assertEqual(MovimientoInventario.objects.filter(tipo='APERTURA').count(), 2)
+        self.assertEqual(dict(Producto.objects.values_list('pk', 'stock')), stocks)
+
+        # Recostear desde la apertura da el mismo valor que con el historial completo
+        costos.reconstruir()
+        self.assertEqual(self.valuacion(), antes)
+
+        encontradas = list(utils.buscar('compras.compra', numero_factura="F-VIEJA-70"))
+        self.assertEqual([c.pk for c in encontradas], [self.viejas[1].pk])
+        # Las líneas no tienen fecha: se filtran por la de su compra
+        lineas = list(utils.buscar('compras.detallecompra', fecha=self.viejas[1].fecha))
+        self.assertEqual(sorted(d.pk for d in lineas), lineas_70)
+
+        # El período archivado queda cerrado
+        form = CompraForm(data={'fecha': self.corte.isoformat(), 'numero_factura': "F-CERRADA"})
+        self.assertIn('fecha', form.errors)
+        with self.assertRaises(utils.PeriodoInvalido):
+            utils.archivar(self.corte)
+
+        resumen = utils.restaurar()
+        self.assertEqual(resumen['compras.compra'], 2)
+        self.assertEqual(Compra.objects.filter(fecha__lte=self.corte).count(), 2)
+        self.assertFalse(MovimientoInventario.objects.filter(tipo='APERTURA').exists())
+        self.assertFalse(Archivo.objects.filter(restaurado__isnull=True).exists())
+        self.assertEqual(self.valuacion(), antes)
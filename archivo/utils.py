@@ -0,0 +1,287 @@
+"""
+Archivo de períodos cerrados.
+
+Los movimientos del Kardex, las ventas y las compras con fecha hasta el
+corte (el último día de un mes ya cerrado) salen de la base a archivos JSONL
+comprimidos con gzip, uno por modelo, en ARCHIVO_DIR/<corte>/. Cada línea es
+un registro en el formato de serialización de Django, así que se restauran
+con sus mismos ids. El manifiesto (modelo Archivo) guarda por archivo el
+rango de fechas e ids, las filas y el sha256.
+
+En el Kardex, cada producto con movimientos archivados recibe un movimiento
+APERTURA con el stock y el valor al corte, y su historial de costos. Las
+capas FIFO que siguen abiertas quedan sin movimiento, como un saldo inicial.
+Así el saldo y el costo de lo que sigue en la base no cambian. El flujo
+diario, los cortes de saldo y los resúmenes de ventas y compras no se
+archivan: siguen respondiendo por esas fechas.
+
+Un período archivado queda cerrado: no se registran compras ni ventas
+importadas con fecha hasta el corte. Los cortes se restauran del más
+reciente al más antiguo.
+"""
+import gzip
+import hashlib
+from datetime import datetime, time, timedelta
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core import serializers
+from django.db import models, transaction
+from django.db.models import Count, Max, Min, OuterRef, Q, Subquery
+from django.utils import timezone
+from busqueda import utils as busqueda
+from kardex import costos
+from kardex.models import CapaCosto, CostoMovimiento, MovimientoInventario
+from kardex.saldos import fin_de_mes_anterior
+from productos.models import Producto
+from .models import Archivo
+
+# Modelo → campo de fecha, en el orden en que se restauran (cabeceras antes que sus líneas)
+TABLAS = {
+    'ventas.venta': 'fecha',
+    'ventas.detalleventa': 'venta__fecha',
+    'compras.compra': 'fecha',
+    'compras.detallecompra': 'compra__fecha',
+    'kardex.movimientoinventario': 'fecha',
+}
+LOTE = 1000
+
+
+class PeriodoInvalido(Exception):
+    pass
+
+
+def ultimo_corte():
+    """Fecha hasta la que está archivado (y cerrado) el historial, o None."""
+    return Archivo.objects.filter(restaurado__isnull=True).aggregate(corte=Max('corte'))['corte']
+
+
+def _limite(corte):
+    """Primer instante posterior al día de corte."""
+    return timezone.make_aware(datetime.combine(corte + timedelta(days=1), time.min))
+
+
+def _referencia(corte):
+    return f"Apertura archivo {corte:%Y-%m-%d}"
+
+
+def _archivados(etiqueta, corte):
+    """Filas del modelo con fecha hasta el corte."""
+    modelo = apps.get_model(etiqueta)
+    campo = TABLAS[etiqueta]
+    if '__' not in campo and isinstance(modelo._meta.get_field(campo), models.DateTimeField):
+        return modelo.objects.filter(**{f'{campo}__lt': _limite(corte)})
+    return modelo.objects.filter(**{f'{campo}__lte': corte})
+
+
+def _sha256(ruta):
+    resumen = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 20), b''):
+            resumen.update(bloque)
+    return resumen.hexdigest()
+
+
+def _escribir(etiqueta, filas, corte, lote):
+    """Escribe las filas en ARCHIVO_DIR/<corte>/<etiqueta>.jsonl.gz y devuelve su Archivo (sin guardar) o None."""
+    datos = filas.aggregate(filas=Count('pk'), id_min=Min('pk'), id_max=Max('pk'), desde=Min(TABLAS[etiqueta]))
+    if not datos['filas']:
+        return None
+    relativa = Path(corte.isoformat()) / f"{etiqueta}.jsonl.gz"
+    ruta = Path(settings.ARCHIVO_DIR) / relativa
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(ruta, 'wt', encoding='utf-8') as f:
+        serializers.get_serializer('jsonl')().serialize(filas.order_by('pk').iterator(chunk_size=lote), stream=f)
+    desde = datos['desde']
+    if isinstance(desde, datetime):
+        desde = timezone.localdate(desde)
+    return Archivo(
+        corte=corte, modelo=etiqueta, ruta=str(relativa), filas=datos['filas'], desde=desde,
+        id_min=datos['id_min'], id_max=datos['id_max'], sha256=_sha256(ruta),
+    )
+
+
+def _borrar(filas, lote):
+    """Borra por bloques de ids (el borrado en cascada de Django carga cada bloque en memoria)."""
+    modelo = filas.model
+    ids = list(filas.order_by('pk').values_list('pk', flat=True))
+    for i in range(0, len(ids), lote):
+        modelo.objects.filter(pk__in=ids[i:i + lote]).delete()
+
+
+def _cierres_kardex(corte):
+    """Último registro de costo hasta el corte de cada producto con movimientos archivados."""
+    limite = _limite(corte)
+    ultimo = (
+        CostoMovimiento.objects.filter(producto=OuterRef('pk'), fecha__lt=limite)
+        .order_by('-fecha', '-movimiento_id').values('movimiento_id')[:1]
+    )
+    ids = (
+        Producto.objects.filter(pk__in=MovimientoInventario.objects.filter(fecha__lt=limite).values('producto'))
+        .annotate(ultimo=Subquery(ultimo)).values_list('ultimo', flat=True)
+    )
+    return list(CostoMovimiento.objects.filter(pk__in=[i for i in ids if i is not None]).order_by('producto_id'))
+
+
+def _abrir_kardex(corte, cierres):
+    """Un movimiento APERTURA por producto, al final del día de corte, con su registro de costo."""
+    momento = _limite(corte) - timedelta(microseconds=1)
+    referencia = _referencia(corte)
+    MovimientoInventario.objects.bulk_create([
+        MovimientoInventario(producto_id=c.producto_id, tipo='APERTURA', cantidad=c.stock, saldo=c.stock,
+                             referencia=referencia, fecha=momento, importe=c.valor_promedio)
+        for c in cierres
+    ], batch_size=LOTE)
+    # bulk_create no devuelve ids en MySQL: se leen por referencia
+    ids = dict(MovimientoInventario.objects.filter(referencia=referencia).values_list('producto_id', 'id'))
+    CostoMovimiento.objects.bulk_create([
+        CostoMovimiento(
+            movimiento_id=ids[c.producto_id], producto_id=c.producto_id, fecha=momento, stock=c.stock,
+            costo_promedio=c.costo_promedio, valor_promedio=c.valor_promedio, importe_promedio=0,
+            valor_fifo=c.valor_fifo, importe_fifo=0,
+        )
+        for c in cierres
+    ], batch_size=LOTE)
+
+
+def archivar(corte, lote=LOTE):
+    """
+    Archiva todo lo que tiene fecha hasta `corte`, que debe ser el último día
+    de un mes ya cerrado y posterior al último corte. Devuelve los Archivo
+    creados (vacío si no había nada que archivar).
+    """
+    if (corte + timedelta(days=1)).day != 1:
+        raise PeriodoInvalido(f"El corte debe ser el último día de un mes ({corte}).")
+    if corte > fin_de_mes_anterior(timezone.localdate()):
+        raise PeriodoInvalido(f"El mes de {corte:%m/%Y} todavía no está cerrado.")
+    anterior = ultimo_corte()
+    if anterior and corte <= anterior:
+        raise PeriodoInvalido(f"Ya está archivado hasta el {anterior}.")
+
+    # Historial de costos al día: la apertura toma el stock y el valor al corte de ahí
+    costos.actualizar()
+
+    escritos = []
+    try:
+        with transaction.atomic():
+            cierres = _cierres_kardex(corte)
+            for etiqueta in TABLAS:
+                archivo = _escribir(etiqueta, _archivados(etiqueta, corte), corte, lote)
+                if archivo is not None:
+                    escritos.append(archivo)
+
+            #  Capas FIFO de movimientos archivados que lo que queda todavía usa:
+            #  pasan a ser capas sin movimiento (saldo inicial)
+            limite = _limite(corte)
+            CapaCosto.objects.filter(movimiento__fecha__lt=limite).filter(
+                Q(restante__gt=0) | Q(consumos__fecha__gte=limite)
+            ).update(movimiento=None)
+
+            for etiqueta in reversed(TABLAS):
+                _borrar(_archivados(etiqueta, corte), lote)
+            _abrir_kardex(corte, cierres)
+            Archivo.objects.bulk_create(escritos)
+    except BaseException:
+        for archivo in escritos:
+            (Path(settings.ARCHIVO_DIR) / archivo.ruta).unlink(missing_ok=True)
+        raise
+    return escritos
+
+
+# ======================
+# LECTURA Y RESTAURACIÓN
+# ======================
+def leer(archivo):
+    """Registros de un archivo (sin guardar), en orden de id."""
+    with gzip.open(Path(settings.ARCHIVO_DIR) / archivo.ruta, 'rt', encoding='utf-8') as f:
+        for deserializado in serializers.deserialize('jsonl', f):
+            yield deserializado.object
+
+
+def buscar(etiqueta, pk=None, fecha=None, **campos):
+    """
+    Registros archivados de un modelo que coinciden con los campos dados,
+    p.ej. buscar('ventas.venta', numero_documento='1000123'). Con pk o fecha
+    solo se abren los archivos cuyo rango los incluye. Las líneas (detalles)
+    no tienen fecha: se filtran por la de su documento, que también está
+    archivado.
+    """
+    archivos = Archivo.objects.filter(modelo=etiqueta, restaurado__isnull=True)
+    if pk is not None:
+        archivos = archivos.filter(id_min__lte=pk, id_max__gte=pk)
+    padre, padres = None, None
+    if fecha is not None:
+        archivos = archivos.filter(desde__lte=fecha, corte__gte=fecha)
+        if '__' in TABLAS[etiqueta]:
+            padre = TABLAS[etiqueta].split('__')[0]
+            modelo_padre = apps.get_model(etiqueta)._meta.get_field(padre).related_model
+            padres = {p.pk for p in buscar(modelo_padre._meta.label_lower, fecha=fecha)}
+    for archivo in archivos.order_by('corte'):
+        for obj in leer(archivo):
+            if pk is not None and obj.pk != pk:
+                continue
+            if padres is not None:
+                if getattr(obj, f'{padre}_id') not in padres:
+                    continue
+            elif fecha is not None:
+                valor = obj.fecha
+                if isinstance(valor, datetime):
+                    valor = timezone.localdate(valor)
+                if valor != fecha:
+                    continue
+            if all(getattr(obj, campo) == valor for campo, valor in campos.items()):
+                yield obj
+
+
+def restaurar(corte=None, lote=LOTE):
+    """
+    Devuelve a la base el último corte archivado (solo se puede restaurar el
+    más reciente) y recalcula el historial de costos de sus productos.
+    Devuelve {etiqueta: filas restauradas}.
+    """
+    ultimo = ultimo_corte()
+    if ultimo is None:
+        raise PeriodoInvalido("No hay períodos archivados.")
+    if corte is not None and corte != ultimo:
+        raise PeriodoInvalido(f"Primero hay que restaurar el corte más reciente ({ultimo}).")
+    archivos = sorted(
+        Archivo.objects.filter(corte=ultimo, restaurado__isnull=True),
+        key=lambda a: list(TABLAS).index(a.modelo),
+    )
+    for archivo in archivos:
+        if _sha256(Path(settings.ARCHIVO_DIR) / archivo.ruta) != archivo.sha256:
+            raise PeriodoInvalido(f"El archivo {archivo.ruta} no coincide con su sha256.")
+
+    resumen = {}
+    with transaction.atomic():
+        MovimientoInventario.objects.filter(tipo='APERTURA', referencia=_referencia(ultimo)).delete()
+        productos = set()
+        for archivo in archivos:
+            modelo = apps.get_model(archivo.modelo)
+            pendientes, total = [], 0
+            for obj in leer(archivo):
+                pendientes.append(obj)
+                if len(pendientes) >= lote:
+                    modelo.objects.bulk_create(pendientes)
+                    total += len(pendientes)
+                    pendientes = []
+            modelo.objects.bulk_create(pendientes)
+            total += len(pendientes)
+            resumen[archivo.modelo] = total
+
+            if archivo.modelo == 'kardex.movimientoinventario':
+                productos.update(
+                    MovimientoInventario.objects.filter(pk__gte=archivo.id_min, pk__lte=archivo.id_max)
+                    .values_list('producto_id', flat=True).distinct()
+                )
+            elif archivo.modelo in busqueda.INDICES:
+                # bulk_create no dispara las señales que mantienen el índice de búsqueda
+                campos = busqueda.INDICES[archivo.modelo].campos
+                filas = modelo.objects.filter(pk__gte=archivo.id_min, pk__lte=archivo.id_max).values_list('pk', *campos)
+                busqueda.indexar_en_bloque(archivo.modelo, [(f[0], dict(zip(campos, f[1:]))) for f in filas])
+
+        # Las capas y costos de esos productos se rehacen desde su primer movimiento
+        costos.reconstruir(sorted(productos))
+        Archivo.objects.filter(pk__in=[a.pk for a in archivos]).update(restaurado=timezone.now())
+    return resumen
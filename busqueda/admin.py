@@ -0,0 +1,8 @@
+from django.contrib import admin
+from .models import Trigrama
+
+
+@admin.register(Trigrama)
+class TrigramaAdmin(admin.ModelAdmin):
+    list_display = ('modelo', 'objeto_id', 'campo', 'trigrama')
+    list_filter = ('modelo', 'campo')
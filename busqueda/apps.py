@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class BusquedaConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'busqueda'
+
+    def ready(self):
+        # Mantiene el índice al día cuando se guardan o borran registros buscables
+        from . import signals  # noqa: F401
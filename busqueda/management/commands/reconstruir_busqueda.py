@@ -0,0 +1,28 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from busqueda.utils import INDICES, reconstruir
+
+
+class Command(BaseCommand):
+    help = "Vuelve a generar el índice de búsqueda (trigramas) de productos, clientes, proveedores, ventas y compras"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'modelos', nargs='*',
+            help=f"Modelos a reindexar ({', '.join(INDICES)}); por defecto todos",
+        )
+
+    def handle(self, *args, **options):
+        etiquetas = [m.lower() for m in options['modelos']] or list(INDICES)
+        desconocidos = [e for e in etiquetas if e not in INDICES]
+        if desconocidos:
+            raise CommandError(f"Modelos no indexados: {', '.join(desconocidos)}")
+
+        for etiqueta in etiquetas:
+            inicio = time.perf_counter()
+            with transaction.atomic():
+                resumen = reconstruir([etiqueta])
+            self.stdout.write(self.style.SUCCESS(
+                f"✓ {etiqueta}: {resumen[etiqueta]} registros en {time.perf_counter() - inicio:.1f} s"
+            ))
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Trigrama',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(max_length=50, verbose_name='Modelo')),
+                ('campo', models.CharField(max_length=50, verbose_name='Campo')),
+                ('objeto_id', models.BigIntegerField(verbose_name='ID del registro')),
+                ('trigrama', models.CharField(max_length=3, verbose_name='Trigrama')),
+            ],
+            options={
+                'verbose_name': 'Trigrama',
+                'verbose_name_plural': 'Trigramas',
+                'indexes': [models.Index(fields=['modelo', 'objeto_id'], name='trigrama_objeto_idx')],
+                'constraints': [models.UniqueConstraint(fields=('modelo', 'trigrama', 'campo', 'objeto_id'), name='trigrama_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def poblar(apps, schema_editor):
+    from busqueda.utils import reconstruir
+    reconstruir(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('busqueda', '0001_initial'),
+        ('clientes', '0003_cliente_cliente_nombre_id_idx'),
+        ('compras', '0004_compra_compra_fecha_id_idx'),
+        ('productos', '0002_producto_producto_nombre_id_idx'),
+        ('proveedores', '0002_proveedor_proveedor_nombre_id_idx'),
+        ('ventas', '0003_venta_venta_fecha_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(poblar, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+from django.db import models
+
+
+class Trigrama(models.Model):
+    """
+    Un trigrama (3 letras) del texto normalizado de un campo de un registro
+    buscable. Buscar "tomate" es buscar los registros que tienen todos (o casi
+    todos) sus trigramas, con un índice en vez de recorrer la tabla completa.
+    """
+    modelo = models.CharField(max_length=50, verbose_name="Modelo")        # p.ej. 'productos.producto'
+    campo = models.CharField(max_length=50, verbose_name="Campo")
+    objeto_id = models.BigIntegerField(verbose_name="ID del registro")
+    trigrama = models.CharField(max_length=3, verbose_name="Trigrama")
+
+    def __str__(self):
+        return f"{self.modelo}#{self.objeto_id}.{self.campo}: '{self.trigrama}'"
+
+    class Meta:
+        verbose_name = "Trigrama"
+        verbose_name_plural = "Trigramas"
+        constraints = [
+            models.UniqueConstraint(fields=['modelo', 'trigrama', 'campo', 'objeto_id'], name='trigrama_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['modelo', 'objeto_id'], name='trigrama_objeto_idx'),
+        ]
@@ -0,0 +1,19 @@
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save
+from .utils import INDICES, desindexar, indexar
+
+
+def _al_guardar(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:  # loaddata: el índice se reconstruye aparte
+        return
+    indexar(instance, update_fields=update_fields)
+
+
+def _al_borrar(sender, instance, **kwargs):
+    desindexar(instance)
+
+
+for etiqueta in INDICES:
+    modelo = apps.get_model(etiqueta)
+    post_save.connect(_al_guardar, sender=modelo, dispatch_uid=f'busqueda_guardar_{etiqueta}')
+    post_delete.connect(_al_borrar, sender=modelo, dispatch_uid=f'busqueda_borrar_{etiqueta}')
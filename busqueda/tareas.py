@@ -0,0 +1,10 @@
+from django.db import transaction
+from tareas.utils import tarea
+from .utils import reconstruir
+
+
+@tarea('busqueda.reconstruir', "Reconstruir índice de búsqueda", manual=True)
+def reconstruir_indice(tarea):
+    with transaction.atomic():
+        resumen = reconstruir()
+    return f"{sum(resumen.values())} registros indexados"
@@ -0,0 +1,31 @@
+from django.urls import reverse
+from busqueda import utils
+from busqueda.utils import INDICES
+from clientes.models import Cliente
+from proyectof.testing import PruebaVistas, registrar_consultas
+from ventas.models import Venta
+
+
+class PresupuestoVistasTests(PruebaVistas):
+    def test_busqueda_global(self):
+        # Una consulta al índice por modelo indexado, más sesión, usuario y carga de resultados
+        self.assertPresupuesto(3 + len(INDICES), reverse('busqueda:busqueda_global'), {'q': 'producto'})
+
+
+class FiltrarTests(PruebaVistas):
+    def test_subconsulta_sobre_el_indice(self):
+        cliente = Cliente.objects.create(nombre="Ferretería Quetzal", nit="99887")
+        Venta.objects.filter(pk=self.datos['ventas'][0].pk).update(cliente=cliente)
+        with registrar_consultas() as registro:
+            ventas = list(utils.filtrar(Venta.objects.all(), "quetzal", ['numero_documento'],
+                                        relaciones={'cliente': ['nombre']}))
+        # Los ids que coinciden no pasan por Python: una sola consulta
+        self.assertEqual(len(registro), 1)
+        self.assertEqual([v.pk for v in ventas], [self.datos['ventas'][0].pk])
+
+    def test_numero_por_prefijo(self):
+        venta = self.datos['ventas'][0]
+        with registrar_consultas() as registro:
+            ventas = list(utils.filtrar(Venta.objects.all(), venta.numero_documento, ['numero_documento']))
+        self.assertEqual([v.pk for v in ventas], [venta.pk])
+        self.assertNotIn('busqueda_trigrama', registro.consultas[0].sql)
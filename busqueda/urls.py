@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+app_name = 'busqueda'
+
+urlpatterns = [
+    path('', views.busqueda_global, name='busqueda_global'),
+]
@@ -0,0 +1,279 @@
+import math
+import unicodedata
+from collections import namedtuple
+
+from django.apps import apps as apps_globales
+from django.conf import settings
+from django.db.models import Count, Q
+from .models import Trigrama
+
+
+# Qué se indexa de cada modelo y a dónde lleva un resultado de la búsqueda global.
+# numerados: campos con números correlativos, que una consulta de solo dígitos
+# busca por prefijo con su índice único en lugar de por trigramas
+Indice = namedtuple('Indice', ['campos', 'url', 'numerados'], defaults=((),))
+
+INDICES = {
+    'productos.producto': Indice(['codigo', 'nombre'], 'productos:productos_edit'),
+    'clientes.cliente': Indice(['codigo', 'nombre', 'nit', 'telefono'], 'clientes:cliente_edit'),
+    'proveedores.proveedor': Indice(['codigo', 'nombre', 'nit', 'correo'], 'proveedores:proveedor_edit'),
+    'ventas.venta': Indice(['numero_documento'], 'ventas:ventas_edit', ['numero_documento']),
+    'compras.compra': Indice(['numero_factura'], 'compras:compras_detail', ['numero_factura']),
+}
+
+# Fracción mínima de trigramas de la consulta que debe tener un texto para
+# contar como coincidencia aproximada (tolerancia a errores de tipeo)
+UMBRAL = getattr(settings, 'BUSQUEDA_UMBRAL', 0.5)
+LARGO_MINIMO = 3
+# Una consulta más corta tiene tan pocos trigramas que con UMBRAL casi todo
+# el índice se le parece: solo coincide si los tiene todos
+LARGO_APROXIMADO = getattr(settings, 'BUSQUEDA_LARGO_APROXIMADO', 4)
+
+
+def normalizar(texto):
+    """Minúsculas, sin tildes y con un solo espacio entre palabras ("Piña  Colada" → "pina colada")."""
+    texto = unicodedata.normalize('NFKD', str(texto or ''))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.lower().split())
+
+
+def _ventanas(texto):
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def _trigramas_palabras(texto):
+    """Trigramas de cada palabra con relleno ("  to", " to", ..., "te "), como pg_trgm."""
+    trigramas = set()
+    for palabra in texto.split():
+        trigramas |= _ventanas(f"  {palabra} ")
+    return trigramas
+
+
+def trigramas(texto):
+    """
+    Trigramas que se guardan de un campo: todas las ventanas de 3 letras del
+    texto (para coincidencias exactas de subcadena, aunque crucen palabras)
+    más los trigramas con relleno de cada palabra (para las aproximadas).
+    """
+    texto = normalizar(texto)
+    return _ventanas(texto) | _trigramas_palabras(texto)
+
+
+def _consulta(query):
+    """
+    Devuelve (exactos, aproximados, minimo): los trigramas que debe tener una
+    subcadena exacta, los de la comparación aproximada y cuántos de estos
+    bastan para que un texto se le parezca.
+    """
+    texto = normalizar(query)
+    aproximados = _trigramas_palabras(texto)
+    umbral = UMBRAL if len(texto) >= LARGO_APROXIMADO else 1
+    return _ventanas(texto), aproximados, max(1, math.ceil(umbral * len(aproximados)))
+
+
+def es_buscable(query):
+    return len(normalizar(query)) >= LARGO_MINIMO
+
+
+# ======================
+# MANTENIMIENTO DEL ÍNDICE
+# ======================
+def indexar(obj, update_fields=None):
+    """
+    Actualiza los trigramas de un registro comparando con los que ya tiene:
+    solo borra los que sobran e inserta los que faltan. Si se guardó con
+    update_fields y ninguno es un campo indexado, no consulta nada.
+    """
+    etiqueta = obj._meta.label_lower
+    campos = INDICES[etiqueta].campos
+    if update_fields is not None and not set(update_fields) & set(campos):
+        return
+
+    nuevos = {(campo, t) for campo in campos for t in trigramas(getattr(obj, campo))}
+    actuales = set(
+        Trigrama.objects.filter(modelo=etiqueta, objeto_id=obj.pk).values_list('campo', 'trigrama')
+    )
+
+    sobran = {}
+    for campo, t in actuales - nuevos:
+        sobran.setdefault(campo, []).append(t)
+    for campo, lista in sobran.items():
+        Trigrama.objects.filter(modelo=etiqueta, objeto_id=obj.pk, campo=campo, trigrama__in=lista).delete()
+
+    faltan = nuevos - actuales
+    if faltan:
+        Trigrama.objects.bulk_create(
+            [Trigrama(modelo=etiqueta, campo=campo, objeto_id=obj.pk, trigrama=t) for campo, t in faltan],
+            ignore_conflicts=True,
+        )
+
+
+def desindexar(obj):
+    Trigrama.objects.filter(modelo=obj._meta.label_lower, objeto_id=obj.pk).delete()
+
+
+def indexar_en_bloque(etiqueta, filas, apps=None):
+    """
+    Indexa registros recién creados en bloque (p.ej. con bulk_create, que no
+    dispara señales). filas: [(pk, {campo: valor})]. Una inserción por lote.
+    """
+    Trigrama = (apps or apps_globales).get_model('busqueda', 'Trigrama')
+    Trigrama.objects.bulk_create(
+        [
+            Trigrama(modelo=etiqueta, campo=campo, objeto_id=pk, trigrama=t)
+            for pk, valores in filas
+            for campo, valor in valores.items()
+            for t in trigramas(valor)
+        ],
+        batch_size=5000,
+        ignore_conflicts=True,
+    )
+
+
+def reconstruir(etiquetas=None, apps=None, lote=2000):
+    """
+    Vuelve a generar el índice completo de los modelos indicados (todos por
+    defecto). Recorre cada tabla por bloques e inserta en lotes. Devuelve
+    {etiqueta: registros indexados}. Desde una migración se pasa `apps`.
+    """
+    apps = apps or apps_globales
+    Trigrama = apps.get_model('busqueda', 'Trigrama')
+    resumen = {}
+    for etiqueta in etiquetas or INDICES:
+        campos = INDICES[etiqueta].campos
+        modelo = apps.get_model(etiqueta)
+        Trigrama.objects.filter(modelo=etiqueta).delete()
+
+        pendientes, total = [], 0
+        for fila in modelo.objects.order_by('pk').values_list('pk', *campos).iterator(chunk_size=lote):
+            pendientes.append((fila[0], dict(zip(campos, fila[1:]))))
+            total += 1
+            if len(pendientes) >= lote:
+                indexar_en_bloque(etiqueta, pendientes, apps=apps)
+                pendientes = []
+        if pendientes:
+            indexar_en_bloque(etiqueta, pendientes, apps=apps)
+        resumen[etiqueta] = total
+    return resumen
+
+
+# ======================
+# BÚSQUEDA
+# ======================
+def _agrupadas(etiqueta, exactos, aproximados, minimo, campos=None):
+    """
+    Consulta agrupada sobre el índice: cuenta, por registro y campo, cuántos
+    trigramas de la consulta tiene, y deja los que tienen todos los de la
+    subcadena (exacta) o al menos `minimo` de los trigramas por palabra
+    (aproximada).
+    """
+    filas = Trigrama.objects.filter(modelo=etiqueta, trigrama__in=exactos | aproximados)
+    if campos:
+        filas = filas.filter(campo__in=campos)
+    return (
+        filas.values('objeto_id', 'campo')
+        .annotate(
+            n_exactos=Count('id', filter=Q(trigrama__in=exactos)),
+            n_aproximados=Count('id', filter=Q(trigrama__in=aproximados)),
+        )
+        .filter(Q(n_exactos__gte=len(exactos)) | Q(n_aproximados__gte=minimo))
+        .order_by()
+    )
+
+
+def coincidencias(etiqueta, query, campos=None):
+    """
+    Registros de un modelo cuyo texto contiene la consulta o se le parece
+    (ver _agrupadas), en una sola consulta. Devuelve {objeto_id: (exacto,
+    puntaje)} con el mejor campo de cada registro.
+    """
+    exactos, aproximados, minimo = _consulta(query)
+    if not exactos:
+        return {}
+
+    filas = _agrupadas(etiqueta, exactos, aproximados, minimo, campos)
+    resultado = {}
+    for fila in filas:
+        exacto = fila['n_exactos'] >= len(exactos)
+        puntaje = fila['n_aproximados'] / len(aproximados)
+        mejor = resultado.get(fila['objeto_id'])
+        if mejor is None or (exacto, puntaje) > mejor:
+            resultado[fila['objeto_id']] = (exacto, puntaje)
+    return resultado
+
+
+def filtrar(queryset, query, campos, relaciones=None):
+    """
+    Filtra un queryset por texto usando el índice, en lugar de varios icontains.
+
+    - campos: campos propios del modelo que se comparan
+    - relaciones: {campo_fk: [campos del modelo relacionado]}, p.ej.
+      {'cliente': ['nombre']} para encontrar ventas por nombre de cliente
+
+    Con menos de 3 letras no hay trigramas, así que se usa icontains como antes.
+    Los registros que coinciden se filtran con una subconsulta sobre el
+    índice, sin traer sus ids a Python. Una consulta de solo dígitos busca
+    los campos numerados (ver INDICES) por prefijo, no por trigramas.
+    """
+    query = (query or '').strip()
+    relaciones = relaciones or {}
+    if not query:
+        return queryset
+
+    if not es_buscable(query):
+        condicion = Q()
+        for campo in campos:
+            condicion |= Q(**{f'{campo}__icontains': query})
+        for fk, campos_rel in relaciones.items():
+            for campo in campos_rel:
+                condicion |= Q(**{f'{fk}__{campo}__icontains': query})
+        return queryset.filter(condicion)
+
+    exactos, aproximados, minimo = _consulta(query)
+    modelo = queryset.model
+    etiqueta = modelo._meta.label_lower
+    condicion = Q()
+    if query.isdigit():
+        numerados = [c for c in campos if c in INDICES[etiqueta].numerados]
+        campos = [c for c in campos if c not in numerados]
+        for campo in numerados:
+            condicion |= Q(**{f'{campo}__startswith': query})
+    if campos:
+        condicion |= Q(pk__in=_agrupadas(etiqueta, exactos, aproximados, minimo, campos).values('objeto_id'))
+    for fk, campos_rel in relaciones.items():
+        relacionado = modelo._meta.get_field(fk).related_model
+        ids = _agrupadas(relacionado._meta.label_lower, exactos, aproximados, minimo, campos_rel).values('objeto_id')
+        condicion |= Q(**{f'{fk}_id__in': ids})
+    return queryset.filter(condicion)
+
+
+def buscar(query, limite=None):
+    """
+    Búsqueda global en todos los modelos indexados, ordenada por relevancia:
+    primero las coincidencias exactas y luego las aproximadas, de mayor a menor
+    parecido. Devuelve [(objeto, exacto, puntaje)].
+    """
+    limite = limite or getattr(settings, 'BUSQUEDA_LIMITE', 20)
+    if not es_buscable(query):
+        return []
+
+    candidatos = []
+    for etiqueta in INDICES:
+        for objeto_id, (exacto, puntaje) in coincidencias(etiqueta, query).items():
+            candidatos.append((exacto, puntaje, etiqueta, objeto_id))
+    candidatos.sort(key=lambda c: (not c[0], -c[1], c[2], -c[3]))
+    candidatos = candidatos[:limite]
+
+    por_modelo = {}
+    for _, _, etiqueta, objeto_id in candidatos:
+        por_modelo.setdefault(etiqueta, []).append(objeto_id)
+    objetos = {
+        etiqueta: apps_globales.get_model(etiqueta).objects.in_bulk(ids)
+        for etiqueta, ids in por_modelo.items()
+    }
+
+    return [
+        (objetos[etiqueta][objeto_id], exacto, puntaje)
+        for exacto, puntaje, etiqueta, objeto_id in candidatos
+        if objeto_id in objetos[etiqueta]
+    ]
@@ -0,0 +1,26 @@
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import render
+from django.urls import reverse
+from .utils import INDICES, buscar
+
+
+@login_required
+def busqueda_global(request):
+    """Busca en productos, clientes, proveedores, ventas y compras a la vez, ordenado por relevancia."""
+    query = request.GET.get('q', '').strip()
+    resultados = [
+        {
+            'tipo': obj._meta.verbose_name,
+            'id': obj.pk,
+            'texto': str(obj),
+            'url': reverse(INDICES[obj._meta.label_lower].url, args=[obj.pk]),
+            'exacto': exacto,
+            'puntaje': round(puntaje, 3),
+        }
+        for obj, exacto, puntaje in buscar(query)
+    ]
+
+    if request.GET.get('formato') == 'json':
+        return JsonResponse({'q': query, 'resultados': resultados})
+    return render(request, 'busqueda/resultados.html', {'query': query, 'resultados': resultados})
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0002_alter_cliente_codigo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['nombre', 'id'], name='cliente_nombre_id_idx'),
+        ),
+    ]
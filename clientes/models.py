@@ -1,4 +1,5 @@
 from django.db import models
+from secuencias.utils import siguiente_numero, ultimo_correlativo
 
 class Cliente(models.Model):
     TIPO_CHOICES = [
@@ -19,14 +20,11 @@ class Cliente(models.Model):
     def save(self, *args, **kwargs):
         """Genera código automático tipo C-00001 si no existe."""
         if not self.codigo:  # solo al crear
-            ultimo = Cliente.objects.order_by('-id').first()
-            if ultimo and ultimo.codigo.startswith('C-'):
-                # extrae el número y le suma 1
-                numero = int(ultimo.codigo.split('-')[1])
-                nuevo_codigo = f"C-{numero + 1:05d}"
-            else:
-                nuevo_codigo = "C-00001"
-            self.codigo = nuevo_codigo
+            numero = siguiente_numero(
+                'clientes.codigo',
+                inicial=lambda: ultimo_correlativo(Cliente.objects, 'codigo', 'C-'),
+            )
+            self.codigo = f"C-{numero:05d}"
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -36,4 +34,6 @@ class Cliente(models.Model):
         verbose_name = "Cliente"
         verbose_name_plural = "Clientes"
         ordering = ['nombre']
+        # Paginación por cursor (nombre, id) en el listado
+        indexes = [models.Index(fields=['nombre', 'id'], name='cliente_nombre_id_idx')]
 
@@ -1,3 +1,10 @@
-from django.test import TestCase
+from django.urls import reverse
+from proyectof.testing import PruebaVistas
 
-# Create your tests here.
+
+class PresupuestoVistasTests(PruebaVistas):
+    def test_listado(self):
+        self.assertPresupuesto(3, reverse('clientes:cliente_list'))
+
+    def test_editar(self):
+        self.assertPresupuesto(3, reverse('clientes:cliente_edit', args=[self.datos['clientes'][0].pk]))
@@ -2,6 +2,8 @@ from django.shortcuts import render, redirect, get_object_or_404
 from .models import Cliente
 from .forms import ClienteForm
 from django.db.models import Q
+from proyectof.paginacion import paginar, pide_json
+from busqueda import utils as busqueda
 
 
 
@@ -10,15 +12,23 @@ def cliente_list(request):
     clientes = Cliente.objects.all()
 
     if query:
-        clientes = clientes.filter(
-            Q(nombre__icontains=query) |
-            Q(nit__icontains=query) |
-            Q(telefono__icontains=query) |
-            Q(codigo__icontains=query)
-        )
+        clientes = busqueda.filtrar(clientes, query, ['nombre', 'nit', 'telefono', 'codigo'])
+
+    pagina = paginar(clientes, ('nombre', 'id'), request.GET)
+
+    if pide_json(request):
+        return pagina.como_json(lambda c: {
+            'id': c.id,
+            'codigo': c.codigo,
+            'nombre': c.nombre,
+            'nit': c.nit,
+            'tipo': c.tipo,
+            'telefono': c.telefono,
+        })
 
     return render(request, 'clientes/cliente_list.html', {
-        'clientes': clientes,
+        'clientes': pagina,
+        'pagina': pagina,
         'query': query
     })
 
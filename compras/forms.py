@@ -1,25 +1,49 @@
 from django import forms
+from django.core.exceptions import ValidationError
+from archivo.utils import ultimo_corte
+from ventas.forms import OpcionesCompartidasFormSet, ProductoChoiceField
 from .models import Compra, DetalleCompra
 
 class CompraForm(forms.ModelForm):
     class Meta:
         model = Compra
-        fields = ['proveedor_fk', 'numero_factura', 'encargado', 'observaciones']
+        fields = ['fecha', 'proveedor_fk', 'numero_factura', 'encargado', 'observaciones']
         widgets = {
+            'fecha': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}, format='%Y-%m-%d'),
             'proveedor_fk': forms.Select(attrs={'class': 'form-select'}),
             'numero_factura': forms.TextInput(attrs={'class': 'form-control'}),
             'encargado': forms.Select(attrs={'class': 'form-select'}),
             'observaciones': forms.Textarea(attrs={'class': 'form-control', 'rows': 2}),
         }
         labels = {
+            'fecha': 'Fecha de compra',
             'proveedor_fk': 'Proveedor',
             'numero_factura': 'Número de Factura',
             'encargado': 'Encargado de compra',
             'observaciones': 'Observaciones',
         }
 
+    def clean_fecha(self):
+        fecha = self.cleaned_data.get('fecha')
+        corte = ultimo_corte()
+        if fecha and corte and fecha <= corte:
+            raise ValidationError(f"El período hasta el {corte:%d/%m/%Y} está cerrado y archivado.")
+        return fecha
+
 
 class DetalleCompraForm(forms.ModelForm):
+    def __init__(self, *args, productos=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if productos is not None:
+            self.fields['producto'].precargados = productos
+
+    def _get_validation_exclusions(self):
+        excluidos = super()._get_validation_exclusions()
+        if self.fields['producto'].precargados is not None:
+            # El producto ya salió de los precargados: no hace falta otra consulta por línea
+            excluidos.add('producto')
+        return excluidos
+
     class Meta:
         model = DetalleCompra
         fields = ['producto', 'cantidad', 'costo_unitario']
@@ -33,3 +57,25 @@ class DetalleCompraForm(forms.ModelForm):
             'cantidad': 'Cantidad',
             'costo_unitario': 'Costo unitario',
         }
+        field_classes = {'producto': ProductoChoiceField}
+
+
+class DetalleCompraFormSet(OpcionesCompartidasFormSet):
+    """Valida el id de cada línea existente contra las ya cargadas, sin una consulta por línea."""
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        campo = form.fields[self.model._meta.pk.name]
+
+        def to_python(value):
+            if value in campo.empty_values:
+                return None
+            try:
+                objeto = self._existing_object(int(value))
+            except (TypeError, ValueError):
+                objeto = None
+            if objeto is None:
+                raise ValidationError(campo.error_messages['invalid_choice'], code='invalid_choice')
+            return objeto
+
+        campo.to_python = to_python
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from compras.resumenes import reconstruir
+
+
+class Command(BaseCommand):
+    help = "Recalcula los resúmenes mensuales por proveedor y el libro de costos desde las compras registradas"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vincular', action='store_true',
+                            help="Antes enlaza al catálogo las compras con el proveedor escrito a mano (por nombre o NIT)")
+
+    def handle(self, *args, **options):
+        resumen = reconstruir(vincular=options['vincular'])
+        if 'vinculadas' in resumen:
+            self.stdout.write(self.style.SUCCESS(f"✓ Compras enlazadas a un proveedor: {resumen['vinculadas']}"))
+        self.stdout.write(self.style.SUCCESS(f"✓ Resumen mensual por proveedor: {resumen['meses']} filas"))
+        self.stdout.write(self.style.SUCCESS(f"✓ Libro de costos: {resumen['costos']} filas"))
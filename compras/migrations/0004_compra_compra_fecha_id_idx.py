@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compras', '0003_compra_proveedor_fk'),
+        ('proveedores', '0002_proveedor_proveedor_nombre_id_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='compra',
+            index=models.Index(fields=['fecha', 'id'], name='compra_fecha_id_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:13
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compras', '0004_compra_compra_fecha_id_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='compra',
+            name='fecha',
+            field=models.DateField(default=django.utils.timezone.localdate, verbose_name='Fecha de compra'),
+        ),
+    ]
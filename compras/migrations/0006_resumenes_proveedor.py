@@ -0,0 +1,52 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:17
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compras', '0005_fecha_editable'),
+        ('productos', '0004_precio_lista'),
+        ('proveedores', '0002_proveedor_proveedor_nombre_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CostoProveedor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ultimo_costo', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Último costo')),
+                ('ultima_fecha', models.DateField(verbose_name='Fecha último costo')),
+                ('mejor_costo', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Mejor costo')),
+                ('mejor_fecha', models.DateField(verbose_name='Fecha mejor costo')),
+                ('mejor_compra', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='compras.compra')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='costos_proveedor', to='productos.producto')),
+                ('proveedor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='costos', to='proveedores.proveedor')),
+                ('ultima_compra', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='compras.compra')),
+            ],
+            options={
+                'verbose_name': 'Costo por proveedor',
+                'verbose_name_plural': 'Costos por proveedor',
+                'indexes': [models.Index(fields=['proveedor', 'ultima_fecha', 'id'], name='costo_prov_fecha_idx')],
+                'constraints': [models.UniqueConstraint(fields=('proveedor', 'producto'), name='costo_proveedor_unico')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenCompraProveedor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Mes')),
+                ('compras', models.IntegerField(default=0, verbose_name='Compras')),
+                ('importe', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('proveedor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='proveedores.proveedor')),
+            ],
+            options={
+                'verbose_name': 'Resumen mensual por proveedor',
+                'verbose_name_plural': 'Resúmenes mensuales por proveedor',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'proveedor'), name='resumen_compra_proveedor_unico')],
+            },
+        ),
+    ]
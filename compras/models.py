@@ -1,11 +1,13 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import DecimalField, F, Sum
 from productos.models import Producto
 from django.conf import settings
+from django.utils import timezone
 from decimal import Decimal
 from proveedores.models import Proveedor
 
 class Compra(models.Model):
-    fecha = models.DateField(auto_now_add=True, verbose_name="Fecha de compra")
+    fecha = models.DateField(default=timezone.localdate, verbose_name="Fecha de compra")
     proveedor = models.CharField(max_length=100, verbose_name="Proveedor")
     proveedor_fk = models.ForeignKey(Proveedor, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Proveedor (catálogo)")
     numero_factura = models.CharField(max_length=50, unique=True, verbose_name="Número de factura")
@@ -22,15 +24,24 @@ class Compra(models.Model):
 
     total = models.DecimalField(max_digits=12, decimal_places=2, default=0.00, verbose_name="Total compra")
 
-    def save(self, *args, **kwargs):
-        """Guarda la compra y actualiza automáticamente el total con base en los detalles."""
-        super().save(*args, **kwargs)  # Guarda primero para tener ID disponible
-        total = sum(
-            detalle.cantidad * detalle.costo_unitario
-            for detalle in self.detalles.all()
-        )
-        self.total = round(total, 2)
-        super().save(update_fields=["total"])
+    def calcular_total(self):
+        """Recalcula el total con base en los detalles existentes (una sola consulta)."""
+        total = self.detalles.aggregate(
+            total=Sum(F('cantidad') * F('costo_unitario'),
+                      output_field=DecimalField(max_digits=12, decimal_places=2))
+        )['total']
+        self.total = Decimal(total or 0).quantize(Decimal('0.01'))
+
+    def delete(self, *args, **kwargs):
+        """Al eliminar la compra se saca del inventario lo que entró con ella."""
+        from . import resumenes
+        from .services import anular_compra
+        with transaction.atomic():
+            detalles = anular_compra(self)
+            pk, anterior = self.pk, resumenes.estado(self)
+            resultado = super().delete(*args, **kwargs)
+            resumenes.registrar(pk, anterior, None, {d.producto_id for d in detalles})
+            return resultado
 
     def __str__(self):
         return f"{self.numero_factura} - {self.proveedor}"
@@ -39,6 +50,8 @@ class Compra(models.Model):
         verbose_name = "Compra"
         verbose_name_plural = "Compras"
         ordering = ['-fecha']
+        # Paginación por cursor (fecha, id) en el listado
+        indexes = [models.Index(fields=['fecha', 'id'], name='compra_fecha_id_idx')]
 
 
 
@@ -49,79 +62,35 @@ class DetalleCompra(models.Model):
     costo_unitario = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Costo unitario")
     subtotal = models.DecimalField(max_digits=12, decimal_places=2, verbose_name="Subtotal", editable=False)
 
-    def _set_stock_and_cost(self, prod, new_stock, new_cost):
-        """Asigna stock/costo respetando el tipo de campo de stock del Producto."""
-        prod.stock = int(new_stock) if new_stock > 0 else 0
-        prod.costo = (Decimal(new_cost).quantize(Decimal('0.01'))) if new_stock > 0 else Decimal('0.00')
-        prod.save()
-
-
-
-
-    def _apply_effect(self, prod, qty, unit_cost):
-        """Aplica el efecto de una compra y registra en Kardex."""
-        S_prev = Decimal(prod.stock)
-        C_prev = Decimal(prod.costo)
-        qty = Decimal(qty)
-        unit_cost = Decimal(unit_cost)
-
-        S_new = S_prev + qty
-        if S_new <= 0:
-            C_new = 0
-        else:
-            value_new = (S_prev * C_prev) + (qty * unit_cost)
-            C_new = value_new / S_new
-
-        # Actualizar costo promedio (no tocar stock directamente)
-        prod.costo = C_new
-        prod.save(update_fields=['costo'])
-
-        #  Registrar movimiento en Kardex (que actualiza el stock)
-        try:
-            from kardex.utils import registrar_movimiento
-            registrar_movimiento(prod, 'ENTRADA', qty, f"Compra #{self.compra.numero_factura}")
-        except Exception as e:
-            print(f"⚠️ No se pudo registrar movimiento en Kardex (compra): {e}")
-
-    def _revert_effect(self, prod, qty, unit_cost):
-        """Revierte el efecto de una compra previa."""
-        #  Registrar SALIDA en Kardex (ya ajusta el stock)
-        try:
-            from kardex.utils import registrar_movimiento
-            registrar_movimiento(prod, 'SALIDA', qty, f"Reversión compra #{self.compra.numero_factura}")
-        except Exception as e:
-            print(f"⚠️ No se pudo registrar reversión en Kardex: {e}")
-
-
-
     def save(self, *args, **kwargs):
-        """Guarda el detalle, recalcula subtotal y actualiza inventario y costo promedio."""
+        """Guarda el detalle y postea solo su diferencia en inventario, costo promedio y total."""
+        from . import resumenes
+        from .services import aplicar_cambios
         self.subtotal = self.cantidad * self.costo_unitario
-        old = None
-        if self.pk:
-            old = DetalleCompra.objects.select_related('producto', 'compra').get(pk=self.pk)
-
-        super().save(*args, **kwargs)
-
-        if old is None:
-            self._apply_effect(self.producto, self.cantidad, self.costo_unitario)
-        else:
-            if old.producto_id != self.producto_id:
-                self._revert_effect(old.producto, old.cantidad, old.costo_unitario)
-                self._apply_effect(self.producto, self.cantidad, self.costo_unitario)
-            else:
-                self._revert_effect(self.producto, old.cantidad, old.costo_unitario)
-                self._apply_effect(self.producto, self.cantidad, self.costo_unitario)
-
-        self.compra.save()
+        previos = DetalleCompra.objects.select_related('producto').in_bulk([self.pk]) if self.pk else {}
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            aplicar_cambios(self.compra, [self], (), previos)
+            anterior = resumenes.estado(self.compra)
+            self.compra.calcular_total()
+            self.compra.save(update_fields=["total"])
+            resumenes.registrar(self.compra.pk, anterior, resumenes.estado(self.compra),
+                                {self.producto_id} | {p.producto_id for p in previos.values()})
 
     def delete(self, *args, **kwargs):
-        """Elimina el detalle revirtiendo su efecto sobre el producto y actualiza el total."""
-        prod = self.producto
+        """Elimina el detalle descontando lo que aportó al inventario y al costo promedio."""
+        from . import resumenes
+        from .services import aplicar_cambios
         compra = self.compra
-        self._revert_effect(prod, self.cantidad, self.costo_unitario)
-        super().delete(*args, **kwargs)
-        compra.save()
+        previos = DetalleCompra.objects.select_related('producto').in_bulk([self.pk])
+        with transaction.atomic():
+            aplicar_cambios(compra, (), [self], previos)
+            resultado = super().delete(*args, **kwargs)
+            anterior = resumenes.estado(compra)
+            compra.calcular_total()
+            compra.save(update_fields=["total"])
+            resumenes.registrar(compra.pk, anterior, resumenes.estado(compra), {self.producto_id})
+        return resultado
 
     def __str__(self):
         return f"{self.producto} x {self.cantidad}"
@@ -129,3 +98,41 @@ class DetalleCompra(models.Model):
     class Meta:
         verbose_name = "Detalle de compra"
         verbose_name_plural = "Detalles de compra"
+
+
+class ResumenCompraProveedor(models.Model):
+    """Compras e importe de un proveedor en un mes (proveedor vacío = compras sin proveedor de catálogo)."""
+    fecha = models.DateField(verbose_name="Mes")  # primer día del mes
+    proveedor = models.ForeignKey(Proveedor, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    compras = models.IntegerField(default=0, verbose_name="Compras")
+    importe = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+
+    def __str__(self):
+        return f"{self.fecha:%Y-%m} – {self.proveedor or 'Sin proveedor'}: {self.compras} / Q {self.importe}"
+
+    class Meta:
+        verbose_name = "Resumen mensual por proveedor"
+        verbose_name_plural = "Resúmenes mensuales por proveedor"
+        constraints = [models.UniqueConstraint(fields=['fecha', 'proveedor'], name='resumen_compra_proveedor_unico')]
+
+
+class CostoProveedor(models.Model):
+    """Último costo y mejor costo pagados a un proveedor por un producto."""
+    proveedor = models.ForeignKey(Proveedor, on_delete=models.CASCADE, related_name='costos')
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='costos_proveedor')
+    ultimo_costo = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Último costo")
+    ultima_fecha = models.DateField(verbose_name="Fecha último costo")
+    ultima_compra = models.ForeignKey(Compra, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    mejor_costo = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Mejor costo")
+    mejor_fecha = models.DateField(verbose_name="Fecha mejor costo")
+    mejor_compra = models.ForeignKey(Compra, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    def __str__(self):
+        return f"{self.proveedor} – {self.producto}: Q {self.ultimo_costo}"
+
+    class Meta:
+        verbose_name = "Costo por proveedor"
+        verbose_name_plural = "Costos por proveedor"
+        constraints = [models.UniqueConstraint(fields=['proveedor', 'producto'], name='costo_proveedor_unico')]
+        # Libro de costos del proveedor, paginado por cursor (-ultima_fecha, -id)
+        indexes = [models.Index(fields=['proveedor', 'ultima_fecha', 'id'], name='costo_prov_fecha_idx')]
@@ -0,0 +1,298 @@
+"""
+Resúmenes de compras por proveedor:
+
+- ResumenCompraProveedor: compras e importe por proveedor y mes.
+- CostoProveedor: último costo y mejor costo pagados a cada proveedor por
+  cada producto (el "libro de costos").
+
+Se actualizan en la misma transacción que registra, edita o elimina la
+compra (ver services.py), con la diferencia que produjo el cambio. El mes
+suma y resta como los resúmenes de ventas. En el libro, una compra nueva
+solo se compara con la fila guardada; únicamente cuando cambia o se quita
+una compra que era la última o la mejor de un producto se vuelve a leer el
+historial de ese proveedor y producto.
+
+Las compras antiguas con el proveedor escrito a mano (Compra.proveedor) se
+enlazan al catálogo por nombre o NIT con vincular_proveedores(); las que no
+coinciden quedan en el resumen sin proveedor.
+"""
+from collections import namedtuple
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import Count, F, Min, Q, Sum
+from django.db.models.functions import TruncMonth
+from busqueda.utils import normalizar
+from proveedores.models import Proveedor
+from ventas.resumenes import _acumular
+from .models import Compra, CostoProveedor, DetalleCompra, ResumenCompraProveedor
+
+CERO = Decimal('0.00')
+CENTAVO = Decimal('0.01')
+
+# Encabezado de una compra antes o después de un cambio
+Estado = namedtuple('Estado', ['fecha', 'proveedor_id', 'total'])
+
+
+def estado(compra):
+    return Estado(compra.fecha, compra.proveedor_fk_id, Decimal(compra.total or 0))
+
+
+def _mes(fecha):
+    return fecha.replace(day=1)
+
+
+def _importe():
+    return Sum(F('cantidad') * F('costo_unitario'), output_field=models.DecimalField(max_digits=14, decimal_places=2))
+
+
+# ======================
+# PROVEEDOR DE TEXTO LIBRE
+# ======================
+def _catalogo():
+    """{nombre normalizado o NIT: proveedor_id} del catálogo (una consulta)."""
+    claves = {}
+    for pk, nombre, nit in Proveedor.objects.values_list('pk', 'nombre', 'nit').order_by('-activo', 'pk'):
+        claves.setdefault(normalizar(nombre), pk)
+        if nit:
+            claves.setdefault(normalizar(nit), pk)
+    return claves
+
+
+def resolver_proveedor(compra):
+    """Completa proveedor_fk de una compra que solo trae el proveedor escrito a mano, si está en el catálogo."""
+    texto = (compra.proveedor or '').strip()
+    if compra.proveedor_fk_id or not texto:
+        return
+    compra.proveedor_fk_id = (
+        Proveedor.objects.filter(Q(nombre__iexact=texto) | Q(nit__iexact=texto))
+        .order_by('-activo', 'pk').values_list('pk', flat=True).first()
+    )
+
+
+def vincular_proveedores():
+    """
+    Enlaza al catálogo las compras que solo tienen el proveedor escrito a mano
+    (por nombre o NIT, sin importar mayúsculas ni tildes). Un UPDATE por
+    proveedor encontrado. Devuelve cuántas compras se enlazaron.
+    """
+    catalogo = _catalogo()
+    por_proveedor = {}
+    textos = (
+        Compra.objects.filter(proveedor_fk__isnull=True).exclude(proveedor='')
+        .values_list('proveedor', flat=True).distinct().order_by()
+    )
+    for texto in textos:
+        pk = catalogo.get(normalizar(texto))
+        if pk:
+            por_proveedor.setdefault(pk, []).append(texto)
+    total = 0
+    for pk, nombres in por_proveedor.items():
+        total += Compra.objects.filter(proveedor_fk__isnull=True, proveedor__in=nombres).update(proveedor_fk_id=pk)
+    return total
+
+
+# ======================
+# ACTUALIZACIÓN INCREMENTAL
+# ======================
+def _aportes(compra_id, productos):
+    """Costo promedio, costo mínimo y fecha de cada producto dentro de una compra."""
+    return {
+        f['producto']: f for f in
+        DetalleCompra.objects.filter(compra_id=compra_id, producto_id__in=productos)
+        .values('producto').annotate(unidades=Sum('cantidad'), importe=_importe(), minimo=Min('costo_unitario'))
+        .order_by()
+    }
+
+
+def _costo_promedio(fila):
+    if not fila['unidades']:
+        return fila['minimo']
+    return (fila['importe'] / fila['unidades']).quantize(CENTAVO)
+
+
+def _recalcular(proveedor_id, productos):
+    """Vuelve a leer el historial de esos productos con ese proveedor y reescribe sus filas del libro."""
+    filas = (
+        DetalleCompra.objects.filter(compra__proveedor_fk_id=proveedor_id, producto_id__in=productos)
+        .values('producto', 'compra', 'compra__fecha')
+        .annotate(unidades=Sum('cantidad'), importe=_importe(), minimo=Min('costo_unitario'))
+        .order_by('producto', 'compra__fecha', 'compra')
+    )
+    libro = {}
+    for f in filas:
+        fila = libro.get(f['producto'])
+        if fila is None:
+            fila = libro[f['producto']] = CostoProveedor(
+                proveedor_id=proveedor_id, producto_id=f['producto'],
+                mejor_costo=f['minimo'], mejor_fecha=f['compra__fecha'], mejor_compra_id=f['compra'],
+            )
+        # Orden por fecha: la última compra leída es la más reciente
+        fila.ultimo_costo = _costo_promedio(f)
+        fila.ultima_fecha = f['compra__fecha']
+        fila.ultima_compra_id = f['compra']
+        if f['minimo'] < fila.mejor_costo:
+            fila.mejor_costo, fila.mejor_fecha, fila.mejor_compra_id = f['minimo'], f['compra__fecha'], f['compra']
+
+    CostoProveedor.objects.filter(proveedor_id=proveedor_id, producto_id__in=productos).delete()
+    CostoProveedor.objects.bulk_create(libro.values(), batch_size=1000)
+
+
+def _sumar_al_libro(proveedor_id, compra_id, fecha, productos, recalcular_propios):
+    """
+    Compara el aporte de la compra a cada producto con la fila del libro.
+    Con recalcular_propios, los productos cuya última o mejor compra es esta
+    misma se recalculan (su valor anterior ya no vale).
+    """
+    aportes = _aportes(compra_id, productos)
+    guardadas = {c.producto_id: c for c in CostoProveedor.objects.filter(proveedor_id=proveedor_id, producto_id__in=productos)}
+    nuevas, cambiadas, recalcular = [], [], []
+    for producto_id in productos:
+        fila, aporte = guardadas.get(producto_id), aportes.get(producto_id)
+        if fila is not None and recalcular_propios and compra_id in (fila.ultima_compra_id, fila.mejor_compra_id):
+            recalcular.append(producto_id)
+            continue
+        if aporte is None:
+            continue
+        costo = _costo_promedio(aporte)
+        if fila is None:
+            nuevas.append(CostoProveedor(
+                proveedor_id=proveedor_id, producto_id=producto_id,
+                ultimo_costo=costo, ultima_fecha=fecha, ultima_compra_id=compra_id,
+                mejor_costo=aporte['minimo'], mejor_fecha=fecha, mejor_compra_id=compra_id,
+            ))
+            continue
+        cambio = False
+        if (fecha, compra_id) >= (fila.ultima_fecha, fila.ultima_compra_id or 0):
+            fila.ultimo_costo, fila.ultima_fecha, fila.ultima_compra_id = costo, fecha, compra_id
+            cambio = True
+        if aporte['minimo'] < fila.mejor_costo:
+            fila.mejor_costo, fila.mejor_fecha, fila.mejor_compra_id = aporte['minimo'], fecha, compra_id
+            cambio = True
+        if cambio:
+            cambiadas.append(fila)
+
+    if nuevas:
+        CostoProveedor.objects.bulk_create(nuevas, batch_size=1000)
+    if cambiadas:
+        CostoProveedor.objects.bulk_update(cambiadas, [
+            'ultimo_costo', 'ultima_fecha', 'ultima_compra', 'mejor_costo', 'mejor_fecha', 'mejor_compra',
+        ], batch_size=500)
+    if recalcular:
+        _recalcular(proveedor_id, recalcular)
+
+
+def registrar(compra_id, anterior, actual, productos):
+    """
+    Actualiza los resúmenes por el cambio de una compra.
+
+    - anterior / actual: Estado del encabezado antes y después del cambio
+      (anterior None si la compra es nueva; actual None si se eliminó)
+    - productos: ids de los productos cuyas líneas cambiaron; si cambió el
+      proveedor o la fecha deben ser todos los de la compra
+    """
+    productos = sorted(set(productos))
+
+    meses = {}
+    for e, signo in ((anterior, -1), (actual, 1)):
+        if e is not None:
+            fila = meses.setdefault(_mes(e.fecha), {}).setdefault(e.proveedor_id, [0, CERO])
+            fila[0] += signo
+            fila[1] += signo * e.total
+    for mes, cambios in sorted(meses.items()):
+        _acumular(ResumenCompraProveedor, 'proveedor', mes, cambios, ['compras', 'importe'])
+
+    if not productos:
+        return
+    mismo_encabezado = (
+        anterior is not None and actual is not None
+        and (anterior.proveedor_id, anterior.fecha) == (actual.proveedor_id, actual.fecha)
+    )
+    if mismo_encabezado:
+        if actual.proveedor_id:
+            _sumar_al_libro(actual.proveedor_id, compra_id, actual.fecha, productos, recalcular_propios=True)
+        return
+    if anterior is not None and anterior.proveedor_id:
+        _recalcular(anterior.proveedor_id, productos)
+    if actual is not None and actual.proveedor_id:
+        if anterior is None:
+            _sumar_al_libro(actual.proveedor_id, compra_id, actual.fecha, productos, recalcular_propios=False)
+        else:
+            _recalcular(actual.proveedor_id, productos)
+
+
+@transaction.atomic
+def reconstruir(vincular=False):
+    """
+    Recalcula los resúmenes mensuales y el libro de costos desde Compra /
+    DetalleCompra. Con vincular, antes enlaza al catálogo las compras con
+    proveedor de texto libre. Devuelve cuántas filas quedaron en cada tabla.
+    """
+    resumen = {}
+    if vincular:
+        resumen['vinculadas'] = vincular_proveedores()
+
+    ResumenCompraProveedor.objects.all().delete()
+    meses = [
+        ResumenCompraProveedor(fecha=f['mes'], proveedor_id=f['proveedor_fk'], compras=f['compras'], importe=f['importe'] or CERO)
+        for f in Compra.objects.annotate(mes=TruncMonth('fecha'))
+        .values('mes', 'proveedor_fk').annotate(compras=Count('id'), importe=Sum('total')).order_by()
+    ]
+    ResumenCompraProveedor.objects.bulk_create(meses, batch_size=1000)
+    resumen['meses'] = len(meses)
+
+    CostoProveedor.objects.all().delete()
+    filas = (
+        DetalleCompra.objects.filter(compra__proveedor_fk__isnull=False)
+        .values('compra__proveedor_fk', 'producto', 'compra', 'compra__fecha')
+        .annotate(unidades=Sum('cantidad'), importe=_importe(), minimo=Min('costo_unitario'))
+        .order_by('compra__proveedor_fk', 'producto', 'compra__fecha', 'compra')
+    )
+    pendientes, total, fila, clave = [], 0, None, None
+    for f in filas.iterator(chunk_size=2000):
+        if (f['compra__proveedor_fk'], f['producto']) != clave:
+            clave = (f['compra__proveedor_fk'], f['producto'])
+            fila = CostoProveedor(
+                proveedor_id=clave[0], producto_id=clave[1],
+                mejor_costo=f['minimo'], mejor_fecha=f['compra__fecha'], mejor_compra_id=f['compra'],
+            )
+            pendientes.append(fila)
+        fila.ultimo_costo = _costo_promedio(f)
+        fila.ultima_fecha = f['compra__fecha']
+        fila.ultima_compra_id = f['compra']
+        if f['minimo'] < fila.mejor_costo:
+            fila.mejor_costo, fila.mejor_fecha, fila.mejor_compra_id = f['minimo'], f['compra__fecha'], f['compra']
+        # Se guarda por bloques; la fila en curso puede seguir recibiendo compras
+        if len(pendientes) > 2000:
+            CostoProveedor.objects.bulk_create(pendientes[:-1], batch_size=1000)
+            total += len(pendientes) - 1
+            pendientes = pendientes[-1:]
+    CostoProveedor.objects.bulk_create(pendientes, batch_size=1000)
+    resumen['costos'] = total + len(pendientes)
+    return resumen
+
+
+# ======================
+# CONSULTAS
+# ======================
+def costos_sugeridos(producto_id, proveedor_id=None):
+    """
+    Pista de costo para el formulario de compra: último y mejor costo con ese
+    proveedor (si se indica) y el mejor costo entre todos los proveedores.
+    """
+    filas = CostoProveedor.objects.filter(producto_id=producto_id).select_related('proveedor')
+    datos = {'proveedor': None, 'mejor_general': None}
+    mejor = None
+    for c in filas:
+        if c.proveedor_id == proveedor_id:
+            datos['proveedor'] = {
+                'ultimo_costo': c.ultimo_costo, 'ultima_fecha': c.ultima_fecha,
+                'mejor_costo': c.mejor_costo, 'mejor_fecha': c.mejor_fecha,
+            }
+        if mejor is None or c.mejor_costo < mejor.mejor_costo:
+            mejor = c
+    if mejor is not None:
+        datos['mejor_general'] = {
+            'costo': mejor.mejor_costo, 'fecha': mejor.mejor_fecha, 'proveedor': mejor.proveedor.nombre,
+        }
+    return datos
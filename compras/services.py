@@ -0,0 +1,190 @@
+from datetime import datetime, time
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
+from kardex.utils import Movimiento, registrar_movimientos
+from productos.models import Producto
+from . import resumenes
+from .models import Compra, DetalleCompra
+
+CENTAVO = Decimal('0.01')
+
+
+def costos_promedio(cambios):
+    """
+    Costo promedio ponderado de cada producto después de aplicar cambios
+    {producto_id: (cantidad, importe)}, donde importe es cantidad × costo
+    unitario (ambos negativos al quitar unidades de una compra):
+
+        costo = (stock * costo + importe) / (stock + cantidad)
+
+    Para una línea nueva es la misma fórmula que se usaba línea por línea; al
+    reducir o quitar una línea se descuenta exactamente lo que esa línea había
+    aportado al promedio. Lee stock y costo en una sola consulta, bloqueando
+    las filas para que dos compras simultáneas no promedien sobre el mismo
+    valor. Devuelve {producto_id: costo nuevo}.
+    """
+    estado = Producto.objects.select_for_update().filter(pk__in=sorted(cambios)).order_by('pk')
+    costos = {}
+    for pk, stock, costo in estado.values_list('pk', 'stock', 'costo'):
+        cantidad, importe = cambios[pk]
+        stock, costo = Decimal(stock or 0), Decimal(costo or 0)
+        nuevo_stock = stock + Decimal(cantidad)
+        valor = stock * costo + Decimal(importe)
+        if nuevo_stock <= 0 or valor <= 0:
+            costos[pk] = Decimal('0.00')
+        else:
+            costos[pk] = (valor / nuevo_stock).quantize(CENTAVO)
+    return costos
+
+
+def actualizar_costos(costos):
+    """Escribe {producto_id: costo} con un solo UPDATE."""
+    if not costos:
+        return
+    salida = Producto._meta.get_field('costo')
+    Producto.objects.filter(pk__in=sorted(costos)).order_by('pk').update(costo=Case(
+        *[When(pk=pk, then=Value(costo, output_field=salida)) for pk, costo in costos.items()],
+        output_field=salida,
+    ))
+
+
+def _cambios_de_lineas(detalles, eliminados, previos):
+    """
+    Diferencia neta por producto entre las líneas anteriores y las nuevas:
+    {producto_id: [cantidad, importe]} más las instancias de producto. Una
+    línea sin cambios no aporta nada; un cambio de producto quita todo del
+    anterior y suma todo al nuevo.
+    """
+    cambios, productos = {}, {}
+
+    def sumar(producto, cantidad, costo_unitario, signo):
+        fila = cambios.setdefault(producto.pk, [Decimal('0'), Decimal('0')])
+        fila[0] += signo * Decimal(cantidad)
+        fila[1] += signo * Decimal(cantidad) * Decimal(costo_unitario)
+        productos.setdefault(producto.pk, producto)
+
+    for d in detalles:
+        prev = previos.get(d.pk) if d.pk else None
+        if prev is not None:
+            sumar(prev.producto, prev.cantidad, prev.costo_unitario, -1)
+        sumar(d.producto, d.cantidad, d.costo_unitario, 1)
+    for e in eliminados:
+        prev = previos.get(e.pk)
+        if prev is not None:
+            sumar(prev.producto, prev.cantidad, prev.costo_unitario, -1)
+
+    cambios = {pk: (cantidad, importe) for pk, (cantidad, importe) in cambios.items() if cantidad or importe}
+    return cambios, productos
+
+
+def fecha_movimiento(compra):
+    """
+    Fecha con la que se postea una compra en el Kardex: la hora actual si es
+    de hoy (o sin fecha) y el inicio del día si se registró con fecha anterior.
+    """
+    if compra.fecha is None or compra.fecha >= timezone.localdate():
+        return None
+    return timezone.make_aware(datetime.combine(compra.fecha, time.min))
+
+
+def aplicar_cambios(compra, detalles, eliminados, previos):
+    """
+    Postea la diferencia neta entre las líneas anteriores (`previos`, por id)
+    y las nuevas: una ENTRADA o SALIDA de Kardex por producto cuya cantidad
+    cambió (las entradas primero, para liberar stock antes de descontar) y el
+    costo promedio de todos los afectados con un solo UPDATE. Si una salida
+    no alcanza se lanza StockInsuficiente y la transacción se deshace.
+    """
+    cambios, productos = _cambios_de_lineas(detalles, eliminados, previos)
+    if not cambios:
+        return
+    costos = costos_promedio(cambios)
+    fecha = fecha_movimiento(compra)
+    # El importe viaja con el movimiento para el historial de costos (kardex/costos.py)
+    entradas = [
+        Movimiento(productos[pk], 'ENTRADA', cantidad, f"Compra #{compra.numero_factura}", fecha, importe)
+        for pk, (cantidad, importe) in cambios.items() if cantidad > 0
+    ] + [
+        # Cambió solo el costo de una línea: ajuste de valor sin unidades
+        Movimiento(productos[pk], 'ENTRADA', 0, f"Ajuste costo compra #{compra.numero_factura}", fecha, importe)
+        for pk, (cantidad, importe) in cambios.items() if cantidad == 0 and importe
+    ]
+    salidas = [
+        Movimiento(productos[pk], 'SALIDA', -cantidad, f"Reversión compra #{compra.numero_factura}", fecha, -importe)
+        for pk, (cantidad, importe) in cambios.items() if cantidad < 0
+    ]
+    registrar_movimientos(entradas + salidas)
+    actualizar_costos(costos)
+
+
+@transaction.atomic
+def registrar_compra(compra, detalles, eliminados=()):
+    """
+    Registra una compra nueva o los cambios de una existente en una sola
+    transacción.
+
+    - compra: encabezado (nuevo o existente) sin guardar todavía
+    - detalles: líneas nuevas o modificadas (p.ej. formset.save(commit=False))
+    - eliminados: líneas existentes que se quitan de la compra
+
+    Al editar solo se postea la diferencia neta por producto contra las
+    líneas guardadas: cambiar una línea de una factura de 200 toca un solo
+    producto, y las cantidades quitadas descuentan su aporte al costo
+    promedio. El número de consultas no depende de la cantidad de líneas.
+    Los resúmenes por proveedor (resumenes.py) se actualizan con el cambio.
+    """
+    detalles = list(detalles)
+    eliminados = [e for e in eliminados if e.pk]
+    es_nueva = compra.pk is None
+    anterior = None
+    if not es_nueva:
+        anterior = Compra.objects.filter(pk=compra.pk).values_list('fecha', 'proveedor_fk', 'total').first()
+        anterior = resumenes.Estado(*anterior) if anterior else None
+    resumenes.resolver_proveedor(compra)
+
+    for d in detalles:
+        d.subtotal = d.cantidad * d.costo_unitario
+    if es_nueva:
+        # Compra nueva: el total sale directamente de las líneas en memoria
+        compra.total = sum((d.subtotal for d in detalles), Decimal('0.00')).quantize(CENTAVO)
+    compra.save()
+
+    ids_previos = [d.pk for d in detalles if d.pk] + [e.pk for e in eliminados]
+    previos = {}
+    if ids_previos:
+        previos = DetalleCompra.objects.select_related('producto').in_bulk(ids_previos)
+
+    for d in detalles:
+        d.compra = compra
+    nuevos = [d for d in detalles if d.pk is None]
+    modificados = [d for d in detalles if d.pk is not None]
+    if nuevos:
+        DetalleCompra.objects.bulk_create(nuevos)
+    if modificados:
+        DetalleCompra.objects.bulk_update(modificados, ['producto', 'cantidad', 'costo_unitario', 'subtotal'])
+    if eliminados:
+        DetalleCompra.objects.filter(pk__in=[e.pk for e in eliminados]).delete()
+
+    aplicar_cambios(compra, detalles, eliminados, previos)
+
+    if not es_nueva and (nuevos or modificados or eliminados):
+        compra.calcular_total()
+        Compra.objects.filter(pk=compra.pk).update(total=compra.total)
+
+    actual = resumenes.estado(compra)
+    productos = {d.producto_id for d in detalles} | {p.producto_id for p in previos.values()}
+    if anterior is not None and (anterior.proveedor_id, anterior.fecha) != (actual.proveedor_id, actual.fecha):
+        # Cambió el proveedor o la fecha: se mueve la compra entera
+        productos |= set(compra.detalles.values_list('producto', flat=True).distinct())
+    resumenes.registrar(compra.pk, anterior, actual, productos)
+    return compra
+
+
+@transaction.atomic
+def anular_compra(compra):
+    """Saca del inventario lo que entró con la compra y descuenta su aporte al costo (sin borrarla)."""
+    detalles = list(compra.detalles.select_related('producto'))
+    aplicar_cambios(compra, (), detalles, {d.pk: d for d in detalles})
+    return detalles
@@ -0,0 +1,8 @@
+from tareas.utils import tarea
+from . import resumenes
+
+
+@tarea('compras.reconstruir_resumenes', "Reconstruir resúmenes y costos por proveedor", manual=True)
+def reconstruir_resumenes(tarea):
+    resumen = resumenes.reconstruir()
+    return " · ".join(f"{tabla}: {filas} filas" for tabla, filas in resumen.items())
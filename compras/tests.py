@@ -1,3 +1,21 @@
-from django.test import TestCase
+from django.urls import reverse
+from proyectof.testing import PruebaVistas
 
-# Create your tests here.
+
+class PresupuestoVistasTests(PruebaVistas):
+    def test_listado(self):
+        self.assertPresupuesto(3, reverse('compras:compras_list'))
+
+    def test_detalle(self):
+        self.assertPresupuesto(4, reverse('compras:compras_detail', args=[self.datos['compras'][0].pk]))
+
+    def test_nueva(self):
+        self.assertPresupuesto(5, reverse('compras:compras_create'))
+
+    def test_editar(self):
+        self.assertPresupuesto(7, reverse('compras:compras_edit', args=[self.datos['compras'][0].pk]))
+
+    def test_costo_sugerido(self):
+        self.assertPresupuesto(3, reverse('compras:costo_sugerido'), {
+            'producto_id': self.datos['productos'][0].pk, 'proveedor_id': self.datos['proveedores'][0].pk,
+        })
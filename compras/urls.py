@@ -5,6 +5,7 @@ app_name = "compras"
 
 urlpatterns = [
     path('', views.compras_list, name='compras_list'),
+    path('costo-sugerido/', views.costo_sugerido, name='costo_sugerido'),
     path('nueva/', views.compras_create, name='compras_create'),
     path('<int:pk>/', views.compras_detail, name='compras_detail'),
     path('<int:pk>/editar/', views.compras_edit, name='compras_edit'),
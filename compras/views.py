@@ -1,25 +1,41 @@
+from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.decorators.http import require_POST
 from django.forms import inlineformset_factory
 from .models import Compra, DetalleCompra
-from .forms import CompraForm, DetalleCompraForm
+from .forms import CompraForm, DetalleCompraForm, DetalleCompraFormSet
+from ventas.forms import precargar_productos
+from . import resumenes
+from .services import registrar_compra
+from kardex.utils import StockInsuficiente
 from django.contrib import messages
 from django.db.models import Q
+from proyectof.paginacion import paginar, pide_json
+from busqueda import utils as busqueda
 
 
 
 def compras_list(request):
     query = request.GET.get('q', '').strip()
-    compras = Compra.objects.all().order_by('-fecha')
+    compras = Compra.objects.select_related('proveedor_fk')
 
     if query:
-        compras = compras.filter(
-            Q(numero_factura__icontains=query) |
-            Q(proveedor_fk__nombre__icontains=query)
-        )
+        compras = busqueda.filtrar(compras, query, ['numero_factura'], relaciones={'proveedor_fk': ['nombre']})
+
+    pagina = paginar(compras, ('-fecha', '-id'), request.GET)
+
+    if pide_json(request):
+        return pagina.como_json(lambda c: {
+            'id': c.id,
+            'fecha': c.fecha,
+            'proveedor': c.proveedor_fk.nombre if c.proveedor_fk_id else c.proveedor,
+            'numero_factura': c.numero_factura,
+            'total': c.total,
+        })
 
     return render(request, 'compras/compras_list.html', {
-        'compras': compras,
+        'compras': pagina,
+        'pagina': pagina,
         'query': query
     })
 
@@ -27,22 +43,16 @@ def compras_list(request):
 
 def compras_create(request):
     DetalleFormSet = inlineformset_factory(
-        Compra, DetalleCompra, form=DetalleCompraForm, extra=3, can_delete=True
+        Compra, DetalleCompra, form=DetalleCompraForm, formset=DetalleCompraFormSet, extra=3, can_delete=True
         )
 
     if request.method == 'POST':
         form = CompraForm(request.POST)
-        formset = DetalleFormSet(request.POST)
+        # Productos de todas las líneas en una sola consulta
+        formset = DetalleFormSet(request.POST, form_kwargs={'productos': precargar_productos(request.POST)})
         if form.is_valid() and formset.is_valid():
-            compra = form.save()
-            detalles = formset.save(commit=False)
-            total = 0
-            for detalle in detalles:
-                detalle.compra = compra
-                detalle.save()
-                total += detalle.subtotal
-            compra.total = total
-            compra.save()
+            # Encabezado, líneas, Kardex y costos en una sola transacción
+            registrar_compra(form.save(commit=False), formset.save(commit=False))
             messages.success(request, 'Compra registrada exitosamente.')
             return redirect('compras:compras_list')
     else:
@@ -58,15 +68,22 @@ def compras_create(request):
 @require_POST
 def compras_delete(request, pk):
     compra = get_object_or_404(Compra, pk=pk)
-    compra.delete()
+    try:
+        compra.delete()
+    except StockInsuficiente as e:
+        messages.error(
+            request,
+            f"No se puede eliminar la compra: de '{e.producto.nombre}' solo quedan {e.disponible} unidades en inventario.",
+        )
+        return redirect('compras:compras_list')
     messages.success(request, 'Compra eliminada correctamente.')
     return redirect('compras:compras_list')
 
 
 # --- Ver detalle de una compra ---
 def compras_detail(request, pk):
-    compra = get_object_or_404(Compra, pk=pk)
-    detalles = compra.detalles.all()
+    compra = get_object_or_404(Compra.objects.select_related('proveedor_fk', 'encargado'), pk=pk)
+    detalles = compra.detalles.select_related('producto')
     return render(request, 'compras/compras_detail.html', {
         'compra': compra,
         'detalles': detalles
@@ -80,17 +97,25 @@ def compras_edit(request, pk):
     compra = get_object_or_404(Compra, pk=pk)
 
     DetalleFormSet = inlineformset_factory(
-        Compra, DetalleCompra, form=DetalleCompraForm, extra=1, can_delete=True
+        Compra, DetalleCompra, form=DetalleCompraForm, formset=DetalleCompraFormSet, extra=1, can_delete=True
     )
 
     if request.method == "POST":
         form = CompraForm(request.POST, instance=compra)
-        formset = DetalleFormSet(request.POST, instance=compra)
+        formset = DetalleFormSet(request.POST, instance=compra,
+                                 form_kwargs={'productos': precargar_productos(request.POST)})
 
         if form.is_valid() and formset.is_valid():
-            form.save()
-            formset.save()
-            return redirect("compras:compras_list")
+            # Solo se postea la diferencia de las líneas que cambiaron
+            try:
+                registrar_compra(form.save(commit=False), formset.save(commit=False), formset.deleted_objects)
+            except StockInsuficiente as e:
+                messages.error(
+                    request,
+                    f"No se puede reducir la compra: de '{e.producto.nombre}' solo quedan {e.disponible} unidades en inventario.",
+                )
+            else:
+                return redirect("compras:compras_list")
         else:
             print("Error al editar compra")
             print(form.errors)
@@ -105,3 +130,15 @@ def compras_edit(request, pk):
         "compras/compras_edit.html",
         {"form": form, "formset": formset, "compra": compra},
     )
+
+
+# --- Pista de costo para el formulario ---
+def costo_sugerido(request):
+    """Último y mejor costo del producto con el proveedor elegido, y el mejor entre todos (libro de costos)."""
+    producto_id = request.GET.get('producto_id', '')
+    proveedor_id = request.GET.get('proveedor_id', '')
+    if not producto_id.isdigit():
+        return JsonResponse({'proveedor': None, 'mejor_general': None})
+    return JsonResponse(resumenes.costos_sugeridos(
+        int(producto_id), int(proveedor_id) if proveedor_id.isdigit() else None,
+    ))
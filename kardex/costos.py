@@ -0,0 +1,342 @@
+"""
+Historial de costos del inventario, calculado a partir del Kardex.
+
+Por cada movimiento se guarda (CostoMovimiento) el stock, el costo y el valor
+del producto inmediatamente después, con dos criterios:
+
+- promedio ponderado: el mismo que mantiene Producto.costo al comprar;
+- FIFO: cada entrada abre una capa (CapaCosto) y las salidas consumen las
+  capas más antiguas (ConsumoCapa).
+
+Las entradas de compras traen su valor en MovimientoInventario.importe; las
+demás entradas (reversiones, producción) entran al promedio vigente. Las
+salidas con importe son reducciones de compras: salen a ese costo y, en
+FIFO, de las capas más recientes. Un ajuste de costo (entrada sin unidades)
+lo absorbe la capa abierta más reciente; AjusteCapa guarda el costo que tenía,
+así al deshacer el ajuste la capa vuelve a él. Un movimiento APERTURA (lo deja
+el archivo de un período cerrado) fija el stock y el costo al corte.
+
+El cálculo es incremental: actualizar() solo procesa los movimientos que aún
+no tienen costo. Si uno de ellos es anterior a lo ya calculado (una compra
+con fecha atrasada), se deshace lo calculado de ese producto desde esa fecha
+y se recalcula hacia adelante, sin repasar el historial previo. Lo corre la
+tarea kardex.actualizar_costos, que el registro de movimientos encola (ver
+kardex/utils.py); las consultas solo leen lo ya calculado y toman el último
+registro del producto con fecha <= X por índice.
+"""
+from collections import deque
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import (
+    Case, Exists, F, Min, OuterRef, Q, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from productos.models import Producto
+from .models import AjusteCapa, CapaCosto, ConsumoCapa, CostoMovimiento, MovimientoInventario
+
+CERO = Decimal('0')
+CENTAVO = Decimal('0.01')
+METODOS = ('promedio', 'fifo')
+
+
+class _Capa:
+    __slots__ = ('id', 'movimiento_id', 'fecha', 'cantidad', 'costo', 'restante', 'cambio')
+
+    def __init__(self, id, movimiento_id, fecha, cantidad, costo, restante):
+        self.id = id
+        self.movimiento_id = movimiento_id
+        self.fecha = fecha
+        self.cantidad = cantidad
+        self.costo = costo
+        self.restante = restante
+        self.cambio = False
+
+
+def _promedio(stock, costo, cantidad, importe):
+    """Mismo criterio que compras.services.costos_promedio."""
+    nuevo = stock + cantidad
+    valor = stock * costo + importe
+    if nuevo <= 0 or valor <= 0:
+        return nuevo, Decimal('0.00')
+    return nuevo, (valor / nuevo).quantize(CENTAVO)
+
+
+def _consumir(capas, cantidad, desde_el_final):
+    """Saca `cantidad` de las capas abiertas; devuelve [(capa, unidades)] y lo que no alcanzó."""
+    tomados = []
+    while cantidad > 0 and capas:
+        capa = capas[-1] if desde_el_final else capas[0]
+        toma = min(capa.restante, cantidad)
+        capa.restante -= toma
+        capa.cambio = True
+        cantidad -= toma
+        tomados.append((capa, toma))
+        if capa.restante <= 0:
+            capas.pop() if desde_el_final else capas.popleft()
+    return tomados, cantidad
+
+
+def _deshacer(producto_id, desde):
+    """
+    Borra lo calculado del producto desde `desde`: devuelve a sus capas lo que
+    esas salidas consumieron y el costo que tenían antes de esos ajustes.
+    """
+    devueltos = {
+        f['capa']: f['total'] for f in
+        ConsumoCapa.objects.filter(capa__producto_id=producto_id, capa__fecha__lt=desde, fecha__gte=desde)
+        .values('capa').annotate(total=Sum('cantidad')).order_by()
+    }
+    if devueltos:
+        salida = CapaCosto._meta.get_field('restante')
+        CapaCosto.objects.filter(pk__in=devueltos).update(restante=F('restante') + Case(
+            *[When(pk=pk, then=Value(total, output_field=salida)) for pk, total in devueltos.items()],
+            output_field=salida,
+        ))
+    # Del más reciente al más antiguo: queda el costo previo al primer ajuste deshecho
+    restaurados = dict(
+        AjusteCapa.objects.filter(capa__producto_id=producto_id, capa__fecha__lt=desde, fecha__gte=desde)
+        .order_by('-fecha', '-id').values_list('capa', 'costo_anterior')
+    )
+    if restaurados:
+        costo = CapaCosto._meta.get_field('costo_unitario')
+        CapaCosto.objects.filter(pk__in=restaurados).update(costo_unitario=Case(
+            *[When(pk=pk, then=Value(anterior, output_field=costo)) for pk, anterior in restaurados.items()],
+            output_field=costo,
+        ))
+    AjusteCapa.objects.filter(capa__producto_id=producto_id, fecha__gte=desde).delete()
+    ConsumoCapa.objects.filter(capa__producto_id=producto_id, fecha__gte=desde).delete()
+    CapaCosto.objects.filter(producto_id=producto_id, fecha__gte=desde).delete()
+    CostoMovimiento.objects.filter(producto_id=producto_id, fecha__gte=desde).delete()
+
+
+@transaction.atomic
+def recostear(producto_id, desde):
+    """
+    Recalcula el historial de costos de un producto a partir de `desde`
+    (inclusive). Devuelve cuántos movimientos se procesaron.
+    """
+    # Bloquea el producto: dos recálculos simultáneos no se pisan
+    costo_actual = Producto.objects.select_for_update().filter(pk=producto_id).values_list('costo', flat=True).first()
+    if costo_actual is None:
+        return 0
+    _deshacer(producto_id, desde)
+
+    movimientos = list(
+        MovimientoInventario.objects.filter(producto_id=producto_id, fecha__gte=desde)
+        .order_by('fecha', 'id').values_list('id', 'tipo', 'cantidad', 'importe', 'fecha')
+    )
+    if not movimientos:
+        return 0
+
+    abiertas = [
+        _Capa(c.id, c.movimiento_id, c.fecha, c.cantidad, c.costo_unitario, c.restante)
+        for c in CapaCosto.objects.filter(producto_id=producto_id, restante__gt=0).order_by('fecha', 'id')
+    ]
+    capas = deque(abiertas)
+    previo = (
+        CostoMovimiento.objects.filter(producto_id=producto_id, fecha__lt=desde)
+        .order_by('-fecha', '-movimiento_id').values_list('stock', 'costo_promedio').first()
+    )
+    nuevas = []
+    if previo is not None:
+        stock, costo = previo
+    elif movimientos[0][1] == 'APERTURA':
+        # Empieza en el saldo inicial de un período archivado (lo fija el propio movimiento)
+        stock, costo = CERO, costo_actual or Decimal('0.00')
+    else:
+        # Inicio del historial: el saldo previo al primer movimiento, al costo
+        # actual del producto (no hay un dato mejor)
+        # (el saldo del Kardex sigue el orden de registro, no el de fecha)
+        tipo, cantidad, saldo = (
+            MovimientoInventario.objects.filter(producto_id=producto_id)
+            .order_by('id').values_list('tipo', 'cantidad', 'saldo').first()
+        )
+        fecha = movimientos[0][4]
+        stock = saldo - cantidad if tipo == 'ENTRADA' else saldo + cantidad
+        costo = costo_actual or Decimal('0.00')
+        if stock > 0:
+            apertura = _Capa(None, None, fecha, stock, costo, stock)
+            capas.appendleft(apertura)
+            nuevas.append(apertura)
+    valor_fifo = sum((c.restante * c.costo for c in capas), CERO)
+
+    registros, consumos, ajustes = [], [], []
+    for mov_id, tipo, cantidad, importe, fecha in movimientos:
+        if tipo == 'APERTURA':
+            # Stock y valor al corte del archivo; sus capas FIFO siguieron abiertas sin movimiento
+            stock = cantidad
+            if cantidad > 0 and importe is not None:
+                costo = (importe / cantidad).quantize(CENTAVO)
+            valor = importe_fifo = CERO
+        elif tipo == 'ENTRADA':
+            valor = importe if importe is not None else cantidad * costo
+            stock, costo = _promedio(stock, costo, cantidad, valor)
+            importe_fifo = valor
+            if cantidad > 0:
+                capa = _Capa(None, mov_id, fecha, cantidad, valor / cantidad, cantidad)
+                capas.append(capa)
+                nuevas.append(capa)
+            elif capas:
+                # Ajuste de costo sin unidades: lo absorbe la capa abierta más reciente
+                capa = capas[-1]
+                ajustes.append((capa, mov_id, fecha, capa.costo))
+                capa.costo = (capa.restante * capa.costo + valor) / capa.restante
+                capa.cambio = True
+            else:
+                importe_fifo = CERO
+            valor_fifo += importe_fifo
+        else:
+            if importe is not None:
+                # Reducción de una compra: sale a su costo y de las capas más recientes
+                valor = importe
+                stock, costo = _promedio(stock, costo, -cantidad, -importe)
+            else:
+                valor = cantidad * costo
+                stock -= cantidad
+            tomados, faltante = _consumir(capas, cantidad, desde_el_final=importe is not None)
+            importe_capas = sum((unidades * capa.costo for capa, unidades in tomados), CERO)
+            consumos.extend((capa, mov_id, fecha, unidades) for capa, unidades in tomados)
+            valor_fifo -= importe_capas
+            # Unidades sin capa (el historial quedó en negativo): al promedio
+            importe_fifo = importe_capas + faltante * costo
+
+        registros.append(CostoMovimiento(
+            movimiento_id=mov_id, producto_id=producto_id, fecha=fecha, stock=stock,
+            costo_promedio=costo, valor_promedio=(stock * costo).quantize(CENTAVO),
+            importe_promedio=Decimal(valor).quantize(CENTAVO),
+            valor_fifo=valor_fifo.quantize(CENTAVO), importe_fifo=Decimal(importe_fifo).quantize(CENTAVO),
+        ))
+
+    #  Capas nuevas (bulk_create no devuelve ids en MySQL: se leen por movimiento)
+    CapaCosto.objects.bulk_create([
+        CapaCosto(producto_id=producto_id, movimiento_id=c.movimiento_id, fecha=c.fecha,
+                  cantidad=c.cantidad, costo_unitario=c.costo, restante=c.restante)
+        for c in nuevas
+    ], batch_size=1000)
+    if nuevas:
+        ids = dict(CapaCosto.objects.filter(producto_id=producto_id, fecha__gte=desde).values_list('movimiento_id', 'id'))
+        for c in nuevas:
+            c.id = ids[c.movimiento_id]
+    anteriores = [
+        CapaCosto(pk=c.id, restante=c.restante, costo_unitario=c.costo)
+        for c in abiertas if c.cambio
+    ]
+    if anteriores:
+        CapaCosto.objects.bulk_update(anteriores, ['restante', 'costo_unitario'], batch_size=500)
+    ConsumoCapa.objects.bulk_create(
+        [ConsumoCapa(capa_id=capa.id, movimiento_id=mov_id, fecha=fecha, cantidad=unidades)
+         for capa, mov_id, fecha, unidades in consumos],
+        batch_size=1000,
+    )
+    AjusteCapa.objects.bulk_create(
+        [AjusteCapa(capa_id=capa.id, movimiento_id=mov_id, fecha=fecha, costo_anterior=anterior)
+         for capa, mov_id, fecha, anterior in ajustes],
+        batch_size=1000,
+    )
+    CostoMovimiento.objects.bulk_create(registros, batch_size=1000)
+    return len(registros)
+
+
+def pendientes(productos=None):
+    """{producto_id: fecha del movimiento sin costo más antiguo}."""
+    filas = MovimientoInventario.objects.filter(costo__isnull=True)
+    if productos is not None:
+        filas = filas.filter(producto_id__in=productos)
+    return dict(filas.values('producto').annotate(desde=Min('fecha')).order_by('producto').values_list('producto', 'desde'))
+
+
+def actualizar(productos=None):
+    """Calcula el costo de los movimientos que aún no lo tienen (todos o de esos productos)."""
+    return sum(recostear(producto_id, desde) for producto_id, desde in pendientes(productos).items())
+
+
+def reconstruir(productos=None):
+    """Recalcula todo el historial (de todos los productos o de los indicados)."""
+    ids = productos if productos is not None else (
+        MovimientoInventario.objects.values_list('producto', flat=True).distinct().order_by('producto')
+    )
+    total = 0
+    for producto_id in list(ids):
+        inicio = MovimientoInventario.objects.filter(producto_id=producto_id).aggregate(inicio=Min('fecha'))['inicio']
+        if inicio is not None:
+            total += recostear(producto_id, inicio)
+    return total
+
+
+# ======================
+# CONSULTAS
+# ======================
+def _limite(fecha):
+    """Fin del día `fecha` (o un datetime tal cual)."""
+    if isinstance(fecha, datetime):
+        return fecha
+    return timezone.make_aware(datetime.combine(fecha + timedelta(days=1), time.min))
+
+
+def valuacion(fecha=None, metodo='promedio', productos=None):
+    """
+    Productos con su stock, valor y costo unitario al cierre de `fecha`
+    (hoy por defecto) según el método ('promedio' o 'fifo'), anotados como
+    stock_al, valor_al y costo_al. Un producto sin movimientos en el Kardex
+    se valúa con su stock y costo actuales. Solo lee: los movimientos que aún
+    no tienen costo (ver sin_costo) quedan fuera hasta que corra actualizar().
+    """
+    if metodo not in METODOS:
+        raise ValueError(f"Método de costeo no válido: {metodo}")
+    limite = _limite(fecha or timezone.localdate())
+    ultimo = (
+        CostoMovimiento.objects.filter(producto=OuterRef('pk'), fecha__lt=limite)
+        .order_by('-fecha', '-movimiento_id')
+    )
+    decimal = models.DecimalField(max_digits=16, decimal_places=2)
+    sin_kardex = ~Exists(MovimientoInventario.objects.filter(producto=OuterRef('pk')))
+    filas = (productos if productos is not None else Producto.objects.all()).annotate(
+        stock_al=Coalesce(
+            Subquery(ultimo.values('stock')[:1]),
+            Case(When(sin_kardex, then=F('stock')), output_field=decimal),
+            output_field=decimal,
+        ),
+        valor_al=Coalesce(
+            Subquery(ultimo.values(f'valor_{metodo}')[:1]),
+            Case(When(sin_kardex, then=F('stock') * F('costo')), output_field=decimal),
+            output_field=decimal,
+        ),
+    ).filter(stock_al__isnull=False)
+    return filas
+
+
+def sin_costo():
+    """Cuántos movimientos esperan a que actualizar() les calcule el costo."""
+    return MovimientoInventario.objects.filter(costo__isnull=True).count()
+
+
+def valor_total(filas):
+    """Suma del valor de una valuación."""
+    return filas.aggregate(total=Sum('valor_al'))['total'] or Decimal('0.00')
+
+
+def costo_de_referencias(salidas, reversiones=(), metodo='promedio'):
+    """
+    Costo de lo que sacaron del inventario los movimientos con referencia en
+    `salidas`, menos lo que devolvieron los de `reversiones`. Como
+    valuacion(), no cuenta lo que todavía no tiene costo.
+    """
+    if metodo not in METODOS:
+        raise ValueError(f"Método de costeo no válido: {metodo}")
+    referencias = [*salidas, *reversiones]
+    campo = f'importe_{metodo}'
+    datos = CostoMovimiento.objects.filter(movimiento__referencia__in=referencias).aggregate(
+        salidas=Sum(campo, filter=Q(movimiento__tipo='SALIDA', movimiento__referencia__in=salidas)),
+        devuelto=Sum(campo, filter=Q(movimiento__tipo='ENTRADA', movimiento__referencia__in=reversiones)),
+    )
+    return (datos['salidas'] or Decimal('0.00')) - (datos['devuelto'] or Decimal('0.00'))
+
+
+def costo_venta(venta, metodo='promedio'):
+    """Costo de lo vendido en una venta (menos lo devuelto al editarla o anularla)."""
+    return costo_de_referencias(
+        [f"Venta #{venta.numero_documento}"], [f"Reversión venta #{venta.numero_documento}"], metodo,
+    )
@@ -0,0 +1,136 @@
+"""
+Exportación del Kardex con memoria constante.
+
+Los movimientos se leen por bloques con cursor (proyectof.paginacion.recorrer)
+y se escriben a medida que llegan, sin armar la hoja completa en memoria:
+
+- CSV: cada bloque sale directo en la respuesta (StreamingHttpResponse);
+- XLSX: openpyxl en modo write_only, que vuelca cada fila a disco. Armar el
+  libro lleva tiempo, así que lo hace una tarea en segundo plano
+  (kardex/tareas.py) y se descarga desde la página de la tarea.
+"""
+import csv
+import tempfile
+from datetime import datetime, timedelta
+
+from django.utils.dateparse import parse_date
+from django.utils.timezone import is_aware, make_naive
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, numbers
+from productos.models import Producto
+from proyectof.paginacion import recorrer
+
+COLUMNAS = ('fecha', 'producto__nombre', 'tipo', 'cantidad', 'saldo', 'referencia')
+ENCABEZADOS = ["Fecha", "Producto", "Tipo", "Cantidad", "Saldo", "Referencia"]
+ANCHOS = [20, 30, 12, 12, 12, 40]
+ORDEN = ('-fecha', '-id')
+BLOQUE = 2000
+
+
+def filtrar_movimientos(movimientos, params):
+    """Filtros del listado del Kardex (producto, desde, hasta); params es request.GET o un dict."""
+    producto_id = params.get('producto')
+    fecha_inicio = params.get('fecha_inicio')
+    fecha_fin = params.get('fecha_fin')
+
+    # Filtro por producto
+    if producto_id:
+        movimientos = movimientos.filter(producto_id=producto_id)
+
+    # Filtro por fechas — ajustado para DateTimeField
+    if fecha_inicio:
+        fi = parse_date(fecha_inicio)
+        if fi:
+            movimientos = movimientos.filter(fecha__gte=datetime.combine(fi, datetime.min.time()))
+    if fecha_fin:
+        ff = parse_date(fecha_fin)
+        if ff:
+            movimientos = movimientos.filter(fecha__lt=datetime.combine(ff + timedelta(days=1), datetime.min.time()))
+    return movimientos
+
+
+def descripcion_filtros(params):
+    """Texto de los filtros aplicados para el encabezado de la hoja."""
+    texto = []
+    if params.get('producto'):
+        prod = Producto.objects.filter(pk=params['producto']).only('nombre').first()
+        if prod:
+            texto.append(f"Producto: {prod.nombre}")
+    if params.get('fecha_inicio'):
+        texto.append(f"Desde: {params['fecha_inicio']}")
+    if params.get('fecha_fin'):
+        texto.append(f"Hasta: {params['fecha_fin']}")
+    return " | ".join(texto)
+
+
+def filas(movimientos):
+    """(fecha local sin zona, producto, tipo, cantidad, saldo, referencia) de cada movimiento, por bloques."""
+    for m in recorrer(movimientos.values('id', *COLUMNAS), ORDEN, BLOQUE):
+        fecha = m['fecha']
+        if is_aware(fecha):
+            fecha = make_naive(fecha)
+        yield fecha, m['producto__nombre'], m['tipo'], m['cantidad'], m['saldo'], m['referencia'] or ""
+
+
+class _Linea:
+    """Destino de csv.writer que devuelve la línea escrita en lugar de guardarla."""
+
+    def write(self, texto):
+        return texto
+
+
+def csv_en_stream(movimientos):
+    """Genera el CSV por partes: una cadena por bloque de filas."""
+    escritor = csv.writer(_Linea())
+    # BOM: Excel abre el UTF-8 con tildes sin pedir la codificación
+    yield '\ufeff' + escritor.writerow(ENCABEZADOS)
+    partes = []
+    for fecha, *resto in filas(movimientos):
+        partes.append(escritor.writerow([fecha.strftime('%Y-%m-%d %H:%M'), *resto]))
+        if len(partes) >= BLOQUE:
+            yield ''.join(partes)
+            partes = []
+    if partes:
+        yield ''.join(partes)
+
+
+def xlsx(movimientos, filtros="", destino=None, avance=None):
+    """
+    Escribe el libro de Excel en `destino` (ruta o archivo; por defecto un
+    archivo temporal que se devuelve listo para leer). avance(filas) se
+    llama después de cada bloque.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Kardex")
+    for i, ancho in enumerate(ANCHOS):
+        ws.column_dimensions[chr(ord('A') + i)].width = ancho
+
+    def celda(valor, **estilo):
+        c = WriteOnlyCell(ws, value=valor)
+        for nombre, v in estilo.items():
+            setattr(c, nombre, v)
+        return c
+
+    negrita = Font(bold=True)
+    ws.append([celda("KARDEX DE PRODUCTOS", font=Font(bold=True, size=14))])
+    ws.append([filtros or "Sin filtros"])
+    ws.append([celda(e, font=negrita) for e in ENCABEZADOS])
+
+    # Una celda con formato por columna numérica, reutilizada: cada fila se escribe al agregarla
+    fecha = celda(None, number_format="dd/mm/yyyy hh:mm")
+    cantidad = celda(None, number_format=numbers.FORMAT_NUMBER_00)
+    saldo = celda(None, number_format=numbers.FORMAT_NUMBER_00)
+    escritas = 0
+    for valor_fecha, producto, tipo, valor_cantidad, valor_saldo, referencia in filas(movimientos):
+        fecha.value, cantidad.value, saldo.value = valor_fecha, valor_cantidad, valor_saldo
+        ws.append([fecha, producto, tipo, cantidad, saldo, referencia])
+        escritas += 1
+        if avance is not None and escritas % BLOQUE == 0:
+            avance(escritas)
+
+    archivo = destino if destino is not None else tempfile.TemporaryFile()
+    wb.save(archivo)
+    if destino is None:
+        archivo.seek(0)
+    return archivo
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from kardex.costos import actualizar, reconstruir
+
+
+class Command(BaseCommand):
+    help = "Calcula el historial de costos (promedio y FIFO) de los movimientos del Kardex que aún no lo tienen"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--producto', type=int, action='append',
+                            help="Solo este producto (se puede repetir)")
+        parser.add_argument('--todo', action='store_true',
+                            help="Recalcula todo el historial en lugar de solo lo pendiente")
+
+    def handle(self, *args, **options):
+        productos = options['producto']
+        if options['todo']:
+            total = reconstruir(productos)
+        else:
+            total = actualizar(productos)
+        self.stdout.write(self.style.SUCCESS(f"✓ Movimientos costeados: {total}"))
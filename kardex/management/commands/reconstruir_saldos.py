@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from kardex.saldos import reconstruir
+
+
+class Command(BaseCommand):
+    help = "Vuelve a armar el flujo diario y los cortes de saldo mensuales a partir del Kardex"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000,
+                            help="Filas por INSERT (por defecto 1000)")
+
+    def handle(self, *args, **options):
+        flujos, cortes = reconstruir(lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(f"✓ Flujos diarios: {flujos} · Cortes de saldo: {cortes}"))
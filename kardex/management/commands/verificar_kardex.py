@@ -0,0 +1,49 @@
+import os
+
+from django.core.management.base import BaseCommand
+from kardex.verificacion import BLOQUE, verificar
+
+
+class Command(BaseCommand):
+    help = "Recalcula el saldo del Kardex de cada producto y lo compara con los saldos guardados y el stock"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1,
+                            help="Procesos en paralelo (por defecto uno por CPU)")
+        parser.add_argument('--bloque', type=int, default=BLOQUE,
+                            help=f"Productos por bloque de trabajo (por defecto {BLOQUE})")
+        parser.add_argument('--producto', type=int, action='append',
+                            help="Solo este producto (se puede repetir)")
+        parser.add_argument('--corregir', action='store_true',
+                            help="Reescribe los saldos y el stock con los valores recalculados")
+        parser.add_argument('--mostrar', type=int, default=20,
+                            help="Diferencias a listar (por defecto 20)")
+
+    def handle(self, *args, **options):
+        resultado = verificar(
+            procesos=options['procesos'], corregir=options['corregir'],
+            productos=options['producto'], bloque=options['bloque'],
+        )
+        for d in resultado.divergencias[:options['mostrar']]:
+            self.stdout.write(
+                f"  Producto {d.producto_id}: {d.movimientos} saldos distintos"
+                + (f" (desde el movimiento {d.primer_movimiento})" if d.primer_movimiento else "")
+                + f" · stock {d.stock}, según el Kardex {d.calculado}"
+            )
+        if len(resultado.divergencias) > options['mostrar']:
+            self.stdout.write(f"  … y {len(resultado.divergencias) - options['mostrar']} productos más")
+
+        resumen = f"Productos: {resultado.productos} · Movimientos: {resultado.movimientos}"
+        if not resultado.divergencias:
+            self.stdout.write(self.style.SUCCESS(f"✓ {resumen} · sin diferencias"))
+        elif options['corregir']:
+            self.stdout.write(self.style.SUCCESS(
+                f"✓ {resumen} · Saldos corregidos: {resultado.saldos_corregidos}"
+                f" · Stocks corregidos: {resultado.stocks_corregidos}"
+            ))
+            if resultado.stocks_corregidos:
+                self.stdout.write("  Corra reconstruir_saldos para rehacer los cortes de saldo con el stock corregido.")
+        else:
+            self.stdout.write(self.style.WARNING(
+                f"{resumen} · {len(resultado.divergencias)} productos con diferencias (use --corregir)"
+            ))
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kardex', '0002_alter_movimientoinventario_options_and_more'),
+        ('productos', '0002_producto_producto_nombre_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['fecha', 'id'], name='movimiento_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['producto', 'fecha', 'id'], name='movimiento_prod_fecha_idx'),
+        ),
+    ]
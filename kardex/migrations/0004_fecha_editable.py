@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kardex', '0003_movimientoinventario_movimiento_fecha_id_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='movimientoinventario',
+            name='fecha',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,104 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kardex', '0004_fecha_editable'),
+        ('productos', '0004_precio_lista'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CapaCosto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField()),
+                ('cantidad', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('costo_unitario', models.DecimalField(decimal_places=4, max_digits=14)),
+                ('restante', models.DecimalField(decimal_places=2, max_digits=14)),
+            ],
+            options={
+                'verbose_name': 'Capa de costo',
+                'verbose_name_plural': 'Capas de costo',
+            },
+        ),
+        migrations.CreateModel(
+            name='ConsumoCapa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField()),
+                ('cantidad', models.DecimalField(decimal_places=2, max_digits=14)),
+            ],
+            options={
+                'verbose_name': 'Consumo de capa',
+                'verbose_name_plural': 'Consumos de capa',
+            },
+        ),
+        migrations.CreateModel(
+            name='CostoMovimiento',
+            fields=[
+                ('movimiento', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='costo', serialize=False, to='kardex.movimientoinventario')),
+                ('fecha', models.DateTimeField()),
+                ('stock', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('costo_promedio', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('valor_promedio', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('importe_promedio', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('valor_fifo', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('importe_fifo', models.DecimalField(decimal_places=2, max_digits=16)),
+            ],
+            options={
+                'verbose_name': 'Costo por movimiento',
+                'verbose_name_plural': 'Costos por movimiento',
+            },
+        ),
+        migrations.AddField(
+            model_name='movimientoinventario',
+            name='importe',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['referencia'], name='movimiento_referencia_idx'),
+        ),
+        migrations.AddField(
+            model_name='capacosto',
+            name='movimiento',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='capa', to='kardex.movimientoinventario'),
+        ),
+        migrations.AddField(
+            model_name='capacosto',
+            name='producto',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='productos.producto'),
+        ),
+        migrations.AddField(
+            model_name='consumocapa',
+            name='capa',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='consumos', to='kardex.capacosto'),
+        ),
+        migrations.AddField(
+            model_name='consumocapa',
+            name='movimiento',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='consumos', to='kardex.movimientoinventario'),
+        ),
+        migrations.AddField(
+            model_name='costomovimiento',
+            name='producto',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='productos.producto'),
+        ),
+        migrations.AddIndex(
+            model_name='capacosto',
+            index=models.Index(fields=['producto', 'fecha', 'id'], name='capa_prod_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consumocapa',
+            index=models.Index(fields=['capa', 'fecha'], name='consumo_capa_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='costomovimiento',
+            index=models.Index(fields=['producto', 'fecha', 'movimiento'], name='costo_prod_fecha_idx'),
+        ),
+    ]
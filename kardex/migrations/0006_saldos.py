@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kardex', '0005_costos'),
+        ('productos', '0004_precio_lista'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlujoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('entradas', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('salidas', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='productos.producto')),
+            ],
+            options={
+                'verbose_name': 'Flujo diario',
+                'verbose_name_plural': 'Flujos diarios',
+                'constraints': [models.UniqueConstraint(fields=('producto', 'fecha'), name='flujo_diario_unico')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SaldoCorte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('saldo', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='productos.producto')),
+            ],
+            options={
+                'verbose_name': 'Corte de saldo',
+                'verbose_name_plural': 'Cortes de saldo',
+                'constraints': [models.UniqueConstraint(fields=('producto', 'fecha'), name='saldo_corte_unico')],
+            },
+        ),
+    ]
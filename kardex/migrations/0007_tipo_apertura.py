@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kardex', '0006_saldos'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='movimientoinventario',
+            name='tipo',
+            field=models.CharField(choices=[('ENTRADA', 'Entrada'), ('SALIDA', 'Salida'), ('APERTURA', 'Saldo inicial')], max_length=10),
+        ),
+    ]
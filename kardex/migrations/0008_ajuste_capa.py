@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kardex', '0007_tipo_apertura'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AjusteCapa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField()),
+                ('costo_anterior', models.DecimalField(decimal_places=4, max_digits=14)),
+                ('capa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ajustes', to='kardex.capacosto')),
+                ('movimiento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ajustes_capa', to='kardex.movimientoinventario')),
+            ],
+            options={
+                'verbose_name': 'Ajuste de capa',
+                'verbose_name_plural': 'Ajustes de capa',
+                'indexes': [models.Index(fields=['capa', 'fecha'], name='ajuste_capa_fecha_idx')],
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from productos.models import Producto
 
 
@@ -6,6 +7,8 @@ class MovimientoInventario(models.Model):
     TIPO_MOVIMIENTO = [
         ('ENTRADA', 'Entrada'),
         ('SALIDA', 'Salida'),
+        # Stock y valor al corte de un período archivado (ver archivo/utils.py)
+        ('APERTURA', 'Saldo inicial'),
     ]
 
     producto = models.ForeignKey(Producto, on_delete=models.CASCADE)
@@ -14,7 +17,9 @@ class MovimientoInventario(models.Model):
     saldo = models.DecimalField(max_digits=12, decimal_places=2, default=0)  #  saldo acumulado
     referencia = models.CharField(max_length=255, blank=True, null=True)      #  origen del movimiento
     descripcion = models.CharField(max_length=255, blank=True, null=True)     #  detalle opcional
-    fecha = models.DateTimeField(auto_now_add=True)
+    #  Valor del movimiento al costo de la compra; vacío = al costo vigente del producto
+    importe = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True)
+    fecha = models.DateTimeField(default=timezone.now)
 
     def __str__(self):
         return f"{self.producto} - {self.tipo} ({self.cantidad})"
@@ -23,3 +28,120 @@ class MovimientoInventario(models.Model):
         verbose_name = "Movimiento de Inventario"
         verbose_name_plural = "Movimientos de Inventario"
         ordering = ['-fecha']
+        # Paginación por cursor (fecha, id), con y sin filtro de producto
+        indexes = [
+            models.Index(fields=['fecha', 'id'], name='movimiento_fecha_id_idx'),
+            models.Index(fields=['producto', 'fecha', 'id'], name='movimiento_prod_fecha_idx'),
+            # Movimientos de un documento (p.ej. costo de una venta)
+            models.Index(fields=['referencia'], name='movimiento_referencia_idx'),
+        ]
+
+
+# ======================
+# FLUJOS Y CORTES DE SALDO (los mantiene kardex/saldos.py al registrar movimientos)
+# ======================
+class FlujoDiario(models.Model):
+    """Unidades que entraron y salieron de un producto en un día."""
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='+')
+    fecha = models.DateField()
+    entradas = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    salidas = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.producto} {self.fecha}: +{self.entradas} / -{self.salidas}"
+
+    class Meta:
+        verbose_name = "Flujo diario"
+        verbose_name_plural = "Flujos diarios"
+        constraints = [models.UniqueConstraint(fields=['producto', 'fecha'], name='flujo_diario_unico')]
+
+
+class SaldoCorte(models.Model):
+    """Stock de un producto al cierre de un día de corte (último día de cada mes)."""
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='+')
+    fecha = models.DateField()
+    saldo = models.DecimalField(max_digits=14, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.producto} al {self.fecha}: {self.saldo}"
+
+    class Meta:
+        verbose_name = "Corte de saldo"
+        verbose_name_plural = "Cortes de saldo"
+        constraints = [models.UniqueConstraint(fields=['producto', 'fecha'], name='saldo_corte_unico')]
+
+
+# ======================
+# HISTORIAL DE COSTOS (lo calcula kardex/costos.py a partir del Kardex)
+# ======================
+class CostoMovimiento(models.Model):
+    """Costo y valor del inventario de un producto inmediatamente después de un movimiento."""
+    movimiento = models.OneToOneField(
+        MovimientoInventario, on_delete=models.CASCADE, primary_key=True, related_name='costo'
+    )
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='+')
+    fecha = models.DateTimeField()
+    stock = models.DecimalField(max_digits=14, decimal_places=2)
+    # Promedio ponderado (el mismo que Producto.costo)
+    costo_promedio = models.DecimalField(max_digits=12, decimal_places=2)
+    valor_promedio = models.DecimalField(max_digits=16, decimal_places=2)
+    importe_promedio = models.DecimalField(max_digits=16, decimal_places=2)
+    # Primeras entradas, primeras salidas (capas abiertas)
+    valor_fifo = models.DecimalField(max_digits=16, decimal_places=2)
+    importe_fifo = models.DecimalField(max_digits=16, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.producto_id} @ {self.fecha}: {self.stock} × {self.costo_promedio}"
+
+    class Meta:
+        verbose_name = "Costo por movimiento"
+        verbose_name_plural = "Costos por movimiento"
+        # Consultas "al día X": último registro del producto con fecha <= X
+        indexes = [models.Index(fields=['producto', 'fecha', 'movimiento'], name='costo_prod_fecha_idx')]
+
+
+class CapaCosto(models.Model):
+    """Capa FIFO: unidades que entraron juntas a un mismo costo (sin movimiento = saldo inicial)."""
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='+')
+    movimiento = models.OneToOneField(
+        MovimientoInventario, on_delete=models.CASCADE, null=True, blank=True, related_name='capa'
+    )
+    fecha = models.DateTimeField()
+    cantidad = models.DecimalField(max_digits=14, decimal_places=2)
+    costo_unitario = models.DecimalField(max_digits=14, decimal_places=4)
+    # Unidades que aún no consumió ninguna salida
+    restante = models.DecimalField(max_digits=14, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.producto_id} @ {self.fecha}: {self.restante}/{self.cantidad} × {self.costo_unitario}"
+
+    class Meta:
+        verbose_name = "Capa de costo"
+        verbose_name_plural = "Capas de costo"
+        indexes = [models.Index(fields=['producto', 'fecha', 'id'], name='capa_prod_fecha_idx')]
+
+
+class ConsumoCapa(models.Model):
+    """Unidades de una capa que se llevó una salida."""
+    capa = models.ForeignKey(CapaCosto, on_delete=models.CASCADE, related_name='consumos')
+    movimiento = models.ForeignKey(MovimientoInventario, on_delete=models.CASCADE, related_name='consumos')
+    fecha = models.DateTimeField()
+    cantidad = models.DecimalField(max_digits=14, decimal_places=2)
+
+    class Meta:
+        verbose_name = "Consumo de capa"
+        verbose_name_plural = "Consumos de capa"
+        indexes = [models.Index(fields=['capa', 'fecha'], name='consumo_capa_fecha_idx')]
+
+
+class AjusteCapa(models.Model):
+    """Ajuste de costo sin unidades que absorbió una capa, con el costo que tenía antes."""
+    capa = models.ForeignKey(CapaCosto, on_delete=models.CASCADE, related_name='ajustes')
+    movimiento = models.ForeignKey(MovimientoInventario, on_delete=models.CASCADE, related_name='ajustes_capa')
+    fecha = models.DateTimeField()
+    costo_anterior = models.DecimalField(max_digits=14, decimal_places=4)
+
+    class Meta:
+        verbose_name = "Ajuste de capa"
+        verbose_name_plural = "Ajustes de capa"
+        indexes = [models.Index(fields=['capa', 'fecha'], name='ajuste_capa_fecha_idx')]
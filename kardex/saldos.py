@@ -0,0 +1,210 @@
+"""
+Stock de los productos a una fecha sin recorrer el Kardex.
+
+Se mantienen dos tablas dentro de la misma transacción que registra los
+movimientos (ver kardex.utils.registrar_movimientos):
+
+- FlujoDiario: unidades que entraron y salieron de cada producto por día;
+- SaldoCorte: stock de cada producto al cierre del último día de cada mes.
+  El corte del mes anterior se crea con el primer movimiento del producto
+  en el mes, a partir del stock previo al lote, y un movimiento con fecha
+  atrasada corre los cortes posteriores a su día.
+
+El stock al día D es el último corte <= D más los flujos entre el corte y D
+(a lo sumo los días con movimiento de un mes). Un producto sin cortes hasta
+D parte del stock actual y descuenta los flujos posteriores a D.
+"""
+from datetime import timedelta
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import models, transaction
+from django.db.models import Case, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+from productos.models import Producto
+from .models import FlujoDiario, MovimientoInventario, SaldoCorte
+
+_DECIMAL = models.DecimalField(max_digits=14, decimal_places=2)
+
+
+def fin_de_mes_anterior(fecha):
+    """Día de corte previo a `fecha`: el último día del mes anterior."""
+    return fecha.replace(day=1) - timedelta(days=1)
+
+
+# ======================
+# MANTENIMIENTO (al registrar movimientos)
+# ======================
+def registrar(registros, stock_previo):
+    """
+    Suma al flujo diario y a los cortes los movimientos recién creados.
+
+    - registros: MovimientoInventario del lote, con su fecha ya resuelta.
+    - stock_previo: {producto_id: stock antes del lote}.
+
+    Se llama dentro de la transacción de registrar_movimientos, con las filas
+    de los productos ya bloqueadas por la reserva de stock.
+    """
+    flujos = {}  # (producto_id, día): [entradas, salidas]
+    for r in registros:
+        if not r.cantidad:
+            continue
+        fila = flujos.setdefault((r.producto_id, timezone.localdate(r.fecha)), [0, 0])
+        fila[0 if r.tipo == 'ENTRADA' else 1] += r.cantidad
+    if not flujos:
+        return
+
+    corte = fin_de_mes_anterior(timezone.localdate())
+    productos = sorted({producto_id for producto_id, _ in flujos})
+
+    #  Corte del mes anterior para los productos que todavía no lo tienen.
+    #  Se calcula antes de sumar este lote: stock previo menos lo posterior al corte.
+    con_corte = set(
+        SaldoCorte.objects.filter(producto_id__in=productos, fecha=corte).values_list('producto_id', flat=True)
+    )
+    faltan = [p for p in productos if p not in con_corte]
+    if faltan:
+        posteriores = dict(
+            FlujoDiario.objects.filter(producto_id__in=faltan, fecha__gt=corte)
+            .values('producto_id')
+            .annotate(neto=Sum(F('entradas') - F('salidas')))
+            .values_list('producto_id', 'neto')
+        )
+        SaldoCorte.objects.bulk_create([
+            SaldoCorte(producto_id=p, fecha=corte, saldo=(stock_previo.get(p) or 0) - (posteriores.get(p) or 0))
+            for p in faltan
+        ], ignore_conflicts=True)
+
+    #  Movimientos con fecha atrasada: corren los cortes desde su día.
+    #  Los cortes llegan hasta el mes anterior, así que lo del mes en curso no toca ninguno.
+    atrasados = {}  # día: {producto_id: neto}
+    for (producto_id, dia), (entradas, salidas) in flujos.items():
+        if dia <= corte and entradas != salidas:
+            netos = atrasados.setdefault(dia, {})
+            netos[producto_id] = netos.get(producto_id, 0) + entradas - salidas
+    for dia, netos in sorted(atrasados.items()):
+        (
+            SaldoCorte.objects.filter(producto_id__in=sorted(netos), fecha__gte=dia)
+            .order_by('producto_id', 'fecha')
+            .update(saldo=F('saldo') + Case(
+                *[When(producto_id=p, then=Value(neto)) for p, neto in netos.items()],
+                output_field=_DECIMAL,
+            ))
+        )
+
+    _acumular_flujos(flujos)
+
+
+def _acumular_flujos(flujos):
+    """Crea las filas (producto, día) que falten y les suma entradas y salidas con un solo UPDATE."""
+    claves = sorted(flujos)
+    FlujoDiario.objects.bulk_create(
+        [FlujoDiario(producto_id=p, fecha=dia) for p, dia in claves], ignore_conflicts=True
+    )
+    columnas = {}
+    for i, columna in enumerate(('entradas', 'salidas')):
+        casos = [
+            When(producto_id=p, fecha=dia, then=Value(flujos[p, dia][i]))
+            for p, dia in claves if flujos[p, dia][i]
+        ]
+        if casos:
+            columnas[columna] = F(columna) + Case(*casos, default=Value(0), output_field=_DECIMAL)
+    (
+        FlujoDiario.objects
+        .filter(producto_id__in={p for p, _ in claves}, fecha__in={dia for _, dia in claves})
+        .order_by('producto_id', 'fecha')
+        .update(**columnas)
+    )
+
+
+# ======================
+# CONSULTAS
+# ======================
+def existencia(producto_id, fecha):
+    """Stock del producto al cierre de `fecha`: un corte y los flujos que le siguen."""
+    corte = (
+        SaldoCorte.objects.filter(producto_id=producto_id, fecha__lte=fecha)
+        .order_by('-fecha').values_list('fecha', 'saldo').first()
+    )
+    flujos = FlujoDiario.objects.filter(producto_id=producto_id)
+    neto = Sum(F('entradas') - F('salidas'))
+    if corte:
+        tramo = flujos.filter(fecha__gt=corte[0], fecha__lte=fecha).aggregate(neto=neto)['neto']
+        return corte[1] + (tramo or 0)
+    stock = Producto.objects.filter(pk=producto_id).values_list('stock', flat=True).first() or 0
+    posteriores = flujos.filter(fecha__gt=fecha).aggregate(neto=neto)['neto']
+    return stock - (posteriores or 0)
+
+
+def existencias(fecha, productos=None):
+    """
+    Productos anotados con existencia_al: su stock al cierre de `fecha`,
+    calculado para todos en una sola consulta con el mismo criterio que
+    existencia().
+    """
+    cortes = SaldoCorte.objects.filter(producto=OuterRef('pk'), fecha__lte=fecha).order_by('-fecha')
+
+    def neto(**filtros):
+        return Subquery(
+            FlujoDiario.objects.filter(producto=OuterRef('pk'), **filtros)
+            .values('producto').annotate(neto=Sum(F('entradas') - F('salidas'))).values('neto'),
+            output_field=_DECIMAL,
+        )
+
+    cero = Value(0, output_field=_DECIMAL)
+    return (productos if productos is not None else Producto.objects.all()).annotate(
+        corte_fecha=Subquery(cortes.values('fecha')[:1]),
+        corte_saldo=Subquery(cortes.values('saldo')[:1], output_field=_DECIMAL),
+    ).annotate(
+        existencia_al=Case(
+            When(corte_fecha__isnull=False, then=F('corte_saldo') + Coalesce(
+                neto(fecha__gt=OuterRef('corte_fecha'), fecha__lte=fecha), cero
+            )),
+            default=F('stock') - Coalesce(neto(fecha__gt=fecha), cero),
+            output_field=_DECIMAL,
+        ),
+    )
+
+
+# ======================
+# RECONSTRUCCIÓN
+# ======================
+@transaction.atomic
+def reconstruir(lote=1000):
+    """
+    Vuelve a armar flujos y cortes desde el Kardex (para datos anteriores a
+    estas tablas o tras corregir movimientos a mano). Los cortes se calculan
+    hacia atrás desde el stock actual, uno al final del mes previo a cada mes
+    con movimientos. Devuelve (flujos, cortes) creados.
+    """
+    FlujoDiario.objects.all().delete()
+    SaldoCorte.objects.all().delete()
+
+    filas = (
+        MovimientoInventario.objects.filter(tipo__in=('ENTRADA', 'SALIDA')).exclude(cantidad=0)
+        .annotate(dia=TruncDate('fecha'))
+        .values('producto_id', 'dia')
+        .annotate(
+            entradas=Sum('cantidad', filter=Q(tipo='ENTRADA'), default=0),
+            salidas=Sum('cantidad', filter=Q(tipo='SALIDA'), default=0),
+        )
+        .order_by('producto_id', '-dia')
+    )
+    stocks = dict(Producto.objects.values_list('pk', 'stock'))
+    flujos, cortes = [], []
+    for producto_id, grupo in groupby(filas.iterator(), key=itemgetter('producto_id')):
+        saldo = stocks.get(producto_id) or 0
+        corte = None
+        for fila in grupo:
+            if corte is not None and fila['dia'] <= corte:
+                cortes.append(SaldoCorte(producto_id=producto_id, fecha=corte, saldo=saldo))
+            flujos.append(FlujoDiario(producto_id=producto_id, fecha=fila['dia'],
+                                      entradas=fila['entradas'], salidas=fila['salidas']))
+            saldo -= fila['entradas'] - fila['salidas']
+            corte = fin_de_mes_anterior(fila['dia'])
+        cortes.append(SaldoCorte(producto_id=producto_id, fecha=corte, saldo=saldo))
+
+    FlujoDiario.objects.bulk_create(flujos, batch_size=lote)
+    SaldoCorte.objects.bulk_create(cortes, batch_size=lote)
+    return len(flujos), len(cortes)
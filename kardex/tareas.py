@@ -0,0 +1,34 @@
+from tareas.utils import tarea
+from . import costos, exportacion, saldos, verificacion
+from .models import MovimientoInventario
+
+
+@tarea('kardex.exportar_excel', "Exportar Kardex a Excel")
+def exportar_excel(tarea, filtros):
+    movimientos = exportacion.filtrar_movimientos(MovimientoInventario.objects.all(), filtros)
+    total = movimientos.count()
+    nombre = f"kardex_producto_{filtros['producto']}.xlsx" if filtros.get('producto') else "kardex.xlsx"
+    exportacion.xlsx(
+        movimientos,
+        exportacion.descripcion_filtros(filtros),
+        destino=tarea.archivo_resultado(nombre),
+        avance=lambda filas: tarea.avanzar(99 * filas // max(total, 1), f"{filas} de {total} movimientos"),
+    )
+    return f"{total} movimientos exportados"
+
+
+@tarea('kardex.actualizar_costos', "Actualizar historial de costos", manual=True)
+def actualizar_costos(tarea):
+    return f"Movimientos costeados: {costos.actualizar()}"
+
+
+@tarea('kardex.reconstruir_saldos', "Reconstruir flujos diarios y cortes de saldo", manual=True)
+def reconstruir_saldos(tarea):
+    flujos, cortes = saldos.reconstruir()
+    return f"Flujos diarios: {flujos} · Cortes de saldo: {cortes}"
+
+
+@tarea('kardex.verificar', "Verificar saldos del Kardex contra el stock", manual=True)
+def verificar(tarea):
+    resultado = verificacion.verificar()
+    return f"Productos: {resultado.productos} · con diferencias: {len(resultado.divergencias)}"
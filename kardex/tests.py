@@ -1,3 +1,171 @@
-from django.test import TestCase
+import csv
+import io
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+from compras.models import Compra, DetalleCompra
+from compras.services import registrar_compra
+from proyectof.testing import PruebaVistas, registrar_consultas
+from productos.models import Producto
+from tareas.models import Tarea
+from tareas.utils import ejecutar, reclamar
+from . import costos, exportacion, saldos, verificacion
+from .models import CapaCosto, CostoMovimiento, FlujoDiario, MovimientoInventario, SaldoCorte
+from .utils import Movimiento, registrar_movimientos
+
+
+class PresupuestoVistasTests(PruebaVistas):
+    def test_listado(self):
+        self.assertPresupuesto(4, reverse('kardex:kardex_list'))
+
+    def test_valuacion(self):
+        # Solo lee el historial de costos: lo pendiente lo calcula la tarea (ver kardex/costos.py)
+        self.assertPresupuesto(5, reverse('kardex:kardex_valuacion'), {'metodo': 'fifo'})
+
+    def test_existencias(self):
+        self.assertPresupuesto(3, reverse('kardex:kardex_existencias'),
+                               {'fecha': (timezone.localdate() - timedelta(days=10)).isoformat()})
+
+
+class ExistenciasTests(PruebaVistas):
+    def recorrer_kardex(self, fecha):
+        """Stock al cierre de `fecha` sumando todos los movimientos: lo que los cortes evitan."""
+        totales = {}
+        for producto_id, tipo, cantidad, momento in MovimientoInventario.objects.values_list(
+                'producto_id', 'tipo', 'cantidad', 'fecha'):
+            if timezone.localdate(momento) <= fecha:
+                signo = 1 if tipo == 'ENTRADA' else -1
+                totales[producto_id] = totales.get(producto_id, 0) + signo * cantidad
+        return totales
+
+    def comprobar(self, fechas):
+        for fecha in fechas:
+            esperado = self.recorrer_kardex(fecha)
+            for p in saldos.existencias(fecha):
+                self.assertEqual(p.existencia_al, esperado.get(p.pk, 0), f"{p} al {fecha}")
+            producto = self.datos['productos'][0]
+            self.assertEqual(saldos.existencia(producto.pk, fecha), esperado.get(producto.pk, 0))
+
+    def test_compra_atrasada_corre_los_cortes(self):
+        hoy = timezone.localdate()
+        productos = self.datos['productos']
+        compra = Compra(proveedor_fk=self.datos['proveedores'][0], numero_factura="F-ATRASADA",
+                        encargado=self.datos['usuario'], fecha=hoy - timedelta(days=75))
+        registrar_compra(compra, [DetalleCompra(producto=productos[0], cantidad=Decimal('7'),
+                                                costo_unitario=Decimal('4.00'))])
+        self.assertTrue(SaldoCorte.objects.filter(producto=productos[0]).exists())
+        fechas = [hoy - timedelta(days=d) for d in (90, 75, 40, 20, 5, 0)]
+        self.comprobar(fechas)
+
+        # La reconstrucción llega a los mismos saldos
+        saldos.reconstruir()
+        self.assertTrue(FlujoDiario.objects.exists())
+        self.comprobar(fechas)
+
+
+class CostosTests(PruebaVistas):
+    def test_recosteo_restaura_el_costo_de_la_capa(self):
+        ahora = timezone.now()
+        base = self.datos['productos'][0]
+        producto = Producto.objects.create(nombre="Producto costeo", categoria=base.categoria,
+                                           unidad_medida=base.unidad_medida, precio=Decimal('20.00'))
+        registrar_movimientos([Movimiento(producto, 'ENTRADA', 10, "Compra #C-1", ahora - timedelta(days=10),
+                                          Decimal('100.00'))])
+        costos.actualizar([producto.pk])
+
+        # Se corrige el costo de la compra: lo absorbe su capa
+        registrar_movimientos([Movimiento(producto, 'ENTRADA', 0, "Ajuste costo compra #C-1",
+                                          ahora - timedelta(days=5), Decimal('20.00'))])
+        costos.actualizar([producto.pk])
+        capa = CapaCosto.objects.get(producto=producto)
+        self.assertEqual(capa.costo_unitario, Decimal('12.0000'))
+
+        # Una salida anterior al ajuste obliga a recostear desde ella: la capa
+        # vuelve al costo de antes del ajuste y lo recibe una sola vez
+        registrar_movimientos([Movimiento(producto, 'SALIDA', 2, "Venta #V-1", ahora - timedelta(days=7))])
+        costos.actualizar([producto.pk])
+        capa.refresh_from_db()
+        self.assertEqual((capa.restante, capa.costo_unitario), (Decimal('8.00'), Decimal('12.5000')))
+        self.assertEqual(CostoMovimiento.objects.get(movimiento__referencia="Venta #V-1").importe_fifo,
+                         Decimal('20.00'))
+
+        costos.recostear(producto.pk, ahora - timedelta(days=5))
+        capa.refresh_from_db()
+        self.assertEqual(capa.costo_unitario, Decimal('12.5000'))
+        costos.reconstruir([producto.pk])
+        self.assertEqual(CapaCosto.objects.get(producto=producto).costo_unitario, Decimal('12.5000'))
+
+    def test_el_registro_encola_el_costeo(self):
+        producto = self.datos['productos'][0]
+        with self.captureOnCommitCallbacks(execute=True):
+            registrar_movimientos([(producto, 'ENTRADA', 3, "Compra #C-2")])
+            registrar_movimientos([(producto, 'ENTRADA', 2, "Compra #C-3")])
+        pendientes = Tarea.objects.filter(tipo='kardex.actualizar_costos', estado=Tarea.PENDIENTE)
+        self.assertEqual(pendientes.count(), 1)
+
+        # La valuación no calcula costos: muestra cuántos movimientos esperan
+        respuesta = self.client.get(reverse('kardex:kardex_valuacion'))
+        self.assertEqual(respuesta.context['sin_costo'], costos.sin_costo())
+        self.assertGreater(respuesta.context['sin_costo'], 0)
+        ejecutar(reclamar("pruebas"))
+        self.assertEqual(costos.sin_costo(), 0)
+
+
+class ExportacionTests(PruebaVistas):
+    def test_csv_por_bloques(self):
+        total = MovimientoInventario.objects.count()
+        with mock.patch.object(exportacion, 'BLOQUE', 40), registrar_consultas() as registro:
+            respuesta = self.client.get(reverse('kardex:kardex_export_excel'), {'formato': 'csv'})
+            contenido = b''.join(respuesta.streaming_content).decode('utf-8-sig')
+        filas = list(csv.reader(io.StringIO(contenido)))
+        self.assertEqual(filas[0], exportacion.ENCABEZADOS)
+        self.assertEqual(len(filas) - 1, total)
+        # Una consulta por bloque de 40 (más la sesión y el usuario), nunca una por fila
+        bloques = [c for c in registro.consultas if 'kardex_movimientoinventario' in c.sql]
+        self.assertEqual(len(bloques), total // 40 + 1)
+
+    def test_excel(self):
+        producto = self.datos['productos'][0]
+        ruta = Path(self.enterContext(tempfile.TemporaryDirectory())) / "kardex.xlsx"
+        movimientos = exportacion.filtrar_movimientos(MovimientoInventario.objects.all(), {'producto': producto.pk})
+        exportacion.xlsx(movimientos, destino=ruta)
+        hoja = load_workbook(ruta, read_only=True).active
+        filas = list(hoja.iter_rows(min_row=4, values_only=True))
+        self.assertEqual(len(filas), MovimientoInventario.objects.filter(producto=producto).count())
+        self.assertEqual(filas[0][1], producto.nombre)
+
+
+class VerificacionTests(PruebaVistas):
+    def test_sin_diferencias(self):
+        resultado = verificacion.verificar(bloque=7)
+        self.assertEqual(resultado.divergencias, [])
+        self.assertEqual(resultado.movimientos, MovimientoInventario.objects.count())
+
+    def test_detecta_y_corrige(self):
+        producto, otro = self.datos['productos'][:2]
+        movimiento = MovimientoInventario.objects.filter(producto=producto).order_by('id')[1]
+        MovimientoInventario.objects.filter(pk=movimiento.pk).update(saldo=movimiento.saldo + 7)
+        # Stock escrito a mano, sin movimiento en el Kardex
+        Producto.objects.filter(pk=otro.pk).update(stock=otro.stock + 3)
+
+        resultado = verificacion.verificar(bloque=7)
+        self.assertEqual(
+            {d.producto_id: (d.movimientos, d.primer_movimiento) for d in resultado.divergencias},
+            {producto.pk: (1, movimiento.pk), otro.pk: (0, None)},
+        )
+
+        salida = io.StringIO()
+        call_command('verificar_kardex', '--procesos', '1', '--corregir', stdout=salida)
+        self.assertIn("Saldos corregidos: 1 · Stocks corregidos: 1", salida.getvalue())
+        movimiento_corregido = MovimientoInventario.objects.get(pk=movimiento.pk)
+        self.assertEqual(movimiento_corregido.saldo, movimiento.saldo)
+        otro.refresh_from_db()
+        self.assertEqual(otro.stock, MovimientoInventario.objects.filter(producto=otro).latest('id').saldo)
+        self.assertEqual(verificacion.verificar().divergencias, [])
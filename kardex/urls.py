@@ -5,5 +5,7 @@ app_name = "kardex"
 
 urlpatterns = [
     path("", views.kardex_list, name="kardex_list"),
-    path("exportar/", views.kardex_export_excel, name="kardex_export_excel"),  # Exportar a Excel
+    path("valuacion/", views.kardex_valuacion, name="kardex_valuacion"),
+    path("existencias/", views.kardex_existencias, name="kardex_existencias"),
+    path("exportar/", views.kardex_export_excel, name="kardex_export_excel"),  # Exportar a Excel / CSV
 ]
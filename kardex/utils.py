@@ -1,37 +1,144 @@
+from collections import namedtuple
+
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
 from django.utils import timezone
+from kardex import saldos as saldos_al_dia
 from kardex.models import MovimientoInventario
+from productos.models import Producto
+from tareas.utils import encolar_unica
+
+
+# Un movimiento pendiente de registrar: (producto, tipo, cantidad, referencia[, fecha, importe])
+Movimiento = namedtuple(
+    'Movimiento', ['producto', 'tipo', 'cantidad', 'referencia', 'fecha', 'importe'], defaults=(None, None)
+)
+
+
+class StockInsuficiente(ValidationError):
+    """Una SALIDA dejaría el stock del producto en negativo."""
+
+    def __init__(self, producto, disponible):
+        self.producto = producto
+        self.disponible = disponible
+        super().__init__({
+            'cantidad': f"Stock insuficiente. Solo hay {disponible} unidades disponibles."
+        })
+
+
+class _Faltante(Exception):
+    pass
+
 
 def registrar_movimiento(producto, tipo, cantidad, referencia):
     """
     Registra un movimiento en el Kardex.
     tipo = 'ENTRADA' o 'SALIDA'
+
+    Es un lote de un solo movimiento (ver registrar_movimientos): se mantiene
+    para el código que todavía registra de a uno. Devuelve el movimiento
+    creado o None si no había nada que registrar.
     """
+    registros = registrar_movimientos([(producto, tipo, cantidad, referencia)])
+    return registros[0] if registros else None
 
-    if not producto or not cantidad:
-        return
-
-    #  Forzamos a obtener el stock real desde la base de datos
-    producto.refresh_from_db(fields=['stock'])
-
-    saldo_anterior = producto.stock or 0
-
-    if tipo == 'ENTRADA':
-        nuevo_saldo = saldo_anterior + cantidad
-    elif tipo == 'SALIDA':
-        nuevo_saldo = saldo_anterior - cantidad
-    else:
-        raise ValueError("Tipo de movimiento no válido. Use 'ENTRADA' o 'SALIDA'.")
-
-    #  Registrar el movimiento
-    MovimientoInventario.objects.create(
-        producto=producto,
-        tipo=tipo,
-        cantidad=cantidad,
-        saldo=nuevo_saldo,
-        referencia=referencia,
-        fecha=timezone.now(),
+
+@transaction.atomic
+def registrar_movimientos(movimientos):
+    """
+    Registra varios movimientos en el Kardex con un número fijo de consultas.
+
+    - movimientos: iterable de (producto, tipo, cantidad, referencia[, fecha]).
+      Un mismo producto puede repetirse; su saldo se acumula en el orden dado.
+      Sin fecha se usa la hora actual (la importación de históricos la indica).
+      importe es el valor a costo de compra (ver kardex/costos.py); con
+      importe se registra aunque la cantidad sea 0 (ajuste de costo).
+
+    El stock se reserva con un solo UPDATE condicional: cada producto solo se
+    descuenta si le alcanza (stock >= salida neta) y las filas se bloquean en
+    orden de id, así dos ventas simultáneas no se cruzan ni venden de más. Si
+    algún producto no alcanza se lanza StockInsuficiente y la transacción se
+    deshace. En la misma transacción se actualizan el flujo diario y los
+    cortes de saldo (kardex/saldos.py); al confirmarse se encola el cálculo
+    de sus costos. Devuelve la lista de MovimientoInventario creados.
+    """
+    movimientos = [Movimiento(*m) for m in movimientos]
+    movimientos = [m for m in movimientos if m.producto and (m.cantidad or m.importe)]
+    if not movimientos:
+        return []
+
+    netos = {}
+    for m in movimientos:
+        if m.tipo == 'ENTRADA':
+            netos[m.producto.pk] = netos.get(m.producto.pk, 0) + m.cantidad
+        elif m.tipo == 'SALIDA':
+            netos[m.producto.pk] = netos.get(m.producto.pk, 0) - m.cantidad
+        else:
+            raise ValueError("Tipo de movimiento no válido. Use 'ENTRADA' o 'SALIDA'.")
+
+    #  Reserva condicional: un solo UPDATE, filas en orden de id
+    cambios = {pk: int(neto) for pk, neto in netos.items() if int(neto) != 0}
+    if cambios:
+        try:
+            with transaction.atomic():
+                actualizados = (
+                    Producto.objects
+                    .filter(pk__in=sorted(cambios), stock__gte=Case(
+                        *[When(pk=pk, then=Value(max(0, -neto))) for pk, neto in cambios.items()],
+                        output_field=models.IntegerField(),
+                    ))
+                    .order_by('pk')
+                    .update(
+                        stock=F('stock') + Case(
+                            *[When(pk=pk, then=Value(neto)) for pk, neto in cambios.items()],
+                            output_field=models.IntegerField(),
+                        ),
+                        # update() no pasa por auto_now; el catálogo usa esta fecha como versión
+                        ultima_actualizacion=timezone.now(),
+                    )
+                )
+                if actualizados != len(cambios):
+                    raise _Faltante()
+        except _Faltante:
+            # Se deshizo la reserva parcial; buscamos qué producto no alcanzó
+            productos = {m.producto.pk: m.producto for m in movimientos}
+            disponibles = dict(Producto.objects.filter(pk__in=cambios).values_list('pk', 'stock'))
+            faltantes = [pk for pk in sorted(cambios) if (disponibles.get(pk) or 0) < -cambios[pk]]
+            pk = faltantes[0] if faltantes else sorted(cambios)[0]
+            raise StockInsuficiente(productos[pk], disponibles.get(pk) or 0)
+
+    #  Stock resultante (filas ya bloqueadas por el UPDATE)
+    finales = dict(
+        Producto.objects.filter(pk__in=netos).values_list('pk', 'stock')
     )
 
-    #  Actualizar el stock real del producto
-    producto.stock = nuevo_saldo
-    producto.save(update_fields=['stock'])
+    #  Saldo corrido por producto a partir del stock previo a este lote
+    stock_previo = {pk: (finales[pk] or 0) - cambios.get(pk, 0) for pk in netos}
+    saldos = dict(stock_previo)
+    ahora = timezone.now()
+    registros = []
+    for m in movimientos:
+        if m.tipo == 'ENTRADA':
+            saldos[m.producto.pk] += m.cantidad
+        else:
+            saldos[m.producto.pk] -= m.cantidad
+        registros.append(MovimientoInventario(
+            producto=m.producto,
+            tipo=m.tipo,
+            cantidad=m.cantidad,
+            saldo=saldos[m.producto.pk],
+            referencia=m.referencia,
+            fecha=m.fecha or ahora,
+            importe=m.importe,
+        ))
+
+    MovimientoInventario.objects.bulk_create(registros)
+    #  Flujo diario y cortes de saldo, en la misma transacción (ver kardex/saldos.py)
+    saldos_al_dia.registrar(registros, stock_previo)
+    #  Historial de costos: fuera de la transacción, en segundo plano (ver kardex/costos.py)
+    transaction.on_commit(lambda: encolar_unica('kardex.actualizar_costos'))
+
+    for m in movimientos:
+        m.producto.stock = finales[m.producto.pk]
+    return registros
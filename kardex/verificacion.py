@@ -0,0 +1,146 @@
+"""
+Verificación del saldo del Kardex contra el stock de los productos.
+
+El saldo de cada movimiento debe ser el del movimiento anterior más o menos
+su cantidad, en orden de registro (id), y el último saldo debe ser el stock
+del producto. Un error tragado al registrar o un stock escrito a mano rompen
+esa cadena sin que nada lo note; verificar() la recalcula y reporta las
+diferencias, y con corregir=True reescribe saldos y stock.
+
+La cadena parte del saldo previo al primer movimiento (su saldo menos o más
+su cantidad, como en kardex/costos.py) o de un movimiento APERTURA de un
+período archivado, que la reinicia en su cantidad. Los productos se reparten
+en bloques entre varios procesos, cada uno con su propia conexión.
+"""
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate, groupby
+from operator import itemgetter
+
+import django
+from django.db import connections, models, transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
+from productos.models import Producto
+from .models import MovimientoInventario
+
+BLOQUE = 500
+LOTE = 1000
+
+# Un producto cuya cadena no cierra: saldos mal guardados y stock contra el calculado
+Divergencia = namedtuple('Divergencia', ['producto_id', 'movimientos', 'primer_movimiento', 'stock', 'calculado'])
+Resultado = namedtuple('Resultado', ['productos', 'movimientos', 'divergencias', 'saldos_corregidos', 'stocks_corregidos'])
+
+
+def _aplicar(saldo, movimiento):
+    _, tipo, cantidad, _ = movimiento
+    if tipo == 'APERTURA':
+        return cantidad
+    return saldo + cantidad if tipo == 'ENTRADA' else saldo - cantidad
+
+
+def _apertura(movimientos):
+    """Saldo previo al primer movimiento del producto."""
+    _, tipo, cantidad, saldo = movimientos[0]
+    if tipo == 'APERTURA':
+        return cantidad
+    return saldo - cantidad if tipo == 'ENTRADA' else saldo + cantidad
+
+
+def _recorrer(productos, stocks):
+    """
+    (divergencias, saldos) de los productos: cada saldo esperado sale de una
+    suma acumulada sobre sus movimientos. saldos es [(id, saldo esperado)] de
+    los movimientos mal guardados.
+    """
+    filas = (
+        MovimientoInventario.objects.filter(producto_id__in=productos)
+        .order_by('producto_id', 'id')
+        .values_list('producto_id', 'id', 'tipo', 'cantidad', 'saldo')
+    )
+    divergencias, saldos, revisados = [], [], 0
+    for producto_id, grupo in groupby(filas.iterator(chunk_size=LOTE), key=itemgetter(0)):
+        movimientos = [fila[1:] for fila in grupo]
+        # La APERTURA va primero: se inserta al archivar, después de lo que le sigue en fecha
+        movimientos.sort(key=lambda m: (m[1] != 'APERTURA', m[0]))
+        esperados = list(accumulate(movimientos, _aplicar, initial=_apertura(movimientos)))[1:]
+        malos = [(m[0], esperado) for m, esperado in zip(movimientos, esperados) if m[3] != esperado]
+        revisados += len(movimientos)
+        stock = stocks.get(producto_id) or 0
+        if malos or stock != esperados[-1]:
+            divergencias.append(Divergencia(producto_id, len(malos), malos[0][0] if malos else None,
+                                            stock, esperados[-1]))
+            saldos.extend(malos)
+    return divergencias, saldos, revisados
+
+
+def revisar_bloque(productos, corregir=False):
+    """
+    Verifica (y corrige) un bloque de productos. Al corregir, las filas de los
+    productos quedan bloqueadas hasta el final, así no se cruza con una venta
+    que registra movimientos a la vez. Devuelve un Resultado.
+    """
+    with transaction.atomic():
+        stocks = Producto.objects.filter(pk__in=productos).order_by('pk')
+        if corregir:
+            stocks = stocks.select_for_update()
+        stocks = dict(stocks.values_list('pk', 'stock'))
+        divergencias, saldos, revisados = _recorrer(productos, stocks)
+        stocks_corregidos = 0
+        if corregir and divergencias:
+            MovimientoInventario.objects.bulk_update(
+                [MovimientoInventario(pk=pk, saldo=saldo) for pk, saldo in saldos], ['saldo'], batch_size=LOTE
+            )
+            # Un stock calculado negativo no se puede guardar: queda solo en el reporte
+            cambios = {
+                d.producto_id: int(d.calculado) for d in divergencias
+                if d.stock != d.calculado and d.calculado >= 0
+            }
+            if cambios:
+                stocks_corregidos = (
+                    Producto.objects.filter(pk__in=sorted(cambios)).order_by('pk')
+                    .update(
+                        stock=Case(*[When(pk=pk, then=Value(stock)) for pk, stock in cambios.items()],
+                                   output_field=models.IntegerField()),
+                        ultima_actualizacion=timezone.now(),
+                    )
+                )
+    return Resultado(
+        len(productos), revisados, divergencias,
+        len(saldos) if corregir else 0, stocks_corregidos,
+    )
+
+
+def _iniciar_proceso():
+    # Con "spawn" el proceso hijo arranca sin Django configurado
+    django.setup()
+
+
+def _revisar(argumentos):
+    return revisar_bloque(*argumentos)
+
+
+def verificar(procesos=1, corregir=False, productos=None, bloque=BLOQUE):
+    """
+    Verifica todos los productos con movimientos (o los indicados) en bloques
+    de `bloque`. Con procesos > 1 los bloques se reparten entre procesos.
+    Devuelve un Resultado con la suma de todos los bloques.
+    """
+    ids = productos if productos is not None else (
+        MovimientoInventario.objects.values_list('producto', flat=True).distinct().order_by('producto')
+    )
+    ids = list(ids)
+    bloques = [(ids[i:i + bloque], corregir) for i in range(0, len(ids), bloque)]
+    if procesos > 1 and len(bloques) > 1:
+        # Cada proceso abre su conexión: no se heredan las abiertas de este
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_proceso) as pool:
+            parciales = list(pool.map(_revisar, bloques))
+    else:
+        parciales = [_revisar(b) for b in bloques]
+
+    divergencias = [d for p in parciales for d in p.divergencias]
+    return Resultado(
+        sum(p.productos for p in parciales), sum(p.movimientos for p in parciales), divergencias,
+        sum(p.saldos_corregidos for p in parciales), sum(p.stocks_corregidos for p in parciales),
+    )
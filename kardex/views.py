@@ -1,44 +1,44 @@
-from datetime import datetime, timedelta
+from django.utils import timezone
 from django.utils.dateparse import parse_date
-from django.shortcuts import render
-from django.http import HttpResponse
-from django.utils.timezone import is_aware, make_naive
-from openpyxl import Workbook
-from openpyxl.utils import get_column_letter
-from openpyxl.styles import Font, Alignment, numbers
+from django.shortcuts import redirect, render
+from django.http import StreamingHttpResponse
 
+from . import costos, exportacion, saldos
+from .exportacion import filtrar_movimientos
 from .models import MovimientoInventario
 from productos.models import Producto
+from proyectof.paginacion import paginar, pide_json
+from tareas.utils import encolar
 
 
 # =======================================
 # LISTADO DEL KARDEX CON FILTROS
 # =======================================
 def kardex_list(request):
-    productos = Producto.objects.all().order_by("nombre")
-    movimientos = MovimientoInventario.objects.select_related('producto').order_by('-fecha')
+    productos = Producto.objects.only('id', 'nombre').order_by("nombre")
+    movimientos = filtrar_movimientos(MovimientoInventario.objects.select_related('producto'), request.GET)
 
     producto_id = request.GET.get('producto')
     fecha_inicio = request.GET.get('fecha_inicio')
     fecha_fin = request.GET.get('fecha_fin')
 
-    # Filtro por producto
-    if producto_id:
-        movimientos = movimientos.filter(producto_id=producto_id)
+    pagina = paginar(movimientos, ('-fecha', '-id'), request.GET)
 
-    # Filtro por fechas — ajustado para DateTimeField
-    if fecha_inicio:
-        fi = parse_date(fecha_inicio)
-        if fi:
-            movimientos = movimientos.filter(fecha__gte=datetime.combine(fi, datetime.min.time()))
-    if fecha_fin:
-        ff = parse_date(fecha_fin)
-        if ff:
-            movimientos = movimientos.filter(fecha__lt=datetime.combine(ff + timedelta(days=1), datetime.min.time()))
+    if pide_json(request):
+        return pagina.como_json(lambda m: {
+            'id': m.id,
+            'fecha': m.fecha,
+            'producto': m.producto.nombre,
+            'tipo': m.tipo,
+            'cantidad': m.cantidad,
+            'saldo': m.saldo,
+            'referencia': m.referencia,
+        })
 
     context = {
         'productos': productos,
-        'movimientos': movimientos,
+        'movimientos': pagina,
+        'pagina': pagina,
         'producto_seleccionado': producto_id,
         'fecha_inicio': fecha_inicio,
         'fecha_fin': fecha_fin,
@@ -46,100 +46,77 @@ def kardex_list(request):
     return render(request, 'kardex/kardex_list.html', context)
 
 
+# =======================================
+# VALUACIÓN DEL INVENTARIO A UNA FECHA
+# =======================================
+def kardex_valuacion(request):
+    fecha = parse_date(request.GET.get('fecha') or '') or timezone.localdate()
+    metodo = request.GET.get('metodo')
+    if metodo not in costos.METODOS:
+        metodo = 'promedio'
+
+    filas = costos.valuacion(fecha, metodo).only('id', 'codigo', 'nombre')
+    pagina = paginar(filas, ('nombre', 'id'), request.GET)
+
+    if pide_json(request):
+        return pagina.como_json(lambda p: {
+            'id': p.id,
+            'codigo': p.codigo,
+            'nombre': p.nombre,
+            'stock': p.stock_al,
+            'valor': p.valor_al,
+        })
+
+    context = {
+        'productos': pagina,
+        'pagina': pagina,
+        'fecha': fecha,
+        'metodo': metodo,
+        'total': costos.valor_total(filas),
+        'sin_costo': costos.sin_costo(),
+    }
+    return render(request, 'kardex/kardex_valuacion.html', context)
+
 
 # =======================================
-#  EXPORTAR KARDEX A EXCEL
+# EXISTENCIAS A UNA FECHA
 # =======================================
-def kardex_export_excel(request):
-    # Mismos filtros que en kardex_list
-    movimientos = MovimientoInventario.objects.select_related('producto').order_by('-fecha')
+def kardex_existencias(request):
+    fecha = parse_date(request.GET.get('fecha') or '') or timezone.localdate()
 
-    producto_id = request.GET.get('producto')
-    fecha_inicio = request.GET.get('fecha_inicio')
-    fecha_fin = request.GET.get('fecha_fin')
+    filas = saldos.existencias(fecha).only('id', 'codigo', 'nombre', 'stock')
+    pagina = paginar(filas, ('nombre', 'id'), request.GET)
+
+    if pide_json(request):
+        return pagina.como_json(lambda p: {
+            'id': p.id,
+            'codigo': p.codigo,
+            'nombre': p.nombre,
+            'existencia': p.existencia_al,
+        })
+
+    context = {
+        'productos': pagina,
+        'pagina': pagina,
+        'fecha': fecha,
+    }
+    return render(request, 'kardex/kardex_existencias.html', context)
 
-    if producto_id:
-        movimientos = movimientos.filter(producto_id=producto_id)
-
-    if fecha_inicio:
-        fi = parse_date(fecha_inicio)
-        if fi:
-            movimientos = movimientos.filter(fecha__gte=datetime.combine(fi, datetime.min.time()))
-    if fecha_fin:
-        ff = parse_date(fecha_fin)
-        if ff:
-            movimientos = movimientos.filter(fecha__lt=datetime.combine(ff + timedelta(days=1), datetime.min.time()))
-
-    # =======================
-    #  CREAR ARCHIVO EXCEL
-    # =======================
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Kardex"
-
-    # Título
-    ws.merge_cells("A1:F1")
-    ws["A1"] = "KARDEX DE PRODUCTOS"
-    ws["A1"].font = Font(bold=True, size=14)
-    ws["A1"].alignment = Alignment(horizontal="center")
-
-    # Filtros aplicados
-    filtro_texto = []
-    if producto_id:
-        prod = Producto.objects.filter(pk=producto_id).first()
-        if prod:
-            filtro_texto.append(f"Producto: {prod.nombre}")
-    if fecha_inicio:
-        filtro_texto.append(f"Desde: {fecha_inicio}")
-    if fecha_fin:
-        filtro_texto.append(f"Hasta: {fecha_fin}")
-    ws.merge_cells("A2:F2")
-    ws["A2"] = " | ".join(filtro_texto) if filtro_texto else "Sin filtros"
-    ws["A2"].alignment = Alignment(horizontal="center")
-
-    # Encabezados
-    headers = ["Fecha", "Tipo", "Cantidad", "Saldo", "Referencia", "Usuario"]
-    ws.append(headers)
-    for col in range(1, len(headers) + 1):
-        c = ws.cell(row=3, column=col)
-        c.font = Font(bold=True)
-        c.alignment = Alignment(horizontal="center")
-
-    # Datos
-    row = 4
-    for m in movimientos:
-        fecha_valor = m.fecha
-        #  Convertir a naive datetime si tiene zona horaria
-        if is_aware(fecha_valor):
-            fecha_valor = make_naive(fecha_valor)
-
-        ws.cell(row=row, column=1, value=fecha_valor)
-        ws.cell(row=row, column=2, value=m.tipo)
-        ws.cell(row=row, column=3, value=float(m.cantidad))
-        ws.cell(row=row, column=4, value=float(getattr(m, "saldo", 0)))
-        ws.cell(row=row, column=5, value=str(getattr(m, "referencia", "")))
-        ws.cell(row=row, column=6, value=str(getattr(m, "usuario", "")))
-        row += 1
-
-    # Formatos
-    for r in range(4, row):
-        ws.cell(row=r, column=1).number_format = "dd/mm/yyyy hh:mm"
-        ws.cell(row=r, column=3).number_format = numbers.FORMAT_NUMBER_00
-        ws.cell(row=r, column=4).number_format = numbers.FORMAT_NUMBER_00
-
-    # Ajuste de ancho
-    widths = [20, 12, 12, 12, 40, 20]
-    for i, w in enumerate(widths, start=1):
-        ws.column_dimensions[get_column_letter(i)].width = w
-
-    # Descargar
-    nombre = "kardex.xlsx"
-    if producto_id:
-        nombre = f"kardex_producto_{producto_id}.xlsx"
-
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response["Content-Disposition"] = f'attachment; filename="{nombre}"'
-    wb.save(response)
-    return response
+
+# =======================================
+#  EXPORTAR KARDEX A EXCEL / CSV
+# =======================================
+def kardex_export_excel(request):
+    # Mismos filtros que en kardex_list
+    params = {clave: request.GET.get(clave, '') for clave in ('producto', 'fecha_inicio', 'fecha_fin')}
+
+    if request.GET.get('formato') == 'csv':
+        movimientos = filtrar_movimientos(MovimientoInventario.objects.all(), params)
+        nombre = f"kardex_producto_{params['producto']}" if params['producto'] else "kardex"
+        response = StreamingHttpResponse(exportacion.csv_en_stream(movimientos), content_type="text/csv; charset=utf-8")
+        response["Content-Disposition"] = f'attachment; filename="{nombre}.csv"'
+        return response
+
+    # El Excel se arma en segundo plano (ver kardex/tareas.py); la página de la tarea muestra el avance
+    tarea = encolar('kardex.exportar_excel', usuario=request.user, filtros=params)
+    return redirect('tareas:tarea_detail', pk=tarea.pk)
@@ -1,5 +1,6 @@
 from django import forms
 from django.forms import inlineformset_factory
+from ventas.forms import OpcionesCompartidasFormSet
 from .models import Receta, DetalleReceta, OrdenProduccion
 
 
@@ -21,11 +22,16 @@ class DetalleRecetaForm(forms.ModelForm):
         fields = ["insumo", "cantidad_por_unidad"]
 
 
+class DetalleRecetaBaseFormSet(OpcionesCompartidasFormSet):
+    campos_compartidos = ('insumo',)
+
+
 # Formset para agregar varios insumos en una receta
 DetalleRecetaFormSet = inlineformset_factory(
     Receta,
     DetalleReceta,
     form=DetalleRecetaForm,
+    formset=DetalleRecetaBaseFormSet,
     extra=1,
     can_delete=True
 )
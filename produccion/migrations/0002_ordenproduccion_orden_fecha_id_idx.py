@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produccion', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ordenproduccion',
+            index=models.Index(fields=['fecha', 'id'], name='orden_fecha_id_idx'),
+        ),
+    ]
@@ -103,38 +103,23 @@ class OrdenProduccion(models.Model):
 
 
     def _aplicar_movimientos(self):
-        """Descuenta insumos y suma producto final al confirmar."""
-        from kardex.utils import registrar_movimiento
+        """Descuenta insumos y suma producto final al confirmar (un solo lote en el Kardex)."""
+        from kardex.utils import registrar_movimientos
 
-        # Salidas de insumos
-        for insumo, qty in self.consumos_necesarios():
-            try:
-                registrar_movimiento(insumo, 'SALIDA', qty, f"Consumo OP #{self.id}")
-            except Exception as e:
-                print(f"⚠️ No se pudo registrar salida de insumo en Kardex: {e}")
-
-        # Entrada del producto final
-        try:
-            registrar_movimiento(self.producto_final(), 'ENTRADA', self.cantidad_a_producir, f"Producción OP #{self.id}")
-        except Exception as e:
-            print(f"⚠️ No se pudo registrar entrada de producto final en Kardex: {e}")
+        registrar_movimientos(
+            [(insumo, 'SALIDA', qty, f"Consumo OP #{self.id}") for insumo, qty in self.consumos_necesarios()]
+            + [(self.producto_final(), 'ENTRADA', self.cantidad_a_producir, f"Producción OP #{self.id}")]
+        )
 
     def _revertir_movimientos(self):
-        """Revierte la confirmación: devuelve insumos y descuenta producto final."""
-        from kardex.utils import registrar_movimiento
-
-        # Entradas (reversión) de insumos
-        for insumo, qty in self.consumos_necesarios():
-            try:
-                registrar_movimiento(insumo, 'ENTRADA', qty, f"Reversión insumo OP #{self.id}")
-            except Exception as e:
-                print(f" No se pudo registrar reversión de insumo en Kardex: {e}")
+        """Revierte la confirmación: devuelve insumos y descuenta producto final (un solo lote)."""
+        from kardex.utils import registrar_movimientos
 
-        # Salida (reversión) del producto final
-        try:
-            registrar_movimiento(self.producto_final(), 'SALIDA', self.cantidad_a_producir, f"Reversión producto OP #{self.id}")
-        except Exception as e:
-            print(f" No se pudo registrar reversión de producto en Kardex: {e}")
+        # Si el producto final ya no alcanza se lanza StockInsuficiente y no se revierte nada
+        registrar_movimientos(
+            [(insumo, 'ENTRADA', qty, f"Reversión insumo OP #{self.id}") for insumo, qty in self.consumos_necesarios()]
+            + [(self.producto_final(), 'SALIDA', self.cantidad_a_producir, f"Reversión producto OP #{self.id}")]
+        )
 
 
 
@@ -161,3 +146,5 @@ class OrdenProduccion(models.Model):
         verbose_name = "Orden de producción"
         verbose_name_plural = "Órdenes de producción"
         ordering = ['-fecha', '-id']
+        # Paginación por cursor (fecha, id) en el listado
+        indexes = [models.Index(fields=['fecha', 'id'], name='orden_fecha_id_idx')]
@@ -1,3 +1,39 @@
-from django.test import TestCase
+from django.urls import reverse
+from kardex.models import MovimientoInventario
+from proyectof.testing import PruebaVistas, registrar_consultas
 
-# Create your tests here.
+
+class PresupuestoVistasTests(PruebaVistas):
+    def test_recetas_listado(self):
+        self.assertPresupuesto(3, reverse('produccion:recetas_list'))
+
+    def test_receta_editar(self):
+        self.assertPresupuesto(8, reverse('produccion:receta_edit', args=[self.datos['recetas'][0].pk]))
+
+    def test_ordenes_listado(self):
+        self.assertPresupuesto(3, reverse('produccion:ordenes_list'))
+
+    def test_orden_detalle(self):
+        self.assertPresupuesto(4, reverse('produccion:orden_detail', args=[self.datos['ordenes'][0].pk]))
+
+
+class OrdenMovimientosTests(PruebaVistas):
+    def test_confirmar_y_anular_en_un_lote(self):
+        orden = self.datos['ordenes'][0]
+        insumos = [d.insumo for d in orden.receta.detalles.select_related('insumo')]
+        stock_inicial = {p.pk: p.stock for p in insumos}
+
+        with registrar_consultas() as registro:
+            orden.confirmar()
+        # Un solo INSERT para todos los movimientos de la orden
+        inserciones = [c for c in registro.consultas if c.sql.startswith('INSERT') and 'kardex_movimientoinventario' in c.sql]
+        self.assertEqual(len(inserciones), 1)
+        self.assertEqual(MovimientoInventario.objects.filter(referencia__endswith=f"OP #{orden.id}").count(), len(insumos) + 1)
+        for insumo in insumos:
+            insumo.refresh_from_db()
+            self.assertEqual(insumo.stock, stock_inicial[insumo.pk] - 1)
+
+        orden.anular()
+        for insumo in insumos:
+            insumo.refresh_from_db()
+            self.assertEqual(insumo.stock, stock_inicial[insumo.pk])
@@ -2,7 +2,8 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.db import transaction
 from django.core.exceptions import ValidationError
-from django.db.models import Q
+from django.db.models import Count, Q
+from proyectof.paginacion import paginar, pide_json
 from .models import Receta, OrdenProduccion
 from .forms import RecetaForm, DetalleRecetaFormSet, OrdenProduccionForm
 
@@ -14,7 +15,10 @@ from .forms import RecetaForm, DetalleRecetaFormSet, OrdenProduccionForm
 
 def recetas_list(request):
     query = request.GET.get('q', '').strip()
-    recetas = Receta.objects.all().order_by('-id')
+    recetas = (
+        Receta.objects.select_related('producto_final')
+        .annotate(num_items=Count('detalles'))
+    )
 
     if query:
         recetas = recetas.filter(
@@ -22,8 +26,20 @@ def recetas_list(request):
             Q(producto_final__nombre__icontains=query)
         )
 
+    pagina = paginar(recetas, ('-id',), request.GET)
+
+    if pide_json(request):
+        return pagina.como_json(lambda r: {
+            'id': r.id,
+            'nombre': r.nombre,
+            'producto_final': str(r.producto_final),
+            'insumos': r.num_items,
+            'activo': r.activo,
+        })
+
     return render(request, 'produccion/recetas_list.html', {
-        'recetas': recetas,
+        'recetas': pagina,
+        'pagina': pagina,
         'query': query
     })
 
@@ -98,7 +114,7 @@ def receta_edit(request, pk):
 
 def ordenes_list(request):
     query = request.GET.get('q', '').strip()
-    ordenes = OrdenProduccion.objects.select_related('receta', 'receta__producto_final').order_by('-fecha')
+    ordenes = OrdenProduccion.objects.select_related('receta', 'receta__producto_final', 'encargado')
 
     if query:
         ordenes = ordenes.filter(
@@ -107,8 +123,21 @@ def ordenes_list(request):
             Q(encargado__username__icontains=query)
         )
 
+    pagina = paginar(ordenes, ('-fecha', '-id'), request.GET)
+
+    if pide_json(request):
+        return pagina.como_json(lambda o: {
+            'id': o.id,
+            'producto_final': str(o.receta.producto_final),
+            'cantidad_a_producir': o.cantidad_a_producir,
+            'fecha': o.fecha,
+            'estado': o.estado,
+            'encargado': str(o.encargado) if o.encargado_id else None,
+        })
+
     return render(request, 'produccion/ordenes_list.html', {
-        'ordenes': ordenes,
+        'ordenes': pagina,
+        'pagina': pagina,
         'query': query
     })
 
@@ -132,7 +161,9 @@ def orden_create(request):
 
 
 def orden_detail(request, pk):
-    orden = get_object_or_404(OrdenProduccion, pk=pk)
+    orden = get_object_or_404(
+        OrdenProduccion.objects.select_related('receta__producto_final', 'encargado'), pk=pk
+    )
     return render(request, 'produccion/orden_detail.html', {'orden': orden})
 
 
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Producto, Categoria, UnidadMedida
+from .models import Producto, Categoria, UnidadMedida, PrecioLista
 
 @admin.register(Categoria)
 class CategoriaAdmin(admin.ModelAdmin):
@@ -23,3 +23,11 @@ class ProductoAdmin(admin.ModelAdmin):
     search_fields = ('codigo', 'nombre')
     list_filter = ('activo', 'categoria', 'unidad_medida')
     ordering = ('nombre',)
+
+
+@admin.register(PrecioLista)
+class PrecioListaAdmin(admin.ModelAdmin):
+    list_display = ('tipo_cliente', 'producto', 'precio', 'descuento', 'vigente_desde', 'vigente_hasta')
+    list_filter = ('tipo_cliente', 'vigente_desde')
+    search_fields = ('producto__codigo', 'producto__nombre')
+    autocomplete_fields = ('producto',)
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ProductosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'productos'
+
+    def ready(self):
+        # Descarta la matriz de precios del proceso cuando cambia una lista y
+        # anota los productos borrados para el catálogo
+        from . import signals  # noqa: F401
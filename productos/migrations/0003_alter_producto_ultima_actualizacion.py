@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0002_producto_producto_nombre_id_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='producto',
+            name='ultima_actualizacion',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Última actualización'),
+        ),
+    ]
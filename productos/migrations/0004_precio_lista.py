@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0003_alter_producto_ultima_actualizacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrecioLista',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo_cliente', models.CharField(choices=[('MINORISTA', 'Minorista'), ('MAYORISTA', 'Mayorista'), ('DISTRIBUIDOR', 'Distribuidor')], max_length=20, verbose_name='Tipo de cliente')),
+                ('precio', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Precio')),
+                ('descuento', models.DecimalField(blank=True, decimal_places=2, help_text='Porcentaje sobre el precio del producto', max_digits=5, null=True, verbose_name='Descuento (%)')),
+                ('vigente_desde', models.DateField(default=django.utils.timezone.localdate, verbose_name='Vigente desde')),
+                ('vigente_hasta', models.DateField(blank=True, null=True, verbose_name='Vigente hasta')),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('producto', models.ForeignKey(blank=True, help_text='Vacío: el descuento aplica a todos los productos', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='precios_lista', to='productos.producto', verbose_name='Producto')),
+            ],
+            options={
+                'verbose_name': 'Precio de lista',
+                'verbose_name_plural': 'Listas de precios',
+                'ordering': ['tipo_cliente', 'producto', '-vigente_desde'],
+            },
+        ),
+    ]
@@ -1,4 +1,8 @@
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils import timezone
+from clientes.models import Cliente
+from secuencias.utils import siguiente_numero, ultimo_correlativo
 
 class Categoria(models.Model):
     nombre = models.CharField(max_length=50, unique=True, verbose_name="Categoría")
@@ -36,17 +40,16 @@ class Producto(models.Model):
     stock_minimo = models.PositiveIntegerField(default=0, verbose_name="Stock mínimo")
     activo = models.BooleanField(default=True, verbose_name="Activo")
     fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
-    ultima_actualizacion = models.DateTimeField(auto_now=True, verbose_name="Última actualización")
+    # También marca la versión del producto en el catálogo de precios (ver productos_catalogo)
+    ultima_actualizacion = models.DateTimeField(auto_now=True, db_index=True, verbose_name="Última actualización")
 
     def save(self, *args, **kwargs):
         # Generar código automáticamente si es nuevo
         if not self.codigo:
-            ultimo = Producto.objects.order_by('-id').first()
-            if ultimo and ultimo.codigo.startswith('A-'):
-                ultimo_num = int(ultimo.codigo.split('-')[1])
-                nuevo_num = ultimo_num + 1
-            else:
-                nuevo_num = 1
+            nuevo_num = siguiente_numero(
+                'productos.codigo',
+                inicial=lambda: ultimo_correlativo(Producto.objects, 'codigo', 'A-'),
+            )
             self.codigo = f"A-{nuevo_num:05d}"
         super().save(*args, **kwargs)
 
@@ -73,3 +76,63 @@ class Producto(models.Model):
         verbose_name = "Producto"
         verbose_name_plural = "Productos"
         ordering = ['nombre']
+        # Paginación por cursor (nombre, id) en el listado
+        indexes = [models.Index(fields=['nombre', 'id'], name='producto_nombre_id_idx')]
+
+
+class ProductoEliminado(models.Model):
+    """
+    Producto borrado (lo anota una señal): el catálogo de las pantallas de
+    venta lo informa en `bajas` para que lo quiten de su copia local.
+    """
+    producto_id = models.BigIntegerField(verbose_name="Producto")
+    eliminado = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Producto #{self.producto_id} eliminado el {self.eliminado:%d/%m/%Y %H:%M}"
+
+    class Meta:
+        verbose_name = "Producto eliminado"
+        verbose_name_plural = "Productos eliminados"
+
+
+class PrecioLista(models.Model):
+    """
+    Precio especial de un tipo de cliente (lista de precios), vigente entre dos
+    fechas. Con producto fija el precio (o un descuento) de ese producto; sin
+    producto es un descuento para todos los productos de la lista. Se resuelve
+    con la matriz en memoria de productos/precios.py.
+    """
+    tipo_cliente = models.CharField(max_length=20, choices=Cliente.TIPO_CHOICES, verbose_name="Tipo de cliente")
+    producto = models.ForeignKey(
+        Producto, on_delete=models.CASCADE, null=True, blank=True, related_name='precios_lista',
+        verbose_name="Producto", help_text="Vacío: el descuento aplica a todos los productos",
+    )
+    precio = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, verbose_name="Precio")
+    descuento = models.DecimalField(
+        max_digits=5, decimal_places=2, null=True, blank=True,
+        verbose_name="Descuento (%)", help_text="Porcentaje sobre el precio del producto",
+    )
+    vigente_desde = models.DateField(default=timezone.localdate, verbose_name="Vigente desde")
+    vigente_hasta = models.DateField(null=True, blank=True, verbose_name="Vigente hasta")
+    actualizado = models.DateTimeField(auto_now=True)
+
+    def clean(self):
+        if (self.precio is None) == (self.descuento is None):
+            raise ValidationError("Indique un precio o un descuento (solo uno).")
+        if self.producto_id is None and self.precio is not None:
+            raise ValidationError({'precio': "Sin producto solo se puede indicar un descuento."})
+        if self.descuento is not None and not 0 <= self.descuento <= 100:
+            raise ValidationError({'descuento': "El descuento debe estar entre 0 y 100."})
+        if self.vigente_hasta and self.vigente_hasta < self.vigente_desde:
+            raise ValidationError({'vigente_hasta': "La fecha final es anterior a la inicial."})
+
+    def __str__(self):
+        destino = self.producto or "Todos los productos"
+        valor = f"Q {self.precio}" if self.precio is not None else f"-{self.descuento}%"
+        return f"{self.get_tipo_cliente_display()} – {destino}: {valor}"
+
+    class Meta:
+        verbose_name = "Precio de lista"
+        verbose_name_plural = "Listas de precios"
+        ordering = ['tipo_cliente', 'producto', '-vigente_desde']
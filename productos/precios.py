@@ -0,0 +1,120 @@
+"""
+Listas de precios por tipo de cliente (PrecioLista), resueltas desde una
+matriz en memoria por proceso: {(tipo_cliente, producto_id): regla} más un
+descuento general por tipo. Buscar un precio es un acceso a diccionario.
+
+La matriz se arma con los precios vigentes del día y se descarta:
+- al guardar o borrar un PrecioLista en este proceso (señales),
+- al cambiar el día (empiezan o terminan vigencias),
+- cuando otro proceso cambió la lista: cada PRECIOS_REVISION segundos se
+  compara una firma barata de la tabla (cantidad y última modificación).
+"""
+import threading
+import time
+from collections import namedtuple
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from .models import PrecioLista
+
+# Segundos entre revisiones de cambios hechos por otros procesos
+REVISION = getattr(settings, 'PRECIOS_REVISION', 30)
+
+Matriz = namedtuple('Matriz', ['fecha', 'firma', 'revisada', 'reglas', 'descuentos'])
+
+_matriz = None
+_candado = threading.Lock()
+
+
+def invalidar(**kwargs):
+    """Descarta la matriz de este proceso (se vuelve a armar en la próxima consulta)."""
+    global _matriz
+    _matriz = None
+
+
+def _firma():
+    datos = PrecioLista.objects.aggregate(n=Count('id'), ultima=Max('actualizado'))
+    return datos['n'], datos['ultima']
+
+
+def _armar(hoy):
+    """Precios y descuentos vigentes hoy; si hay varios, gana el de inicio más reciente."""
+    firma = _firma()
+    reglas, descuentos = {}, {}
+    vigentes = (
+        PrecioLista.objects
+        .filter(vigente_desde__lte=hoy)
+        .filter(Q(vigente_hasta__isnull=True) | Q(vigente_hasta__gte=hoy))
+        .order_by('vigente_desde', 'id')
+        .values_list('tipo_cliente', 'producto_id', 'precio', 'descuento')
+    )
+    for tipo, producto_id, precio, descuento in vigentes:
+        if producto_id is None:
+            descuentos[tipo] = descuento
+        else:
+            reglas[(tipo, producto_id)] = (precio, descuento)
+    return Matriz(hoy, firma, time.monotonic(), reglas, descuentos)
+
+
+def matriz():
+    """La matriz vigente de este proceso, armándola o revisándola si hace falta."""
+    global _matriz
+    actual = _matriz
+    hoy = timezone.localdate()
+    if actual is not None and actual.fecha == hoy and time.monotonic() - actual.revisada < REVISION:
+        return actual
+
+    with _candado:
+        actual = _matriz
+        if actual is None or actual.fecha != hoy:
+            actual = _armar(hoy)
+        elif time.monotonic() - actual.revisada >= REVISION:
+            actual = actual._replace(revisada=time.monotonic()) if _firma() == actual.firma else _armar(hoy)
+        _matriz = actual
+    return actual
+
+
+def _aplicar_descuento(precio, descuento):
+    return (Decimal(precio) * (100 - descuento) / 100).quantize(Decimal('0.01'))
+
+
+def precio_para(producto, tipo_cliente=None):
+    """
+    Precio unitario de `producto` para un tipo de cliente: el precio de lista
+    del producto, si no el descuento general del tipo y si no el precio base.
+    """
+    base = producto.precio
+    if not tipo_cliente:
+        return base
+    m = matriz()
+    regla = m.reglas.get((tipo_cliente, producto.pk))
+    if regla is not None:
+        precio, descuento = regla
+        return precio if precio is not None else _aplicar_descuento(base, descuento)
+    descuento = m.descuentos.get(tipo_cliente)
+    return base if descuento is None else _aplicar_descuento(base, descuento)
+
+
+def precio_cliente(producto, cliente=None):
+    """Precio de `producto` para un cliente (o el precio base si no hay cliente)."""
+    return precio_para(producto, cliente.tipo if cliente is not None else None)
+
+
+def tarifa(tipo_cliente):
+    """
+    Lo que un tipo de cliente necesita para calcular sus precios sin volver
+    al servidor: su descuento general y las reglas por producto,
+    {'descuento': d o None, 'reglas': [[producto_id, precio o None, descuento o None], ...]}.
+    Se resuelve igual que precio_para() (ver static/js/catalogo_productos.js).
+    """
+    m = matriz()
+    descuento = m.descuentos.get(tipo_cliente)
+    return {
+        'descuento': None if descuento is None else str(descuento),
+        'reglas': [
+            [producto_id, None if precio is None else str(precio), None if desc is None else str(desc)]
+            for (tipo, producto_id), (precio, desc) in m.reglas.items() if tipo == tipo_cliente
+        ],
+    }
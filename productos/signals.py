@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from .models import PrecioLista, Producto, ProductoEliminado
+from .precios import invalidar
+
+
+def _anotar_baja(sender, instance, **kwargs):
+    ProductoEliminado.objects.create(producto_id=instance.pk)
+
+
+post_save.connect(invalidar, sender=PrecioLista, dispatch_uid='precios_guardar')
+post_delete.connect(invalidar, sender=PrecioLista, dispatch_uid='precios_borrar')
+post_delete.connect(_anotar_baja, sender=Producto, dispatch_uid='catalogo_baja')
@@ -1,3 +1,53 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.urls import reverse
+from clientes.models import Cliente
+from proyectof.testing import PruebaVistas
+from .models import PrecioLista, Producto
+
+
+class PresupuestoVistasTests(PruebaVistas):
+    def test_listado(self):
+        self.assertPresupuesto(3, reverse('productos:productos_list'))
+
+    def test_catalogo(self):
+        self.assertPresupuesto(4, reverse('productos:productos_catalogo'))
+
+    def test_editar(self):
+        self.assertPresupuesto(5, reverse('productos:productos_edit', args=[self.datos['productos'][0].pk]))
+
+    def test_tarifa(self):
+        self.assertPresupuesto(5, reverse('productos:productos_tarifa'), {'cliente': self.datos['clientes'][0].pk})
+
+
+class TarifaTests(PruebaVistas):
+    def test_reglas_del_tipo(self):
+        producto = self.datos['productos'][0]
+        cliente = self.datos['clientes'][0]
+        PrecioLista.objects.create(tipo_cliente=cliente.tipo, descuento=Decimal('10'))
+        PrecioLista.objects.create(tipo_cliente=cliente.tipo, producto=producto, precio=Decimal('7.50'))
+        otro_tipo = next(t for t, _ in Cliente.TIPO_CHOICES if t != cliente.tipo)
+        PrecioLista.objects.create(tipo_cliente=otro_tipo, producto=producto, precio=Decimal('1.00'))
+
+        datos = self.client.get(reverse('productos:productos_tarifa'), {'cliente': cliente.pk}).json()
+        self.assertEqual(datos, {
+            'tipo': cliente.tipo, 'descuento': '10.00', 'reglas': [[producto.pk, '7.50', None]],
+        })
+
+
+class CatalogoTests(PruebaVistas):
+    def test_delta_informa_borrados(self):
+        url = reverse('productos:productos_catalogo')
+        borrado = Producto(nombre="Producto borrado", categoria=self.datos['productos'][0].categoria,
+                           unidad_medida=self.datos['productos'][0].unidad_medida, precio=Decimal('1.00'))
+        borrado.save()
+        pk = borrado.pk
+        completo = self.client.get(url)
+        version = completo.json()['version']
+        self.assertIn(pk, [fila[0] for fila in completo.json()['productos']])
+        borrado.delete()
+
+        # El borrado cambia el ETag aunque la versión siga igual
+        respuesta = self.client.get(url, {'desde': version}, HTTP_IF_NONE_MATCH=completo['ETag'])
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn(pk, respuesta.json()['bajas'])
@@ -5,6 +5,8 @@ app_name = 'productos'
 
 urlpatterns = [
     path('', views.productos_list, name='productos_list'),
+    path('catalogo/', views.productos_catalogo, name='productos_catalogo'),
+    path('tarifa/', views.productos_tarifa, name='productos_tarifa'),
     path('nuevo/', views.productos_create, name='productos_create'),
     path('<int:pk>/editar/', views.productos_edit, name='productos_edit'),
     path('<int:pk>/eliminar/', views.productos_delete, name='productos_delete'),
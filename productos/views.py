@@ -1,8 +1,15 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from .models import Producto
+from clientes.models import Cliente
+from .models import Producto, ProductoEliminado
+from . import precios
 from .forms import ProductoForm
-from django.db.models import Q
+from datetime import datetime, timezone as dt_timezone
+from django.db.models import Count, Max, Q
+from django.http import HttpResponseNotModified, JsonResponse
+from django.utils.http import parse_etags
+from proyectof.paginacion import paginar, pide_json
+from busqueda import utils as busqueda
 
 @login_required
 def productos_list(request):
@@ -10,13 +17,24 @@ def productos_list(request):
     productos = Producto.objects.all()
 
     if query:
-        productos = productos.filter(
-            Q(nombre__icontains=query) |
-            Q(codigo__icontains=query)
-        )
+        productos = busqueda.filtrar(productos, query, ['nombre', 'codigo'])
+
+    pagina = paginar(productos, ('nombre', 'id'), request.GET)
+
+    if pide_json(request):
+        return pagina.como_json(lambda p: {
+            'id': p.id,
+            'codigo': p.codigo,
+            'nombre': p.nombre,
+            'costo': p.costo,
+            'precio': p.precio,
+            'stock': p.stock,
+            'activo': p.activo,
+        })
 
     return render(request, 'productos/productos_list.html', {
-        'productos': productos,
+        'productos': pagina,
+        'pagina': pagina,
         'query': query
     })
 
@@ -54,3 +72,84 @@ def productos_delete(request, pk):
         producto.delete()
         return redirect('productos:productos_list')
     return render(request, 'productos/productos_confirm_delete.html', {'producto': producto})
+
+
+# ======================
+# CATÁLOGO DE PRECIOS Y STOCK (para las pantallas de venta)
+# ======================
+# Cambios confirmados hasta este tiempo después de su marca de fecha (p.ej. una
+# transacción larga) siguen apareciendo en el siguiente delta
+VENTANA_CATALOGO_MS = 60 * 1000
+CAMPOS_CATALOGO = ['id', 'codigo', 'nombre', 'precio', 'stock']
+
+
+def _a_ms(fecha):
+    return int(fecha.timestamp() * 1000) if fecha else 0
+
+
+@login_required
+def productos_catalogo(request):
+    """
+    Catálogo compacto de productos activos: {version, completo, campos,
+    productos: [[id, codigo, nombre, precio, stock], ...], bajas: [ids]}.
+
+    - La versión es la última modificación (ms) de cualquier producto.
+    - ?desde=<version> devuelve solo los productos cambiados desde entonces
+      (más una ventana de seguridad) y en `bajas` los que se desactivaron o
+      se borraron (ProductoEliminado). Un borrado no cambia la versión pero
+      sí el total, que también forma parte del ETag.
+    - Responde 304 si el If-None-Match coincide con el ETag actual.
+    """
+    estado = Producto.objects.aggregate(ultima=Max('ultima_actualizacion'), total=Count('id'))
+    version = _a_ms(estado['ultima'])
+    etag = f'"catalogo-{version}-{estado["total"]}"'
+
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    desde = request.GET.get('desde', '')
+    productos = Producto.objects.order_by('id')
+    if desde.isdigit():
+        limite = datetime.fromtimestamp((int(desde) - VENTANA_CATALOGO_MS) / 1000, tz=dt_timezone.utc)
+        productos = productos.filter(ultima_actualizacion__gt=limite)
+    else:
+        productos = productos.filter(activo=True)
+
+    filas, bajas = [], []
+    for pk, codigo, nombre, precio, stock, activo in productos.values_list(*CAMPOS_CATALOGO, 'activo'):
+        if activo:
+            filas.append([pk, codigo, nombre, str(precio), stock])
+        else:
+            bajas.append(pk)
+    if desde.isdigit():
+        bajas += ProductoEliminado.objects.filter(eliminado__gt=limite).values_list('producto_id', flat=True)
+
+    response = JsonResponse({
+        'version': version,
+        'completo': not desde.isdigit(),
+        'campos': CAMPOS_CATALOGO,
+        'productos': filas,
+        'bajas': bajas,
+    })
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@login_required
+def productos_tarifa(request):
+    """
+    Lista de precios del tipo del cliente ?cliente=<id> (ver precios.tarifa):
+    la pantalla de venta la pide una vez por cliente y calcula los precios
+    de cada línea con el catálogo local.
+    """
+    cliente_id = request.GET.get('cliente', '')
+    tipo = None
+    if cliente_id.isdigit():
+        tipo = Cliente.objects.filter(pk=cliente_id).values_list('tipo', flat=True).first()
+    datos = precios.tarifa(tipo) if tipo else {'descuento': None, 'reglas': []}
+    response = JsonResponse({'tipo': tipo, **datos})
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proveedores', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='proveedor',
+            index=models.Index(fields=['nombre', 'id'], name='proveedor_nombre_id_idx'),
+        ),
+    ]
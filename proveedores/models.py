@@ -1,4 +1,5 @@
 from django.db import models
+from secuencias.utils import siguiente_numero, ultimo_correlativo
 
 class Proveedor(models.Model):
     TIPO_CHOICES = [
@@ -23,14 +24,10 @@ class Proveedor(models.Model):
     def save(self, *args, **kwargs):
         # Autogenerar código tipo P-00001
         if not self.codigo:
-            last = Proveedor.objects.order_by('-id').first()
-            if last and last.codigo and last.codigo.startswith('P-'):
-                try:
-                    corr = int(last.codigo.replace('P-', '')) + 1
-                except Exception:
-                    corr = self.id or 1
-            else:
-                corr = 1
+            corr = siguiente_numero(
+                'proveedores.codigo',
+                inicial=lambda: ultimo_correlativo(Proveedor.objects, 'codigo', 'P-'),
+            )
             self.codigo = f"P-{corr:05d}"
         super().save(*args, **kwargs)
 
@@ -38,3 +35,5 @@ class Proveedor(models.Model):
         verbose_name = "Proveedor"
         verbose_name_plural = "Proveedores"
         ordering = ['nombre']
+        # Paginación por cursor (nombre, id) en el listado
+        indexes = [models.Index(fields=['nombre', 'id'], name='proveedor_nombre_id_idx')]
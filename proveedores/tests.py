@@ -1,3 +1,13 @@
-from django.test import TestCase
+from django.urls import reverse
+from proyectof.testing import PruebaVistas
 
-# Create your tests here.
+
+class PresupuestoVistasTests(PruebaVistas):
+    def test_listado(self):
+        self.assertPresupuesto(3, reverse('proveedores:proveedores_list'))
+
+    def test_detalle(self):
+        self.assertPresupuesto(6, reverse('proveedores:proveedor_detail', args=[self.datos['proveedores'][0].pk]))
+
+    def test_editar(self):
+        self.assertPresupuesto(3, reverse('proveedores:proveedor_edit', args=[self.datos['proveedores'][0].pk]))
@@ -1,6 +1,10 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.db.models import Q
+from django.db.models import Q, Sum
+from django.utils import timezone
+from compras.models import CostoProveedor, ResumenCompraProveedor
+from proyectof.paginacion import paginar, pide_json
+from busqueda import utils as busqueda
 from .models import Proveedor
 from .forms import ProveedorForm
 
@@ -8,18 +12,59 @@ def proveedores_list(request):
     q = request.GET.get('q', '').strip()
     proveedores = Proveedor.objects.all()
     if q:
-        proveedores = proveedores.filter(
-            Q(codigo__icontains=q) |
-            Q(nombre__icontains=q) |
-            Q(nit__icontains=q) |
-            Q(correo__icontains=q)
-        )
-    proveedores = proveedores.order_by('nombre')
+        proveedores = busqueda.filtrar(proveedores, q, ['codigo', 'nombre', 'nit', 'correo'])
+    pagina = paginar(proveedores, ('nombre', 'id'), request.GET)
+
+    if pide_json(request):
+        return pagina.como_json(lambda p: {
+            'id': p.id,
+            'codigo': p.codigo,
+            'nombre': p.nombre,
+            'nit': p.nit,
+            'telefono': p.telefono,
+            'correo': p.correo,
+            'tipo': p.get_tipo_display(),
+            'activo': p.activo,
+        })
+
     return render(request, 'proveedores/proveedores_list.html', {
-        'proveedores': proveedores,
+        'proveedores': pagina,
+        'pagina': pagina,
         'q': q,
     })
 
+def proveedor_detail(request, pk):
+    """Compras por mes y libro de costos del proveedor, leídos de los resúmenes de compras."""
+    proveedor = get_object_or_404(Proveedor, pk=pk)
+    hoy = timezone.localdate()
+    desde = hoy.replace(year=hoy.year - 1, day=1)
+    meses = list(
+        ResumenCompraProveedor.objects.filter(proveedor=proveedor, fecha__gte=desde)
+        .order_by('-fecha').values('fecha', 'compras', 'importe')
+    )
+    totales = ResumenCompraProveedor.objects.filter(proveedor=proveedor).aggregate(
+        compras=Sum('compras'), importe=Sum('importe'),
+    )
+    costos = CostoProveedor.objects.filter(proveedor=proveedor).select_related('producto')
+    pagina = paginar(costos, ('-ultima_fecha', '-id'), request.GET)
+
+    if pide_json(request):
+        return pagina.como_json(lambda c: {
+            'producto': c.producto.nombre,
+            'ultimo_costo': c.ultimo_costo,
+            'ultima_fecha': c.ultima_fecha,
+            'mejor_costo': c.mejor_costo,
+            'mejor_fecha': c.mejor_fecha,
+        })
+
+    return render(request, 'proveedores/proveedor_detail.html', {
+        'proveedor': proveedor,
+        'meses': meses,
+        'totales': totales,
+        'costos': pagina,
+        'pagina': pagina,
+    })
+
 def proveedor_create(request):
     form = ProveedorForm(request.POST or None)
     if request.method == 'POST':
@@ -0,0 +1,216 @@
+"""
+Paginación por cursor (keyset / seek) compartida por los listados.
+
+En lugar de OFFSET, cada página se pide "después de" (o "antes de") la
+última fila mostrada, usando los valores de las columnas de orden, por
+ejemplo (fecha, id). La consulta siempre es:
+
+    WHERE (fecha, id) < (:fecha, :id) ORDER BY fecha DESC, id DESC LIMIT n+1
+
+así que, con un índice sobre esas columnas, la página 1000 cuesta lo mismo
+que la primera. El orden debe terminar en una columna única (id) para que el
+cursor sea estable aunque haya empates.
+
+Uso en una vista:
+
+    pagina = paginar(queryset, ('-fecha', '-id'), request.GET)
+    if pide_json(request):
+        return pagina.como_json(lambda v: {...})
+    return render(..., {'ventas': pagina, 'pagina': pagina})
+"""
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import JsonResponse
+
+TAMANO_PAGINA = getattr(settings, 'PAGINACION_TAMANO', 50)
+TAMANO_MAXIMO = 500
+
+PARAM_DESPUES = 'despues'
+PARAM_ANTES = 'antes'
+
+
+def _codificar(valores):
+    texto = json.dumps([None if v is None else str(v) for v in valores])
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip('=')
+
+
+def _decodificar(cursor, campos):
+    """Devuelve los valores del cursor ya convertidos al tipo de cada campo, o None si no es válido."""
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno).decode())
+        if not isinstance(valores, list) or len(valores) != len(campos):
+            return None
+        return [campo.to_python(v) for campo, v in zip(campos, valores)]
+    except (ValueError, TypeError, binascii.Error, ValidationError):
+        return None
+
+
+def _condicion(orden, valores, invertir=False):
+    """
+    Arma el filtro "fila posterior al cursor" para un orden de varias columnas:
+    (a > x) OR (a = x AND b > y) OR ...
+    """
+    condicion = Q()
+    iguales = {}
+    for nombre, valor in zip(orden, valores):
+        descendente = nombre.startswith('-')
+        campo = nombre.lstrip('-')
+        if descendente != invertir:
+            paso = {f'{campo}__lt': valor}
+        else:
+            paso = {f'{campo}__gt': valor}
+        condicion |= Q(**iguales, **paso)
+        iguales[campo] = valor
+    return condicion
+
+
+def _invertir(orden):
+    return [n[1:] if n.startswith('-') else f'-{n}' for n in orden]
+
+
+class Pagina:
+    """Una página de resultados con los cursores para moverse a la siguiente y a la anterior."""
+
+    def __init__(self, objetos, orden, params, siguiente=None, anterior=None):
+        self.objetos = objetos
+        self.orden = orden
+        self.params = params
+        self.siguiente = siguiente
+        self.anterior = anterior
+
+    def __iter__(self):
+        return iter(self.objetos)
+
+    def __len__(self):
+        return len(self.objetos)
+
+    def __bool__(self):
+        return bool(self.objetos)
+
+    @property
+    def hay_siguiente(self):
+        return self.siguiente is not None
+
+    @property
+    def hay_anterior(self):
+        return self.anterior is not None
+
+    def _querystring(self, param, cursor):
+        params = self.params.copy()
+        params.pop(PARAM_DESPUES, None)
+        params.pop(PARAM_ANTES, None)
+        params.pop('formato', None)
+        if cursor:
+            params[param] = cursor
+        return params.urlencode()
+
+    @property
+    def url_siguiente(self):
+        return self._querystring(PARAM_DESPUES, self.siguiente)
+
+    @property
+    def url_anterior(self):
+        return self._querystring(PARAM_ANTES, self.anterior)
+
+    @property
+    def url_inicio(self):
+        return self._querystring(None, None)
+
+    def como_json(self, serializar):
+        """Respuesta para scroll infinito: filas serializadas y cursor de la siguiente página."""
+        return JsonResponse({
+            'resultados': [serializar(o) for o in self.objetos],
+            'siguiente': self.siguiente,
+            'anterior': self.anterior,
+        })
+
+
+def paginar(queryset, orden, params, tamano=None):
+    """
+    Pagina un queryset por cursor.
+
+    - orden: columnas de orden, p.ej. ('-fecha', '-id'); la última debe ser única
+    - params: request.GET (se leen 'despues', 'antes' y 'tamano')
+    - tamano: filas por página (por defecto PAGINACION_TAMANO)
+
+    Siempre hace una sola consulta de LIMIT tamano+1; la fila extra solo sirve
+    para saber si hay más.
+    """
+    orden = list(orden)
+    if tamano is None:
+        try:
+            tamano = int(params.get('tamano') or TAMANO_PAGINA)
+        except ValueError:
+            tamano = TAMANO_PAGINA
+    tamano = max(1, min(tamano, TAMANO_MAXIMO))
+
+    modelo = queryset.model
+    campos = [
+        modelo._meta.pk if n.lstrip('-') == 'pk' else modelo._meta.get_field(n.lstrip('-'))
+        for n in orden
+    ]
+    atributos = [c.attname for c in campos]
+
+    hacia_atras = False
+    valores = None
+    if params.get(PARAM_ANTES):
+        valores = _decodificar(params[PARAM_ANTES], campos)
+        hacia_atras = valores is not None
+    if valores is None and params.get(PARAM_DESPUES):
+        valores = _decodificar(params[PARAM_DESPUES], campos)
+
+    qs = queryset.order_by(*(_invertir(orden) if hacia_atras else orden))
+    if valores is not None:
+        qs = qs.filter(_condicion(orden, valores, invertir=hacia_atras))
+
+    objetos = list(qs[:tamano + 1])
+    hay_mas = len(objetos) > tamano
+    objetos = objetos[:tamano]
+    if hacia_atras:
+        objetos.reverse()
+
+    def cursor_de(obj):
+        return _codificar([getattr(obj, a) for a in atributos])
+
+    siguiente = anterior = None
+    if objetos:
+        if hacia_atras:
+            siguiente = cursor_de(objetos[-1])
+            anterior = cursor_de(objetos[0]) if hay_mas else None
+        else:
+            siguiente = cursor_de(objetos[-1]) if hay_mas else None
+            anterior = cursor_de(objetos[0]) if valores is not None else None
+
+    return Pagina(objetos, orden, params, siguiente=siguiente, anterior=anterior)
+
+
+def recorrer(queryset, orden, tamano=1000):
+    """
+    Recorre el queryset completo por bloques de `tamano` filas con el mismo
+    cursor que paginar(): cada bloque es una consulta LIMIT que sigue a la
+    última fila del anterior, así la memoria no depende del total (en MySQL
+    .iterator() igual trae el resultado completo al cliente). Acepta
+    querysets de modelos o de values() que incluyan las columnas del orden.
+    """
+    orden = list(orden)
+    nombres = [n.lstrip('-') for n in orden]
+    qs = queryset.order_by(*orden)
+    valores = None
+    while True:
+        bloque = list((qs if valores is None else qs.filter(_condicion(orden, valores)))[:tamano])
+        yield from bloque
+        if len(bloque) < tamano:
+            return
+        ultima = bloque[-1]
+        valores = [ultima[n] if isinstance(ultima, dict) else getattr(ultima, n) for n in nombres]
+
+
+def pide_json(request):
+    """True si el listado se pide como JSON (?formato=json), p.ej. para scroll infinito."""
+    return request.GET.get('formato') == 'json'
@@ -93,6 +93,10 @@ INSTALLED_APPS = [
     'kardex',
     'clientes',
     'proveedores',
+    'secuencias',
+    'busqueda',
+    'archivo',
+    'tareas',
 ]
 # --- Modelo de usuario personalizado ---
 AUTH_USER_MODEL = 'accounts.User'
@@ -219,6 +223,72 @@ STATICFILES_DIRS = [BASE_DIR / "static"]
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
+# --- Secuencias (numeración de documentos y códigos) ---
+# Números que cada worker reserva de una vez; más grande = menos consultas, más huecos al reiniciar
+SECUENCIAS_BLOQUE = int(os.getenv("SECUENCIAS_BLOQUE", "20"))
+
+
+# --- Caché de comprobantes PDF de ventas ---
+COMPROBANTES_CACHE_DIR = Path(os.getenv("COMPROBANTES_CACHE_DIR", BASE_DIR / "cache" / "comprobantes"))
+COMPROBANTES_CACHE_MAX_MB = int(os.getenv("COMPROBANTES_CACHE_MAX_MB", "200"))
+# Generar el comprobante justo después de crear la venta (la primera impresión ya sale del caché)
+COMPROBANTES_PRERENDER = os.getenv("COMPROBANTES_PRERENDER", "False") == "True"
+# Generador del PDF: "html" (plantilla + xhtml2pdf) o "reportlab" (dibujo directo, más rápido)
+COMPROBANTES_MOTOR = os.getenv("COMPROBANTES_MOTOR", "html")
+# Fuente TTF opcional para el motor reportlab (p.ej. DejaVuSans.ttf); sin ella se usa Helvetica
+COMPROBANTES_FUENTE_TTF = os.getenv("COMPROBANTES_FUENTE_TTF") or None
+
+
+# --- API de terminales ---
+# Máximo de ventas por envío en ventas/api/lote/
+VENTAS_LOTE_MAXIMO = int(os.getenv("VENTAS_LOTE_MAXIMO", "200"))
+
+
+# --- Formularios con muchas líneas ---
+# Cada línea de compra/venta envía ~5 campos; el límite de Django (1000) corta facturas de 200 líneas
+DATA_UPLOAD_MAX_NUMBER_FIELDS = int(os.getenv("DATA_UPLOAD_MAX_NUMBER_FIELDS", "5000"))
+
+
+# --- Listas de precios ---
+# Cada cuántos segundos un proceso revisa si otro cambió las listas de precios
+PRECIOS_REVISION = int(os.getenv("PRECIOS_REVISION", "30"))
+
+
+# --- Importación de ventas históricas ---
+# Ventas por transacción al importar CSV / XLSX (comando importar_ventas y admin)
+VENTAS_IMPORTACION_LOTE = int(os.getenv("VENTAS_IMPORTACION_LOTE", "1000"))
+
+
+# --- Archivo de períodos cerrados ---
+# Carpeta de los archivos JSONL comprimidos (comandos archivar_periodo y restaurar_archivo)
+ARCHIVO_DIR = Path(os.getenv("ARCHIVO_DIR", BASE_DIR / "datos" / "archivo"))
+
+
+# --- Tareas en segundo plano (comando trabajar_tareas) ---
+# Carpeta de los archivos que generan las tareas (exportaciones)
+TAREAS_DIR = Path(os.getenv("TAREAS_DIR", BASE_DIR / "datos" / "tareas"))
+# Segundos antes del primer reintento de una tarea fallida (se duplica en cada uno)
+TAREAS_REINTENTO = int(os.getenv("TAREAS_REINTENTO", "30"))
+# Una tarea en curso sin latido en estos segundos vuelve a la cola
+TAREAS_VENCIMIENTO = int(os.getenv("TAREAS_VENCIMIENTO", "600"))
+# Cada cuántos segundos renueva el trabajador el latido de la tarea en curso
+TAREAS_LATIDO = int(os.getenv("TAREAS_LATIDO", str(TAREAS_VENCIMIENTO // 4)))
+# Días que se conservan los archivos de una tarea terminada (luego los borra el trabajador)
+TAREAS_RETENCION = int(os.getenv("TAREAS_RETENCION", "7"))
+
+
+# --- Listados ---
+# Filas por página en los listados paginados por cursor (proyectof/paginacion.py)
+PAGINACION_TAMANO = int(os.getenv("PAGINACION_TAMANO", "50"))
+
+
+# --- Búsqueda (índice de trigramas) ---
+# Parecido mínimo (0-1) para aceptar una coincidencia aproximada; más alto = menos tolerante a errores
+BUSQUEDA_UMBRAL = float(os.getenv("BUSQUEDA_UMBRAL", "0.5"))
+# Resultados de la búsqueda global
+BUSQUEDA_LIMITE = int(os.getenv("BUSQUEDA_LIMITE", "20"))
+
+
 # --- Autenticación y redirecciones ---
 LOGIN_URL = 'accounts:login'                # Si alguien no está logueado, lo manda a /accounts/login/
 LOGIN_REDIRECT_URL = '/'  # Después de loguearse, va a la lista de usuarios
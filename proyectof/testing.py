@@ -0,0 +1,219 @@
+"""
+Herramientas para las pruebas: presupuesto de consultas SQL por vista.
+
+Cada prueba declara cuántas consultas puede hacer una vista y la renderiza
+con datos sembrados (más filas que el presupuesto, así una consulta por fila
+siempre lo rompe). Las consultas se registran con connection.execute_wrapper
+junto con el nodo de plantilla y la línea de código que las provocó; si la
+vista se pasa del presupuesto, el reporte muestra las consultas repetidas y
+de dónde salieron.
+"""
+import os
+import re
+import sys
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Node, TokenType
+from django.test import TestCase
+from django.utils import timezone
+
+# Datos sembrados por lista: más que cualquier presupuesto
+FILAS = 25
+
+Consulta = namedtuple('Consulta', ['sql', 'plantilla', 'codigo'])
+
+_CADENAS = re.compile(r"'(?:[^']|'')*'")
+_NUMEROS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LISTAS = re.compile(r"\((?:\s*(?:\?|%s|NULL)\s*,)+\s*(?:\?|%s|NULL)\s*\)")
+_RAIZ = str(settings.BASE_DIR) + os.sep
+_ESTE_ARCHIVO = os.path.abspath(__file__)
+
+
+def normalizar_sql(sql):
+    """Quita valores literales para agrupar la misma consulta con distintos parámetros."""
+    sql = _CADENAS.sub('?', sql)
+    sql = _NUMEROS.sub('?', sql)
+    return _LISTAS.sub('(...)', sql)
+
+
+def _origen():
+    """
+    (plantilla, código) que lanzaron la consulta en curso: el nodo de plantilla
+    más interno que se estaba renderizando ("lista.html:12 {{ r.total }}") y
+    la línea más interna del proyecto fuera de Django ("views.py:40").
+    """
+    plantilla = codigo = None
+    marco = sys._getframe(2)
+    while marco is not None and (plantilla is None or codigo is None):
+        if plantilla is None:
+            nodo = marco.f_locals.get('self')
+            # type() y no isinstance(): isinstance evaluaría objetos perezosos (request.user)
+            if issubclass(type(nodo), Node) and getattr(nodo, 'token', None) is not None and getattr(nodo, 'origin', None):
+                abre, cierra = ('{{', '}}') if nodo.token.token_type == TokenType.VAR else ('{%', '%}')
+                plantilla = f"{nodo.origin.template_name or nodo.origin.name}:{nodo.token.lineno} {abre} {nodo.token.contents} {cierra}"
+        if codigo is None:
+            archivo = os.path.abspath(marco.f_code.co_filename)
+            if archivo.startswith(_RAIZ) and archivo != _ESTE_ARCHIVO and 'site-packages' not in archivo:
+                codigo = f"{os.path.relpath(archivo, _RAIZ)}:{marco.f_lineno}"
+        marco = marco.f_back
+    return plantilla, codigo
+
+
+class RegistroConsultas:
+    """execute_wrapper que guarda cada consulta con su origen."""
+
+    def __init__(self):
+        self.consultas = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.consultas.append(Consulta(sql, *_origen()))
+        return execute(sql, params, many, context)
+
+    def __len__(self):
+        return len(self.consultas)
+
+    def repetidas(self):
+        """[(sql normalizado, [Consulta])] de las que se ejecutaron más de una vez, las más repetidas primero."""
+        grupos = {}
+        for consulta in self.consultas:
+            grupos.setdefault(normalizar_sql(consulta.sql), []).append(consulta)
+        return sorted(
+            ((sql, lista) for sql, lista in grupos.items() if len(lista) > 1),
+            key=lambda g: -len(g[1]),
+        )
+
+    def reporte(self, limite=5):
+        lineas = []
+        repetidas = self.repetidas()
+        if not repetidas:
+            lineas.append("Sin consultas repetidas. Consultas ejecutadas:")
+            lineas.extend(f"  - {c.sql[:200]}  [{c.plantilla or c.codigo}]" for c in self.consultas)
+            return '\n'.join(lineas)
+        for sql, lista in repetidas[:limite]:
+            lineas.append(f"× {len(lista)}  {sql[:300]}")
+            origenes = {}
+            for c in lista:
+                clave = (c.plantilla, c.codigo)
+                origenes[clave] = origenes.get(clave, 0) + 1
+            for (plantilla, codigo), veces in origenes.items():
+                lineas.append(f"    {veces}× plantilla: {plantilla or '—'}  código: {codigo or '—'}")
+        return '\n'.join(lineas)
+
+
+@contextmanager
+def registrar_consultas(using='default'):
+    """Registra las consultas hechas dentro del bloque (with registrar_consultas() as registro: ...)."""
+    registro = RegistroConsultas()
+    with connections[using].execute_wrapper(registro):
+        yield registro
+
+
+class PresupuestoConsultas:
+    """Mixin para TestCase: self.assertPresupuesto(presupuesto, url) renderiza la vista y controla sus consultas."""
+
+    def assertPresupuesto(self, presupuesto, url, data=None):
+        with registrar_consultas() as registro:
+            respuesta = self.client.get(url, data)
+        self.assertEqual(respuesta.status_code, 200, f"{url} respondió {respuesta.status_code}")
+        if len(registro) > presupuesto:
+            self.fail(
+                f"{url}: {len(registro)} consultas, el presupuesto es {presupuesto}\n{registro.reporte()}"
+            )
+        return respuesta
+
+
+# ======================
+# DATOS DE PRUEBA
+# ======================
+def sembrar_datos(filas=FILAS):
+    """
+    Catálogo, compras, ventas, producción y Kardex con `filas` registros por
+    listado, creados por los mismos servicios que usan las vistas. Pensado
+    para setUpTestData. Devuelve un dict con algunos objetos de referencia.
+    """
+    from accounts.models import User
+    from clientes.models import Cliente
+    from compras.models import Compra, DetalleCompra
+    from compras.services import registrar_compra
+    from kardex import costos
+    from produccion.models import DetalleReceta, OrdenProduccion, Receta
+    from productos.models import Categoria, Producto, UnidadMedida
+    from proveedores.models import Proveedor
+    from ventas.models import DetalleVenta, Venta
+    from ventas.services import registrar_venta
+
+    usuario = User.objects.create_superuser('admin_pruebas', 'admin@example.com', 'clave-pruebas')
+    categoria = Categoria.objects.create(nombre="General")
+    unidad = UnidadMedida.objects.create(nombre="Unidad")
+    productos = []
+    for i in range(filas):
+        producto = Producto(nombre=f"Producto {i:03d}", categoria=categoria, unidad_medida=unidad,
+                            precio=Decimal('10.00') + i, costo=Decimal('5.00'))
+        producto.save()
+        productos.append(producto)
+    clientes = []
+    for i in range(filas):
+        cliente = Cliente(nombre=f"Cliente {i:03d}", nit=f"{1000 + i}")
+        cliente.save()
+        clientes.append(cliente)
+    proveedores = []
+    for i in range(filas):
+        proveedor = Proveedor(nombre=f"Proveedor {i:03d}", nit=f"{2000 + i}")
+        proveedor.save()
+        proveedores.append(proveedor)
+
+    hoy = timezone.localdate()
+    compras = []
+    for i in range(filas):
+        compra = Compra(proveedor_fk=proveedores[i % 5], numero_factura=f"F-{i:04d}", encargado=usuario,
+                        fecha=hoy - timedelta(days=filas - i))
+        lineas = [
+            DetalleCompra(producto=productos[(i + j) % filas], cantidad=Decimal('20'), costo_unitario=Decimal('5.00') + j)
+            for j in range(3)
+        ]
+        compras.append(registrar_compra(compra, lineas))
+
+    ventas = []
+    for i in range(filas):
+        venta = Venta(cliente=clientes[i], encargado=usuario)
+        lineas = [
+            DetalleVenta(producto=productos[(i + j) % filas], cantidad=1, precio_unitario=Decimal('12.00'))
+            for j in range(3)
+        ]
+        ventas.append(registrar_venta(venta, lineas))
+
+    recetas = []
+    for i in range(filas):
+        receta = Receta.objects.create(producto_final=productos[i], nombre=f"Receta {i:03d}")
+        DetalleReceta.objects.bulk_create([
+            DetalleReceta(receta=receta, insumo=productos[(i + j) % filas], cantidad_por_unidad=Decimal('1'))
+            for j in range(1, 3)
+        ])
+        recetas.append(receta)
+    ordenes = [
+        OrdenProduccion.objects.create(receta=recetas[i], cantidad_a_producir=Decimal('1'), encargado=usuario)
+        for i in range(filas)
+    ]
+    # Historial de costos al día, como tras correr actualizar_costos
+    costos.actualizar()
+
+    return {
+        'usuario': usuario, 'productos': productos, 'clientes': clientes, 'proveedores': proveedores,
+        'compras': compras, 'ventas': ventas, 'recetas': recetas, 'ordenes': ordenes,
+    }
+
+
+class PruebaVistas(PresupuestoConsultas, TestCase):
+    """Base de las pruebas de vistas: datos sembrados una vez por clase y sesión iniciada como administrador."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = sembrar_datos()
+
+    def setUp(self):
+        self.client.force_login(self.datos['usuario'])
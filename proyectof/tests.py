@@ -0,0 +1,29 @@
+from django.template import engines
+from django.test import TestCase
+from compras.models import Compra
+from .testing import normalizar_sql, registrar_consultas, sembrar_datos
+
+
+class RegistroConsultasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        sembrar_datos(filas=5)
+
+    def test_reporta_consulta_repetida_con_linea_de_plantilla(self):
+        plantilla = engines['django'].from_string(
+            "{% for c in compras %}\n{{ c.proveedor_fk.nombre }}\n{% endfor %}"
+        )
+        with registrar_consultas() as registro:
+            plantilla.render({'compras': Compra.objects.all()})
+
+        sql, repetidas = registro.repetidas()[0]
+        self.assertEqual(len(repetidas), 5)
+        self.assertIn('proveedores_proveedor', sql)
+        self.assertIn(':2 {{ c.proveedor_fk.nombre }}', repetidas[0].plantilla)
+        self.assertIn('× 5', registro.reporte())
+
+    def test_normalizar_sql(self):
+        self.assertEqual(
+            normalizar_sql("SELECT * FROM t WHERE id IN (1, 2, 3) AND nombre = 'x'"),
+            normalizar_sql("SELECT * FROM t WHERE id IN (7, 8) AND nombre = 'y'"),
+        )
@@ -14,6 +14,8 @@ urlpatterns = [
     path('kardex/', include('kardex.urls')),
     path('clientes/', include('clientes.urls')),
     path('proveedores/', include('proveedores.urls')),
+    path('buscar/', include('busqueda.urls')),
+    path('tareas/', include('tareas.urls')),
 
     # Home simple: redirige a login o lista de usuarios
     path('', lambda request: redirect('accounts:users_list') if request.user.is_authenticated else redirect('accounts:login')),
@@ -1,7 +1,8 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
+from ventas.resumenes import tablero
 
 @login_required
 def home(request):
-    """Página principal después del login."""
-    return render(request, "home.html")
+    """Página principal después del login, con el tablero de ventas (leído de los resúmenes diarios)."""
+    return render(request, "home.html", {'tablero': tablero()})
@@ -0,0 +1,8 @@
+from django.contrib import admin
+from .models import Secuencia
+
+
+@admin.register(Secuencia)
+class SecuenciaAdmin(admin.ModelAdmin):
+    list_display = ('nombre', 'valor')
+    search_fields = ('nombre',)
@@ -0,0 +1,65 @@
+import multiprocessing
+import time
+import uuid
+from collections import Counter
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connections
+from secuencias.utils import olvidar_bloques
+from ventas.models import Venta
+
+
+def _inicializar_worker():
+    # El proceso hijo no debe reutilizar los bloques reservados por el padre
+    olvidar_bloques()
+
+
+def _crear_documentos(args):
+    cantidad, marca = args
+    numeros, colisiones = [], 0
+    for _ in range(cantidad):
+        venta = Venta(comentarios=marca)
+        try:
+            venta.save()
+            numeros.append(venta.numero_documento)
+        except IntegrityError:
+            colisiones += 1
+    connections.close_all()
+    return numeros, colisiones
+
+
+class Command(BaseCommand):
+    help = "Crea miles de ventas vacías desde varios procesos y verifica que no se repitan números"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=8)
+        parser.add_argument('--cantidad', type=int, default=500, help="Documentos por proceso")
+        parser.add_argument('--conservar', action='store_true', help="No borrar las ventas de prueba")
+
+    def handle(self, *args, **options):
+        procesos, cantidad = options['procesos'], options['cantidad']
+        marca = f"stress-secuencias-{uuid.uuid4().hex}"
+
+        # Las conexiones abiertas no se deben heredar por fork
+        connections.close_all()
+        contexto = multiprocessing.get_context('fork')
+        inicio = time.perf_counter()
+        with contexto.Pool(procesos, initializer=_inicializar_worker) as pool:
+            resultados = pool.map(_crear_documentos, [(cantidad, marca)] * procesos)
+        duracion = time.perf_counter() - inicio
+
+        numeros = [n for lote, _ in resultados for n in lote]
+        colisiones = sum(c for _, c in resultados)
+        repetidos = [n for n, veces in Counter(numeros).items() if veces > 1]
+
+        if not options['conservar']:
+            # Una por una: Venta.delete las descuenta de los resúmenes diarios
+            for venta in Venta.objects.filter(comentarios=marca).iterator():
+                venta.delete()
+
+        self.stdout.write(
+            f"{len(numeros)} documentos en {duracion:.2f}s "
+            f"({len(numeros) / duracion:.0f}/s) desde {procesos} procesos"
+        )
+        if colisiones or repetidos:
+            raise CommandError(f"{colisiones} colisiones de clave única, {len(repetidos)} números repetidos")
+        self.stdout.write(self.style.SUCCESS("✓ Sin números repetidos"))
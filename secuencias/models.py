@@ -0,0 +1,15 @@
+from django.db import models
+
+
+class Secuencia(models.Model):
+    """Contador con nombre; `valor` es el último número ya reservado."""
+    nombre = models.CharField(max_length=100, unique=True, verbose_name="Nombre")
+    valor = models.BigIntegerField(default=0, verbose_name="Último valor reservado")
+
+    def __str__(self):
+        return f"{self.nombre} = {self.valor}"
+
+    class Meta:
+        verbose_name = "Secuencia"
+        verbose_name_plural = "Secuencias"
+        ordering = ['nombre']
@@ -0,0 +1,36 @@
+from unittest import mock
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test import TransactionTestCase
+from . import utils
+from .models import Secuencia
+
+
+class _Deshacer(Exception):
+    pass
+
+
+class ReservaAparteTests(TransactionTestCase):
+    def setUp(self):
+        utils.olvidar_bloques()
+        self.addCleanup(utils.olvidar_bloques)
+        # En SQLite se reserva en la misma conexión; aquí se fuerza el camino de MySQL
+        vendor = mock.patch.object(connections[DEFAULT_DB_ALIAS], 'vendor', 'mysql')
+        vendor.start()
+        self.addCleanup(vendor.stop)
+
+    def tearDown(self):
+        propia = getattr(utils._local, 'conexion', None)
+        if propia is not None:
+            propia[1].close()
+            del utils._local.conexion
+
+    def test_la_reserva_no_espera_a_la_transaccion(self):
+        with self.assertRaises(_Deshacer):
+            with transaction.atomic():
+                numeros = [utils.siguiente_numero('pruebas.aparte', inicial=lambda: 100, bloque=3) for _ in range(4)]
+                raise _Deshacer()
+        self.assertEqual(numeros, [101, 102, 103, 104])
+        # El bloque quedó confirmado aunque la transacción se deshizo: sin repetir números
+        self.assertEqual(Secuencia.objects.get(nombre='pruebas.aparte').valor, 106)
+        self.assertEqual(utils.siguiente_numero('pruebas.aparte', bloque=3), 105)
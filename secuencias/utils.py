@@ -0,0 +1,174 @@
+import os
+import threading
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connection, connections, transaction
+from django.db.models import F
+from .models import Secuencia
+
+
+# Cantidad de números que cada proceso reserva de una sola vez (hi/lo)
+BLOQUE_POR_DEFECTO = getattr(settings, 'SECUENCIAS_BLOQUE', 20)
+
+_local = threading.local()
+
+
+class _Bloque:
+    """Rango [siguiente, limite] reservado en la base para este hilo."""
+
+    def __init__(self, siguiente, limite):
+        self.siguiente = siguiente
+        self.limite = limite
+        self.confirmado = False
+
+    def confirmar(self):
+        self.confirmado = True
+
+    def vigente(self):
+        if self.siguiente > self.limite:
+            return False
+        if self.confirmado:
+            return True
+        # Se reservó dentro de una transacción: sigue valiendo mientras esa
+        # transacción esté abierta (su on_commit pendiente). Si se deshizo,
+        # la reserva se perdió y otro proceso puede recibir el mismo rango.
+        return any(func == self.confirmar for _, func, _ in connection.run_on_commit)
+
+
+def _bloques():
+    if not hasattr(_local, 'bloques'):
+        _local.bloques = {}
+    return _local.bloques
+
+
+def olvidar_bloques():
+    """Descarta los bloques en memoria (p.ej. en un proceso recién creado con fork)."""
+    _local.bloques = {}
+
+
+def ultimo_correlativo(queryset, campo, prefijo=''):
+    """Mayor número usado en `campo` con el formato '<prefijo><número>' (0 si no hay)."""
+    mayor = 0
+    for valor in queryset.filter(**{f'{campo}__startswith': prefijo}).values_list(campo, flat=True).iterator():
+        sufijo = (valor or '')[len(prefijo):]
+        if sufijo.isdigit():
+            mayor = max(mayor, int(sufijo))
+    return mayor
+
+
+def _conexion_propia():
+    """
+    Conexión aparte de este hilo, en autocommit, para reservar bloques fuera
+    de la transacción del llamador. Una heredada por fork no se usa ni se
+    cierra (su socket es el del proceso padre): se guarda y se abre otra.
+    """
+    propia = getattr(_local, 'conexion', None)
+    if propia is not None and propia[0] != os.getpid():
+        _local.heredadas = [*getattr(_local, 'heredadas', []), propia]
+        propia = None
+    if propia is None:
+        propia = (os.getpid(), connections.create_connection(DEFAULT_DB_ALIAS))
+        _local.conexion = propia
+    conexion = propia[1]
+    conexion.close_if_unusable_or_obsolete()
+    return conexion
+
+
+def _reservar_aparte(nombre, tamano, inicial):
+    """
+    Reserva el bloque en la conexión propia y confirma enseguida: el bloqueo
+    de la fila de Secuencia dura solo el UPDATE y el SELECT, no la venta que
+    pidió el número. Si esa venta se deshace, el bloque queda como hueco.
+    """
+    conexion = _conexion_propia()
+    tabla = conexion.ops.quote_name(Secuencia._meta.db_table)
+    actualizar = f"UPDATE {tabla} SET valor = valor + %s WHERE nombre = %s"
+    conexion.set_autocommit(False)
+    try:
+        with conexion.cursor() as cursor:
+            # UPDATE primero: toma el bloqueo de la fila antes de leer el valor
+            cursor.execute(actualizar, [tamano, nombre])
+            if not cursor.rowcount:
+                # inicial() lee los documentos por la conexión normal
+                valor = (inicial() if inicial else 0) + tamano
+                try:
+                    cursor.execute(f"INSERT INTO {tabla} (nombre, valor) VALUES (%s, %s)", [nombre, valor])
+                except IntegrityError:
+                    # Otro proceso la creó al mismo tiempo
+                    conexion.rollback()
+                    cursor.execute(actualizar, [tamano, nombre])
+            cursor.execute(f"SELECT valor FROM {tabla} WHERE nombre = %s", [nombre])
+            limite = cursor.fetchone()[0]
+        conexion.commit()
+    except BaseException:
+        conexion.rollback()
+        raise
+    finally:
+        conexion.set_autocommit(True)
+    bloque = _Bloque(limite - tamano + 1, limite)
+    bloque.confirmar()
+    return bloque
+
+
+def _reservar_bloque(nombre, tamano, inicial):
+    # Dentro de una transacción (p.ej. registrar_venta) el bloqueo de la fila
+    # duraría hasta que esa transacción confirme y volvería a poner en fila a
+    # las ventas simultáneas: se reserva aparte. SQLite admite un solo
+    # escritor a la vez, así que ahí una segunda conexión esperaría a la
+    # primera; se reserva en la misma.
+    if connection.in_atomic_block and connection.vendor != 'sqlite':
+        return _reservar_aparte(nombre, tamano, inicial)
+
+    with transaction.atomic():
+        # UPDATE primero: toma el bloqueo de la fila antes de leer el valor
+        if not Secuencia.objects.filter(nombre=nombre).update(valor=F('valor') + tamano):
+            try:
+                with transaction.atomic():
+                    Secuencia.objects.create(nombre=nombre, valor=(inicial() if inicial else 0) + tamano)
+            except IntegrityError:
+                # Otro proceso la creó al mismo tiempo
+                Secuencia.objects.filter(nombre=nombre).update(valor=F('valor') + tamano)
+        limite = Secuencia.objects.filter(nombre=nombre).values_list('valor', flat=True).get()
+
+    bloque = _Bloque(limite - tamano + 1, limite)
+    if connection.in_atomic_block:
+        transaction.on_commit(bloque.confirmar)
+    else:
+        bloque.confirmar()
+    return bloque
+
+
+def siguiente_numero(nombre, inicial=None, bloque=None):
+    """
+    Devuelve el siguiente número de la secuencia `nombre`.
+
+    Cada hilo reserva un bloque de números en la tabla Secuencia y los va
+    entregando desde memoria, así que la mayoría de llamadas no consultan la
+    base. Los números nunca se repiten entre procesos, pero pueden quedar
+    huecos (bloques sin terminar al reiniciar un worker) y no siguen el orden
+    de creación entre workers distintos.
+
+    - inicial: función que devuelve el último número ya usado; solo se llama
+      la primera vez, cuando la secuencia todavía no existe en la tabla.
+    - bloque: tamaño del bloque a reservar (SECUENCIAS_BLOQUE por defecto).
+    """
+    bloques = _bloques()
+    actual = bloques.get(nombre)
+    if actual is None or not actual.vigente():
+        actual = _reservar_bloque(nombre, bloque or BLOQUE_POR_DEFECTO, inicial)
+        bloques[nombre] = actual
+    numero = actual.siguiente
+    actual.siguiente += 1
+    return numero
+
+
+def avanzar_hasta(nombre, valor):
+    """
+    Asegura que la secuencia no entregue números menores o iguales a `valor`
+    (p.ej. después de importar documentos con su numeración original). Solo
+    descarta el bloque en memoria de este hilo; los bloques que otros procesos
+    ya tenían reservados no se enteran.
+    """
+    Secuencia.objects.filter(nombre=nombre, valor__lt=valor).update(valor=valor)
+    actual = _bloques().get(nombre)
+    if actual is not None and actual.siguiente <= valor:
+        del _bloques()[nombre]
@@ -0,0 +1,107 @@
+/*
+ * Catálogo local de productos (id → codigo, nombre, precio, stock) para las
+ * pantallas de venta. Se guarda en localStorage y al abrir la página solo se
+ * piden los cambios desde la última versión (?desde=), con If-None-Match para
+ * que, si nada cambió, el servidor responda 304 sin cuerpo.
+ *
+ * Con cliente, la lista de precios de su tipo se pide una sola vez por
+ * cliente (/productos/tarifa/) y el precio de cada línea se calcula aquí, con
+ * las mismas reglas que productos/precios.py.
+ *
+ * Uso:
+ *   const catalogo = CatalogoProductos.cargar("/productos/catalogo/");
+ *   catalogo.then(() => CatalogoProductos.precio(id));
+ *   CatalogoProductos.tarifa("/productos/tarifa/", clienteId).then((t) => CatalogoProductos.precio(id, t));
+ */
+(function () {
+  const CLAVE = "catalogoProductos";
+  let estado = { version: null, etag: null, productos: {} };
+
+  function leer() {
+    try {
+      const guardado = JSON.parse(localStorage.getItem(CLAVE));
+      if (guardado && guardado.productos) estado = guardado;
+    } catch (e) { /* localStorage no disponible o dañado: se pide completo */ }
+  }
+
+  function guardar() {
+    try { localStorage.setItem(CLAVE, JSON.stringify(estado)); } catch (e) { /* lleno o bloqueado */ }
+  }
+
+  function aplicar(datos, etag) {
+    if (datos.completo) estado.productos = {};
+    datos.productos.forEach((fila) => {
+      const p = {};
+      datos.campos.forEach((campo, i) => { p[campo] = fila[i]; });
+      estado.productos[p.id] = p;
+    });
+    datos.bajas.forEach((id) => { delete estado.productos[id]; });
+    estado.version = datos.version;
+    estado.etag = etag;
+    guardar();
+  }
+
+  function cargar(url) {
+    leer();
+    const headers = {};
+    let destino = url;
+    if (estado.version !== null) {
+      destino += `?desde=${estado.version}`;
+      if (estado.etag) headers["If-None-Match"] = estado.etag;
+    }
+    return fetch(destino, { headers, credentials: "same-origin" })
+      .then((r) => {
+        if (r.status === 304) return null;
+        if (!r.ok) throw new Error(`catálogo: HTTP ${r.status}`);
+        return r.json().then((datos) => aplicar(datos, r.headers.get("ETag")));
+      })
+      .catch((err) => console.error("No se pudo actualizar el catálogo de productos:", err));
+  }
+
+  function buscar(id) {
+    return estado.productos[id] || null;
+  }
+
+  // Listas de precios ya pedidas en esta página, por cliente
+  const tarifas = {};
+
+  function tarifa(url, clienteId) {
+    if (!tarifas[clienteId]) {
+      tarifas[clienteId] = fetch(`${url}?cliente=${encodeURIComponent(clienteId)}`, { credentials: "same-origin" })
+        .then((r) => {
+          if (!r.ok) throw new Error(`tarifa: HTTP ${r.status}`);
+          return r.json();
+        })
+        .then((datos) => {
+          const reglas = {};
+          datos.reglas.forEach(([id, precio, descuento]) => { reglas[id] = { precio, descuento }; });
+          return { descuento: datos.descuento, reglas };
+        })
+        .catch((err) => { delete tarifas[clienteId]; throw err; });
+    }
+    return tarifas[clienteId];
+  }
+
+  // Precio con descuento en centavos enteros, redondeado al par como Decimal.quantize
+  function conDescuento(precio, descuento) {
+    const numerador = Math.round(parseFloat(precio) * 100) * Math.round((100 - parseFloat(descuento)) * 100);
+    let centavos = Math.floor(numerador / 10000);
+    const resto = numerador - centavos * 10000;
+    if (resto > 5000 || (resto === 5000 && centavos % 2 !== 0)) centavos += 1;
+    return centavos / 100;
+  }
+
+  // Sin tarifa, el precio base; con tarifa, el de lista, si no el descuento general del tipo
+  function precio(id, tarifaCliente) {
+    const p = buscar(id);
+    if (!p) return null;
+    if (tarifaCliente) {
+      const regla = tarifaCliente.reglas[id];
+      if (regla) return regla.precio !== null ? parseFloat(regla.precio) : conDescuento(p.precio, regla.descuento);
+      if (tarifaCliente.descuento !== null) return conDescuento(p.precio, tarifaCliente.descuento);
+    }
+    return parseFloat(p.precio);
+  }
+
+  window.CatalogoProductos = { cargar, buscar, precio, tarifa };
+})();
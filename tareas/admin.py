@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import Tarea
+
+
+@admin.register(Tarea)
+class TareaAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'estado', 'progreso', 'intentos', 'usuario', 'creada', 'terminada')
+    list_filter = ('estado', 'tipo')
+    readonly_fields = ('creada', 'iniciada', 'terminada', 'latido', 'trabajador', 'error')
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class TareasConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'tareas'
+
+    def ready(self):
+        # Cada app declara sus tareas en <app>/tareas.py (ver tareas/utils.py)
+        from django.utils.module_loading import autodiscover_modules
+        autodiscover_modules('tareas')
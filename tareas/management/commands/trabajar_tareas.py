@@ -0,0 +1,46 @@
+import os
+import signal
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from tareas.utils import procesar_pendientes, purgar_resultados, recuperar_vencidas
+
+# Segundos entre limpiezas de los archivos de resultados vencidos
+PURGA = 3600
+
+
+class Command(BaseCommand):
+    help = "Ejecuta las tareas en segundo plano encoladas (exportaciones, reconstrucciones)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--espera', type=float, default=2.0,
+                            help="Segundos entre revisiones de la cola cuando está vacía (por defecto 2)")
+        parser.add_argument('--una-vez', action='store_true',
+                            help="Procesa lo pendiente y termina (p.ej. desde cron)")
+
+    def handle(self, *args, **options):
+        trabajador = f"{socket.gethostname()}:{os.getpid()}"
+        self.detener = False
+
+        def detener(*_):
+            # Termina la tarea en curso y sale
+            self.detener = True
+
+        signal.signal(signal.SIGTERM, detener)
+        signal.signal(signal.SIGINT, detener)
+
+        self.stdout.write(f"Trabajador {trabajador} esperando tareas…")
+        total, ultima_purga = 0, None
+        while not self.detener:
+            recuperar_vencidas()
+            if ultima_purga is None or time.monotonic() - ultima_purga >= PURGA:
+                purgar_resultados()
+                ultima_purga = time.monotonic()
+            procesadas = procesar_pendientes(trabajador, detener=lambda: self.detener)
+            total += procesadas
+            if options['una_vez']:
+                break
+            if not procesadas:
+                time.sleep(options['espera'])
+        self.stdout.write(self.style.SUCCESS(f"✓ Tareas procesadas: {total}"))
@@ -0,0 +1,90 @@
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class Tarea(models.Model):
+    """Trabajo en segundo plano: lo encola una vista o un comando y lo ejecuta trabajar_tareas."""
+    PENDIENTE = 'PENDIENTE'
+    EN_CURSO = 'EN_CURSO'
+    TERMINADA = 'TERMINADA'
+    FALLIDA = 'FALLIDA'
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (EN_CURSO, 'En curso'),
+        (TERMINADA, 'Terminada'),
+        (FALLIDA, 'Fallida'),
+    ]
+
+    tipo = models.CharField(max_length=100, verbose_name="Tipo")  # clave en tareas.utils.TAREAS
+    parametros = models.JSONField(default=dict, blank=True)
+    estado = models.CharField(max_length=12, choices=ESTADOS, default=PENDIENTE)
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+',
+        verbose_name="Solicitada por",
+    )
+    intentos = models.PositiveSmallIntegerField(default=0)
+    max_intentos = models.PositiveSmallIntegerField(default=3)
+    # Un reintento espera hasta esta hora
+    disponible_desde = models.DateTimeField(default=timezone.now)
+    progreso = models.PositiveSmallIntegerField(default=0)  # 0 a 100
+    mensaje = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    resultado = models.CharField(max_length=255, blank=True)  # archivo, relativo a TAREAS_DIR
+    trabajador = models.CharField(max_length=100, blank=True)
+    creada = models.DateTimeField(auto_now_add=True)
+    iniciada = models.DateTimeField(null=True, blank=True)
+    terminada = models.DateTimeField(null=True, blank=True)
+    # Lo renuevan el trabajador (cada LATIDO) y cada aviso de progreso; una tarea
+    # en curso sin latido se da por abandonada
+    latido = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"#{self.pk} {self.tipo} ({self.get_estado_display()})"
+
+    @property
+    def titulo(self):
+        from .utils import TAREAS
+        definicion = TAREAS.get(self.tipo)
+        return definicion.titulo if definicion else self.tipo
+
+    @property
+    def activa(self):
+        return self.estado in (self.PENDIENTE, self.EN_CURSO)
+
+    @property
+    def nombre_resultado(self):
+        return Path(self.resultado).name if self.resultado else ""
+
+    def archivo_resultado(self, nombre):
+        """Ruta donde la tarea deja su archivo de resultado (se descarga desde la página de la tarea)."""
+        relativa = Path(str(self.pk)) / nombre
+        ruta = Path(settings.TAREAS_DIR) / relativa
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        self.resultado = str(relativa)
+        return ruta
+
+    def avanzar(self, progreso, mensaje=None, cada=1.0):
+        """
+        Informa el avance (0 a 100) y renueva el latido. Escribe como mucho
+        una vez por `cada` segundos, así se puede llamar en cada bloque.
+        """
+        ahora = time.monotonic()
+        if ahora - getattr(self, '_ultimo_aviso', 0) < cada and progreso < 100:
+            return
+        self._ultimo_aviso = ahora
+        self.progreso = max(0, min(100, int(progreso)))
+        campos = {'progreso': self.progreso, 'latido': timezone.now()}
+        if mensaje is not None:
+            self.mensaje = campos['mensaje'] = mensaje[:255]
+        Tarea.objects.filter(pk=self.pk).update(**campos)
+
+    class Meta:
+        verbose_name = "Tarea"
+        verbose_name_plural = "Tareas"
+        ordering = ['-id']
+        # Cola: pendientes disponibles en orden de llegada
+        indexes = [models.Index(fields=['estado', 'disponible_desde', 'id'], name='tarea_cola_idx')]
@@ -0,0 +1,135 @@
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+from proyectof.testing import PruebaVistas
+from . import utils
+from .models import Tarea
+
+
+@utils.tarea('pruebas.falla', "Tarea que siempre falla", max_intentos=2)
+def _falla(tarea):
+    raise RuntimeError("falla a propósito")
+
+
+@utils.tarea('pruebas.archivo', "Tarea con archivo")
+def _archivo(tarea, texto):
+    tarea.avanzar(50, "a mitad")
+    tarea.archivo_resultado("salida.txt").write_text(texto)
+    return "listo"
+
+
+@utils.tarea('pruebas.larga', "Tarea larga sin avisos de avance")
+def _larga(tarea):
+    time.sleep(0.5)
+    # Para este momento el latido inicial ya se venció
+    return f"recuperadas: {utils.recuperar_vencidas()}"
+
+
+class ColaTests(PruebaVistas):
+    def setUp(self):
+        super().setUp()
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        ajuste = override_settings(TAREAS_DIR=carpeta.name)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+
+    def test_resultado_y_descarga(self):
+        tarea = utils.encolar('pruebas.archivo', usuario=self.datos['usuario'], texto="hola")
+        self.assertEqual(utils.procesar_pendientes('pruebas'), 1)
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, tarea.progreso, tarea.mensaje, tarea.intentos), (Tarea.TERMINADA, 100, "listo", 1))
+        respuesta = self.client.get(reverse('tareas:tarea_descargar', args=[tarea.pk]))
+        self.assertEqual(b''.join(respuesta.streaming_content), b"hola")
+
+    def test_reintentos(self):
+        tarea = utils.encolar('pruebas.falla')
+        utils.procesar_pendientes('pruebas')
+        tarea.refresh_from_db()
+        # Falló el primer intento: vuelve a la cola, pero no antes de la espera
+        self.assertEqual((tarea.estado, tarea.intentos), (Tarea.PENDIENTE, 1))
+        self.assertGreater(tarea.disponible_desde, timezone.now())
+        self.assertIsNone(utils.reclamar('pruebas'))
+
+        Tarea.objects.filter(pk=tarea.pk).update(disponible_desde=timezone.now())
+        utils.procesar_pendientes('pruebas')
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, tarea.intentos), (Tarea.FALLIDA, 2))
+        self.assertIn("falla a propósito", tarea.error)
+
+    def test_vencidas_vuelven_a_la_cola(self):
+        tarea = utils.encolar('pruebas.archivo', texto="x")
+        utils.reclamar('muerto')
+        Tarea.objects.filter(pk=tarea.pk).update(latido=timezone.now() - utils.VENCIMIENTO * 2)
+        self.assertEqual(utils.recuperar_vencidas(), 1)
+        self.assertEqual(utils.reclamar('vivo').pk, tarea.pk)
+
+    def test_purgar_resultados(self):
+        vieja = utils.encolar('pruebas.archivo', texto="viejo")
+        nueva = utils.encolar('pruebas.archivo', texto="nuevo")
+        utils.procesar_pendientes('pruebas')
+        Tarea.objects.filter(pk=vieja.pk).update(terminada=timezone.now() - utils.RETENCION * 2)
+        huerfana = Path(settings.TAREAS_DIR) / "999999"
+        huerfana.mkdir()
+
+        self.assertEqual(utils.purgar_resultados(), 2)
+        vieja.refresh_from_db()
+        nueva.refresh_from_db()
+        self.assertEqual(vieja.resultado, "")
+        self.assertFalse((Path(settings.TAREAS_DIR) / str(vieja.pk)).exists() or huerfana.exists())
+        self.assertTrue((Path(settings.TAREAS_DIR) / nueva.resultado).is_file())
+
+    def test_requiere_sesion(self):
+        tarea = utils.encolar('pruebas.archivo', texto="x")
+        utils.procesar_pendientes('pruebas')
+        self.client.logout()
+        for nombre, args in (('tareas_list', []), ('tarea_detail', [tarea.pk]), ('tarea_descargar', [tarea.pk])):
+            respuesta = self.client.get(reverse(f'tareas:{nombre}', args=args))
+            self.assertEqual(respuesta.status_code, 302, nombre)
+            self.assertTrue(respuesta['Location'].startswith(reverse('accounts:login')), nombre)
+        self.client.post(reverse('tareas:tarea_encolar'), {'tipo': 'kardex.actualizar_costos'})
+        self.assertFalse(Tarea.objects.filter(tipo='kardex.actualizar_costos').exists())
+
+    def test_exportar_kardex(self):
+        respuesta = self.client.get(reverse('kardex:kardex_export_excel'))
+        tarea = Tarea.objects.get(tipo='kardex.exportar_excel')
+        self.assertRedirects(respuesta, reverse('tareas:tarea_detail', args=[tarea.pk]))
+        utils.procesar_pendientes('pruebas')
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, Tarea.TERMINADA, tarea.error)
+        hoja = load_workbook(Path(settings.TAREAS_DIR) / tarea.resultado, read_only=True).active
+        self.assertEqual(hoja.cell(row=1, column=1).value, "KARDEX DE PRODUCTOS")
+
+
+class LatidoTests(TransactionTestCase):
+    # El hilo del latido usa su propia conexión: sin la transacción de TestCase
+    def test_tarea_larga_no_vuelve_a_la_cola(self):
+        tarea = utils.encolar('pruebas.larga')
+        with mock.patch.object(utils, 'LATIDO', timedelta(seconds=0.05)), \
+                mock.patch.object(utils, 'VENCIMIENTO', timedelta(seconds=0.3)):
+            self.assertEqual(utils.procesar_pendientes('pruebas'), 1)
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, tarea.intentos, tarea.mensaje), (Tarea.TERMINADA, 1, "recuperadas: 0"))
+        self.assertGreater(tarea.latido, tarea.iniciada)
+
+
+class PresupuestoVistasTests(PruebaVistas):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for _ in range(30):
+            utils.encolar('kardex.actualizar_costos', usuario=cls.datos['usuario'])
+
+    def test_listado(self):
+        self.assertPresupuesto(3, reverse('tareas:tareas_list'))
+
+    def test_detalle(self):
+        self.assertPresupuesto(3, reverse('tareas:tarea_detail', args=[Tarea.objects.first().pk]))
@@ -0,0 +1,11 @@
+from django.urls import path
+from . import views
+
+app_name = 'tareas'
+
+urlpatterns = [
+    path('', views.tareas_list, name='tareas_list'),
+    path('encolar/', views.tarea_encolar, name='tarea_encolar'),
+    path('<int:pk>/', views.tarea_detail, name='tarea_detail'),
+    path('<int:pk>/descargar/', views.tarea_descargar, name='tarea_descargar'),
+]
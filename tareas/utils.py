@@ -0,0 +1,207 @@
+"""
+Cola de tareas en segundo plano sobre la propia base de datos (sin broker).
+
+Cada app declara sus tareas en <app>/tareas.py con el decorador @tarea:
+
+    @tarea('kardex.exportar_excel', "Exportar Kardex a Excel")
+    def exportar_excel(tarea, filtros):
+        ...
+        tarea.avanzar(50)                      # progreso 0 a 100
+        ruta = tarea.archivo_resultado("kardex.xlsx")
+        return "1234 movimientos"              # mensaje final
+
+Una vista encola con encolar() y redirige a la página de la tarea; el
+comando trabajar_tareas (proceso "worker" del Procfile) las ejecuta. Cada
+trabajador toma la siguiente con SELECT ... FOR UPDATE SKIP LOCKED, así
+varios trabajadores no se esperan ni toman la misma. Una tarea que falla se
+reintenta más tarde hasta max_intentos; una en curso cuyo latido se venció
+(el trabajador murió) vuelve a la cola. Mientras una tarea corre, un hilo del
+trabajador renueva su latido, aunque la tarea no informe avance. Los archivos
+de resultado se borran pasados TAREAS_RETENCION días (ver purgar_resultados).
+"""
+import shutil
+import threading
+import traceback
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import Tarea
+
+Definicion = namedtuple('Definicion', ['funcion', 'titulo', 'manual', 'max_intentos'])
+
+# Tipo → Definicion; lo llenan los módulos tareas.py de cada app al arrancar
+TAREAS = {}
+
+# Espera antes del primer reintento; se duplica en cada uno
+REINTENTO = timedelta(seconds=getattr(settings, 'TAREAS_REINTENTO', 30))
+# Una tarea en curso sin latido en este lapso se da por abandonada
+VENCIMIENTO = timedelta(seconds=getattr(settings, 'TAREAS_VENCIMIENTO', 600))
+# Cada cuánto renueva el trabajador el latido de la tarea que está corriendo
+LATIDO = timedelta(seconds=getattr(settings, 'TAREAS_LATIDO', VENCIMIENTO.total_seconds() / 4))
+# Los archivos de una tarea se conservan este lapso después de que terminó
+RETENCION = timedelta(days=getattr(settings, 'TAREAS_RETENCION', 7))
+
+
+def tarea(tipo, titulo, manual=False, max_intentos=3):
+    """
+    Registra una función como tarea. manual=True la ofrece en la lista de
+    tareas para encolarla a mano (sin parámetros).
+    """
+    def registrar(funcion):
+        TAREAS[tipo] = Definicion(funcion, titulo, manual, max_intentos)
+        return funcion
+    return registrar
+
+
+def encolar(tipo, usuario=None, **parametros):
+    """Crea una tarea pendiente; los parámetros deben poder guardarse como JSON."""
+    if tipo not in TAREAS:
+        raise ValueError(f"Tarea desconocida: {tipo}")
+    if usuario is not None and not getattr(usuario, 'is_authenticated', True):
+        usuario = None
+    return Tarea.objects.create(tipo=tipo, parametros=parametros, usuario=usuario,
+                                max_intentos=TAREAS[tipo].max_intentos)
+
+
+def encolar_unica(tipo, **parametros):
+    """
+    Encola una tarea de mantenimiento salvo que ya haya una igual esperando:
+    la que está pendiente hará el trabajo de todas. Devuelve esa tarea.
+    """
+    pendiente = Tarea.objects.filter(tipo=tipo, estado=Tarea.PENDIENTE, parametros=parametros).first()
+    return pendiente or encolar(tipo, **parametros)
+
+
+def reclamar(trabajador):
+    """Toma la siguiente tarea disponible y la marca en curso, o devuelve None."""
+    ahora = timezone.now()
+    with transaction.atomic():
+        siguiente = (
+            Tarea.objects.select_for_update(skip_locked=True)
+            .filter(estado=Tarea.PENDIENTE, disponible_desde__lte=ahora)
+            .order_by('disponible_desde', 'id')
+            .first()
+        )
+        if siguiente is None:
+            return None
+        siguiente.estado = Tarea.EN_CURSO
+        siguiente.intentos += 1
+        siguiente.trabajador = trabajador
+        siguiente.iniciada = siguiente.latido = ahora
+        siguiente.save(update_fields=['estado', 'intentos', 'trabajador', 'iniciada', 'latido'])
+    return siguiente
+
+
+def ejecutar(tarea):
+    """Corre una tarea ya reclamada y guarda el resultado o el error. Devuelve True si terminó bien."""
+    definicion = TAREAS.get(tarea.tipo)
+    try:
+        if definicion is None:
+            raise LookupError(f"Tarea desconocida: {tarea.tipo}")
+        mensaje = definicion.funcion(tarea, **tarea.parametros)
+    except Exception:
+        tarea.error = traceback.format_exc()
+        if definicion is not None and tarea.intentos < tarea.max_intentos:
+            tarea.estado = Tarea.PENDIENTE
+            tarea.disponible_desde = timezone.now() + REINTENTO * 2 ** (tarea.intentos - 1)
+            tarea.mensaje = f"Falló el intento {tarea.intentos} de {tarea.max_intentos}; se reintentará"
+        else:
+            tarea.estado = Tarea.FALLIDA
+            tarea.terminada = timezone.now()
+            tarea.mensaje = "Falló"
+        tarea.save(update_fields=['estado', 'error', 'disponible_desde', 'mensaje', 'terminada'])
+        return False
+
+    tarea.estado = Tarea.TERMINADA
+    tarea.progreso = 100
+    tarea.terminada = timezone.now()
+    if mensaje:
+        tarea.mensaje = str(mensaje)[:255]
+    tarea.save(update_fields=['estado', 'progreso', 'terminada', 'mensaje', 'resultado'])
+    return True
+
+
+@contextmanager
+def latiendo(tarea):
+    """
+    Renueva el latido de una tarea en curso cada LATIDO desde un hilo aparte
+    (con su propia conexión) mientras dura el bloque.
+    """
+    parar = threading.Event()
+
+    def latir():
+        try:
+            while not parar.wait(LATIDO.total_seconds()):
+                try:
+                    Tarea.objects.filter(pk=tarea.pk, estado=Tarea.EN_CURSO).update(latido=timezone.now())
+                except DatabaseError:
+                    # Se reintenta en el próximo latido con una conexión nueva
+                    connection.close()
+        finally:
+            connection.close()
+
+    hilo = threading.Thread(target=latir, name=f"latido-tarea-{tarea.pk}", daemon=True)
+    hilo.start()
+    try:
+        yield
+    finally:
+        parar.set()
+        hilo.join()
+
+
+def recuperar_vencidas():
+    """Devuelve a la cola (o da por fallidas) las tareas en curso cuyo trabajador dejó de dar señales."""
+    vencidas = Tarea.objects.filter(estado=Tarea.EN_CURSO, latido__lt=timezone.now() - VENCIMIENTO)
+    mensaje = "El trabajador dejó de responder"
+    fallidas = vencidas.filter(intentos__gte=F('max_intentos')).update(
+        estado=Tarea.FALLIDA, mensaje=mensaje, terminada=timezone.now(),
+    )
+    devueltas = vencidas.update(estado=Tarea.PENDIENTE, mensaje=mensaje)
+    return devueltas + fallidas
+
+
+def purgar_resultados():
+    """
+    Borra las carpetas de resultados (TAREAS_DIR/<id>) de las tareas que
+    terminaron o fallaron hace más de RETENCION, o que ya no existen; la
+    tarea queda sin descarga. Devuelve cuántas carpetas borró.
+    """
+    raiz = Path(settings.TAREAS_DIR)
+    if not raiz.is_dir():
+        return 0
+    carpetas = {int(c.name): c for c in raiz.iterdir() if c.is_dir() and c.name.isdigit()}
+    if not carpetas:
+        return 0
+    vigentes = set(
+        Tarea.objects.filter(pk__in=carpetas)
+        .filter(Q(terminada__isnull=True) | Q(terminada__gte=timezone.now() - RETENCION))
+        .values_list('pk', flat=True)
+    )
+    purgadas = sorted(set(carpetas) - vigentes)
+    for pk in purgadas:
+        shutil.rmtree(carpetas[pk], ignore_errors=True)
+    Tarea.objects.filter(pk__in=purgadas).exclude(resultado='').update(resultado='')
+    return len(purgadas)
+
+
+def procesar_pendientes(trabajador, detener=lambda: False, limite=None):
+    """Ejecuta tareas hasta vaciar la cola (o hasta `limite`, o hasta que detener() sea verdadero)."""
+    procesadas = 0
+    while not detener() and (limite is None or procesadas < limite):
+        # Proceso de larga vida: cada tarea empieza con una conexión sana
+        # (dentro de una transacción, p.ej. en las pruebas, no se toca)
+        if not transaction.get_connection().in_atomic_block:
+            close_old_connections()
+        siguiente = reclamar(trabajador)
+        if siguiente is None:
+            break
+        with latiendo(siguiente):
+            ejecutar(siguiente)
+        procesadas += 1
+    return procesadas
@@ -0,0 +1,76 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+
+from proyectof.paginacion import paginar, pide_json
+from .models import Tarea
+from .utils import TAREAS, encolar
+
+
+def _como_dict(tarea):
+    return {
+        'id': tarea.id,
+        'tipo': tarea.tipo,
+        'titulo': tarea.titulo,
+        'estado': tarea.estado,
+        'progreso': tarea.progreso,
+        'mensaje': tarea.mensaje,
+        'intentos': tarea.intentos,
+        'descarga': reverse('tareas:tarea_descargar', args=[tarea.pk]) if tarea.resultado else None,
+    }
+
+
+# ======================
+# LISTA DE TAREAS
+# ======================
+@login_required
+def tareas_list(request):
+    tareas = Tarea.objects.select_related('usuario').defer('parametros', 'error')
+    pagina = paginar(tareas, ('-id',), request.GET)
+
+    if pide_json(request):
+        return pagina.como_json(_como_dict)
+
+    manuales = sorted((tipo, d.titulo) for tipo, d in TAREAS.items() if d.manual)
+    return render(request, 'tareas/tareas_list.html', {'tareas': pagina, 'pagina': pagina, 'manuales': manuales})
+
+
+@login_required
+@require_POST
+def tarea_encolar(request):
+    """Encola una tarea de mantenimiento (las marcadas manual=True)."""
+    tipo = request.POST.get('tipo')
+    definicion = TAREAS.get(tipo)
+    if definicion is None or not definicion.manual:
+        messages.error(request, "Tarea no disponible.")
+        return redirect('tareas:tareas_list')
+    tarea = encolar(tipo, usuario=request.user)
+    return redirect('tareas:tarea_detail', pk=tarea.pk)
+
+
+# ======================
+# DETALLE Y DESCARGA
+# ======================
+@login_required
+def tarea_detail(request, pk):
+    tarea = get_object_or_404(Tarea.objects.select_related('usuario'), pk=pk)
+    if pide_json(request):
+        return JsonResponse(_como_dict(tarea))
+    return render(request, 'tareas/tarea_detail.html', {'tarea': tarea})
+
+
+@login_required
+def tarea_descargar(request, pk):
+    tarea = get_object_or_404(Tarea.objects.only('id', 'estado', 'resultado'), pk=pk)
+    if tarea.estado != Tarea.TERMINADA or not tarea.resultado:
+        raise Http404("La tarea no tiene un archivo para descargar.")
+    ruta = Path(settings.TAREAS_DIR) / tarea.resultado
+    if not ruta.is_file():
+        raise Http404("El archivo de la tarea ya no existe.")
+    return FileResponse(open(ruta, 'rb'), as_attachment=True, filename=ruta.name)
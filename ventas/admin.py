@@ -1,5 +1,14 @@
-from django.contrib import admin
-from .models import Venta, DetalleVenta
+from django import forms
+from django.contrib import admin, messages
+from django.shortcuts import redirect, render
+from django.urls import path
+from .importacion import ArchivoInvalido, importar_ventas
+from .models import Venta, DetalleVenta, ResumenVentaProducto, ResumenVentaCliente, ResumenVentaEncargado
+
+class ImportarVentasForm(forms.Form):
+    archivo = forms.FileField(help_text="CSV (UTF-8) o XLSX con una fila por línea de venta")
+    lote = forms.IntegerField(min_value=1, max_value=10000, required=False, help_text="Ventas por transacción")
+
 
 class DetalleVentaInline(admin.TabularInline):
     model = DetalleVenta
@@ -11,4 +20,64 @@ class VentaAdmin(admin.ModelAdmin):
     list_display = ('id', 'fecha', 'numero_documento', 'cliente', 'total', 'encargado')
     fields = ('fecha', 'numero_documento', 'cliente', 'encargado', 'comentarios', 'total')
     readonly_fields = ('fecha', 'numero_documento', 'total')
-    inlines = [DetalleVentaInline]
\ No newline at end of file
+    inlines = [DetalleVentaInline]
+    change_list_template = 'admin/ventas/venta/change_list.html'
+
+    # Rechazos que se muestran en pantalla; el comando importar_ventas los guarda todos
+    RECHAZOS_VISIBLES = 100
+
+    def get_urls(self):
+        return [
+            path('importar/', self.admin_site.admin_view(self.importar_view), name='ventas_venta_importar'),
+        ] + super().get_urls()
+
+    def importar_view(self, request):
+        """Carga de ventas históricas desde CSV / XLSX (ver ventas/importacion.py)."""
+        if not self.has_add_permission(request):
+            return redirect('admin:ventas_venta_changelist')
+
+        form = ImportarVentasForm(request.POST or None, request.FILES or None)
+        resultado, rechazos = None, []
+        if request.method == 'POST' and form.is_valid():
+            archivo = form.cleaned_data['archivo']
+
+            def rechazar(fila, documento, motivo):
+                if len(rechazos) < self.RECHAZOS_VISIBLES:
+                    rechazos.append((fila, documento, motivo))
+
+            try:
+                resultado = importar_ventas(archivo, nombre=archivo.name, lote=form.cleaned_data['lote'],
+                                            rechazos=rechazar)
+            except ArchivoInvalido as e:
+                form.add_error('archivo', str(e))
+            else:
+                nivel = messages.WARNING if resultado.rechazadas else messages.SUCCESS
+                self.message_user(request, str(resultado), nivel)
+
+        return render(request, 'admin/ventas/venta/importar.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': "Importar ventas históricas",
+            'form': form,
+            'resultado': resultado,
+            'rechazos': rechazos,
+        })
+
+
+@admin.register(ResumenVentaProducto)
+class ResumenVentaProductoAdmin(admin.ModelAdmin):
+    list_display = ('fecha', 'producto', 'cantidad', 'importe')
+    list_filter = ('fecha',)
+    date_hierarchy = 'fecha'
+
+
+@admin.register(ResumenVentaCliente)
+class ResumenVentaClienteAdmin(admin.ModelAdmin):
+    list_display = ('fecha', 'cliente', 'ventas', 'importe')
+    date_hierarchy = 'fecha'
+
+
+@admin.register(ResumenVentaEncargado)
+class ResumenVentaEncargadoAdmin(admin.ModelAdmin):
+    list_display = ('fecha', 'encargado', 'ventas', 'importe')
+    date_hierarchy = 'fecha'
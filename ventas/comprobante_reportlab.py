@@ -0,0 +1,160 @@
+"""
+Comprobante de venta dibujado directamente con ReportLab, sin pasar por
+HTML/CSS. Reproduce el diseño de ventas/pdf/venta_comprobante.html.
+"""
+from functools import lru_cache
+from io import BytesIO
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.utils import timezone
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_RIGHT
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import mm
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import Flowable, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+MARGEN_VERTICAL = 25 * mm
+MARGEN_LATERAL = 15 * mm
+ANCHO_LOGO = 140 * 0.75  # 140px de la plantilla HTML, en puntos
+
+
+@lru_cache(maxsize=None)
+def _fuentes():
+    """
+    Registra la fuente una sola vez por proceso. Usa COMPROBANTES_FUENTE_TTF
+    (p.ej. DejaVuSans.ttf) si está configurada; si no, Helvetica integrada.
+    """
+    ruta = getattr(settings, 'COMPROBANTES_FUENTE_TTF', None)
+    ruta_negrita = getattr(settings, 'COMPROBANTES_FUENTE_TTF_NEGRITA', None) or ruta
+    if ruta:
+        pdfmetrics.registerFont(TTFont('Comprobante', ruta))
+        pdfmetrics.registerFont(TTFont('Comprobante-Negrita', ruta_negrita))
+        return 'Comprobante', 'Comprobante-Negrita'
+    return 'Helvetica', 'Helvetica-Bold'
+
+
+@lru_cache(maxsize=None)
+def _logo():
+    """Logo leído y decodificado una sola vez por proceso (None si no existe)."""
+    ruta = finders.find('img/logo.png')
+    if not ruta:
+        return None
+    lector = ImageReader(ruta)
+    ancho, alto = lector.getSize()
+    return lector, ANCHO_LOGO * alto / ancho
+
+
+@lru_cache(maxsize=None)
+def _estilos():
+    normal, negrita = _fuentes()
+    return {
+        'normal': ParagraphStyle('normal', fontName=normal, fontSize=9, leading=12, textColor=colors.HexColor('#111111')),
+        'derecha': ParagraphStyle('derecha', fontName=normal, fontSize=9, leading=12, alignment=TA_RIGHT),
+        'titulo': ParagraphStyle('titulo', fontName=negrita, fontSize=13.5, leading=16, spaceBefore=6),
+        'comentarios': ParagraphStyle('comentarios', fontName=normal, fontSize=8.25, leading=11, textColor=colors.HexColor('#333333')),
+        'pie': ParagraphStyle('pie', fontName=normal, fontSize=7.5, leading=10, alignment=1, textColor=colors.HexColor('#666666')),
+        'negrita': negrita,
+    }
+
+
+class _Logo(Flowable):
+    """Dibuja el logo ya decodificado (ImageReader compartido) sin volver a leer el archivo."""
+
+    def __init__(self, lector, ancho, alto):
+        super().__init__()
+        self.lector, self.width, self.height = lector, ancho, alto
+
+    def draw(self):
+        self.canv.drawImage(self.lector, 0, 0, self.width, self.height, mask='auto')
+
+
+def _texto(valor):
+    return (str(valor) if valor is not None else 'None').replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _encabezado(estilos, ancho):
+    logo = _logo()
+    imagen = _Logo(logo[0], ANCHO_LOGO, logo[1]) if logo else ''
+    empresa = Paragraph(
+        "<b>Sistema de Inventario</b><br/>Comprobante de Venta<br/>Guatemala, C.A.", estilos['derecha']
+    )
+    tabla = Table([[imagen, empresa]], colWidths=[ancho / 2, ancho / 2])
+    tabla.setStyle(TableStyle([
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('ALIGN', (0, 0), (0, 0), 'LEFT'),
+        ('LEFTPADDING', (0, 0), (-1, -1), 0),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+        ('LINEBELOW', (0, 0), (-1, 0), 0.75, colors.HexColor('#999999')),
+    ]))
+    return tabla
+
+
+def render_venta_pdf(venta, detalles, generado=None):
+    """Devuelve los bytes del comprobante de `venta` con sus `detalles`."""
+    estilos = _estilos()
+    generado = timezone.localtime(generado or timezone.now())
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer, pagesize=A4,
+        leftMargin=MARGEN_LATERAL, rightMargin=MARGEN_LATERAL,
+        topMargin=MARGEN_VERTICAL, bottomMargin=MARGEN_VERTICAL,
+        title=f"Comprobante de Venta {venta.numero_documento}",
+    )
+    ancho = doc.width
+
+    meta = [
+        f"<b>No. Documento:</b> {_texto(venta.numero_documento)}",
+        f"<b>Fecha:</b> {venta.fecha.strftime('%d/%m/%Y') if venta.fecha else ''}",
+        f"<b>Cliente:</b> {_texto(venta.cliente)}",
+    ]
+    if venta.encargado:
+        vendedor = venta.encargado.get_full_name() or venta.encargado.username
+        meta.append(f"<b>Vendedor:</b> {_texto(vendedor)}")
+
+    filas = [['Producto', 'Cant.', 'Precio', 'Subtotal']]
+    for d in detalles:
+        filas.append([
+            Paragraph(_texto(d.producto), estilos['normal']),
+            str(d.cantidad),
+            f"Q {d.precio_unitario:.2f}",
+            f"Q {(d.cantidad * d.precio_unitario):.2f}",
+        ])
+    lineas = Table(filas, colWidths=[ancho * 0.5, ancho * 0.1, ancho * 0.2, ancho * 0.2], repeatRows=1)
+    lineas.setStyle(TableStyle([
+        ('FONTNAME', (0, 0), (-1, -1), _fuentes()[0]),
+        ('FONTNAME', (0, 0), (-1, 0), estilos['negrita']),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f2f2f2')),
+        ('GRID', (0, 0), (-1, -1), 0.75, colors.HexColor('#999999')),
+        ('ALIGN', (1, 0), (1, -1), 'CENTER'),
+        ('ALIGN', (2, 1), (3, -1), 'RIGHT'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('TOPPADDING', (0, 0), (-1, -1), 4.5),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 4.5),
+    ]))
+
+    historia = [_encabezado(estilos, ancho), Paragraph("Comprobante de Venta", estilos['titulo'])]
+    historia += [Paragraph(linea, estilos['normal']) for linea in meta]
+    historia += [
+        Spacer(1, 8),
+        lineas,
+        Spacer(1, 6),
+        Paragraph(f"<b>Total:</b> Q {venta.total:.2f}", estilos['derecha']),
+    ]
+    if venta.comentarios:
+        historia += [
+            Spacer(1, 8),
+            Paragraph(f"<b>Comentarios:</b><br/>{_texto(venta.comentarios)}", estilos['comentarios']),
+        ]
+    historia += [
+        Spacer(1, 22),
+        Paragraph(f"Documento generado por el sistema el {generado.strftime('%d/%m/%Y %H:%M')}.", estilos['pie']),
+    ]
+
+    doc.build(historia)
+    return buffer.getvalue()
@@ -0,0 +1,113 @@
+import logging
+import os
+import tempfile
+from pathlib import Path
+from django.conf import settings
+from django.utils.timezone import now
+from .models import Venta
+from .utils import html_a_pdf
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_COMPROBANTE = 'ventas/pdf/venta_comprobante.html'
+
+# 'html' (plantilla + xhtml2pdf) o 'reportlab' (dibujo directo, más rápido)
+MOTORES = ('html', 'reportlab')
+MOTOR_POR_DEFECTO = getattr(settings, 'COMPROBANTES_MOTOR', 'html')
+
+# Carpeta local del caché y tamaño máximo antes de desalojar (LRU por fecha de último uso)
+CACHE_DIR = Path(getattr(settings, 'COMPROBANTES_CACHE_DIR', settings.BASE_DIR / 'cache' / 'comprobantes'))
+CACHE_MAX_BYTES = int(getattr(settings, 'COMPROBANTES_CACHE_MAX_MB', 200)) * 1024 * 1024
+
+
+def elegir_motor(motor=None):
+    """Motor pedido si es válido; si no, el configurado en COMPROBANTES_MOTOR."""
+    return motor if motor in MOTORES else MOTOR_POR_DEFECTO
+
+
+def etag(venta, motor=None):
+    """ETag del comprobante: cambia cada vez que se edita la venta o sus líneas."""
+    return f'"venta-{venta.pk}-{venta.version}-{elegir_motor(motor)}"'
+
+
+def ruta_cache(venta, motor=None):
+    return CACHE_DIR / f"venta_{venta.pk}_v{venta.version}_{elegir_motor(motor)}.pdf"
+
+
+def contexto_comprobante(venta):
+    venta = (
+        Venta.objects.select_related('cliente', 'encargado')
+        .prefetch_related('detalles__producto')
+        .get(pk=venta.pk)
+    )
+    return {
+        'venta': venta,
+        'detalles': sorted(venta.detalles.all(), key=lambda d: d.id),
+        'now': now(),
+    }
+
+
+def renderizar_comprobante(venta, motor=None):
+    """
+    Genera el PDF (bytes) sin pasar por el caché; None si xhtml2pdf falla.
+    Con el motor 'reportlab', cualquier error vuelve al camino HTML.
+    """
+    contexto = contexto_comprobante(venta)
+    if elegir_motor(motor) == 'reportlab':
+        from .comprobante_reportlab import render_venta_pdf
+        try:
+            return render_venta_pdf(contexto['venta'], contexto['detalles'], contexto['now'])
+        except Exception:
+            logger.exception("Falló ReportLab para la venta %s; se usa la plantilla HTML", venta.pk)
+    contenido, _ = html_a_pdf(TEMPLATE_COMPROBANTE, contexto)
+    return contenido
+
+
+def obtener_comprobante(venta, motor=None):
+    """
+    Devuelve la ruta del PDF en caché para la versión actual de la venta,
+    renderizándolo solo si no existe. None si no se pudo generar.
+    """
+    ruta = ruta_cache(venta, motor)
+    if ruta.exists():
+        # Marca de último uso para el desalojo LRU
+        os.utime(ruta)
+        return ruta
+
+    contenido = renderizar_comprobante(venta, motor)
+    if contenido is None:
+        return None
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    # Escritura atómica: otro worker nunca ve un archivo a medias
+    fd, temporal = tempfile.mkstemp(dir=CACHE_DIR, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(contenido)
+    os.replace(temporal, ruta)
+
+    _desalojar()
+    return ruta
+
+
+def _desalojar():
+    """Borra los comprobantes menos usados hasta quedar bajo el límite de tamaño."""
+    archivos = []
+    total = 0
+    for entrada in os.scandir(CACHE_DIR):
+        if entrada.is_file() and entrada.name.endswith('.pdf'):
+            info = entrada.stat()
+            archivos.append((info.st_mtime, info.st_size, entrada.path))
+            total += info.st_size
+    if total <= CACHE_MAX_BYTES:
+        return
+
+    # Deja un margen para no desalojar en cada escritura
+    objetivo = CACHE_MAX_BYTES * 0.9
+    for _, tamano, ruta in sorted(archivos):
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+        total -= tamano
+        if total <= objetivo:
+            break
@@ -0,0 +1,136 @@
+import math
+import multiprocessing
+import os
+from functools import partial
+from itertools import islice
+import shutil
+import tempfile
+import zipfile
+from django.conf import settings
+from django.db import connection, connections
+from pypdf import PdfWriter
+from .models import Venta
+from . import comprobantes
+
+# Procesos que renderizan comprobantes en paralelo (xhtml2pdf usa un solo núcleo).
+# Solo fuera de las peticiones web: el comando exportar_comprobantes y la tarea del PDF unido
+PROCESOS_EXPORTACION = getattr(settings, 'EXPORTACION_PROCESOS', None) or os.cpu_count() or 1
+# Comprobantes por PDF unido: pypdf guarda las páginas en memoria hasta escribir,
+# así que los rangos más grandes se parten en varios PDF dentro de un ZIP
+COMPROBANTES_POR_PDF = getattr(settings, 'EXPORTACION_COMPROBANTES_POR_PDF', 500)
+
+
+def _comprobante_worker(venta_id, motor=None):
+    """Deja el PDF en el caché y devuelve su ruta (en un proceso hijo o en este)."""
+    venta = Venta.objects.only('id', 'numero_documento', 'version').get(pk=venta_id)
+    ruta = comprobantes.obtener_comprobante(venta, motor)
+    return venta.numero_documento, (str(ruta) if ruta else None)
+
+
+def generar_comprobantes(ids, procesos=1, motor=None):
+    """
+    Genera (numero_documento, ruta) en el orden de `ids`. Con procesos > 1
+    renderiza en un pool de procesos: los hijos solo devuelven rutas del
+    caché de disco, así el proceso principal nunca guarda más de un PDF en
+    memoria. El pool cierra las conexiones de este proceso antes de
+    bifurcarlo, por eso no se usa dentro de una petición web ni de una
+    transacción (ahí se renderiza en serie).
+    """
+    procesos = max(1, min(procesos or 1, len(ids)))
+    if procesos == 1 or connection.in_atomic_block:
+        for venta_id in ids:
+            numero, ruta = _comprobante_worker(venta_id, motor)
+            if ruta is not None:
+                yield numero, ruta
+        return
+
+    # Las conexiones abiertas no se deben heredar por fork
+    connections.close_all()
+    contexto = multiprocessing.get_context('fork')
+    with contexto.Pool(procesos) as pool:
+        for numero, ruta in pool.imap(partial(_comprobante_worker, motor=motor), ids, chunksize=4):
+            if ruta is not None:
+                yield numero, ruta
+
+
+class _SalidaStream:
+    """Destino de escritura para zipfile que acumula bytes hasta que el generador los entrega."""
+
+    def __init__(self):
+        self._partes = []
+        self._posicion = 0
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        self._posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self._posicion
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self._partes)
+        self._partes = []
+        return datos
+
+
+def zip_en_stream(ids, procesos=1, motor=None):
+    """Genera un ZIP por partes con un comprobante por venta (memoria constante)."""
+    salida = _SalidaStream()
+    with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for numero, ruta in generar_comprobantes(ids, procesos, motor):
+            with open(ruta, 'rb') as origen, zf.open(f"venta_{numero}.pdf", 'w') as destino:
+                shutil.copyfileobj(origen, destino, 64 * 1024)
+            yield salida.vaciar()
+    yield salida.vaciar()
+
+
+def volumenes(total):
+    """Cuántos PDF salen al unir `total` comprobantes (más de uno: van en un ZIP)."""
+    return max(1, math.ceil(total / COMPROBANTES_POR_PDF))
+
+
+def _escribir_pdf(rutas, destino):
+    writer = PdfWriter()
+    for ruta in rutas:
+        writer.append(ruta)
+    writer.write(destino)
+    writer.close()
+
+
+def pdf_unido(ids, destino, procesos=1, motor=None, avance=None):
+    """
+    Une los comprobantes en `destino` (ruta o archivo binario). Hasta
+    COMPROBANTES_POR_PDF sale un solo PDF; con más, un ZIP con un PDF por
+    cada tramo de ese tamaño (ver volumenes()), así la memoria no crece con
+    el rango. avance(comprobantes) se llama por cada uno.
+    """
+    rutas = (ruta for _, ruta in generar_comprobantes(ids, procesos, motor))
+    if avance is not None:
+        rutas = _con_avance(rutas, avance)
+    partes = volumenes(len(ids))
+    if partes == 1:
+        _escribir_pdf(rutas, destino)
+        return
+
+    ancho = len(str(partes))
+    with zipfile.ZipFile(destino, 'w') as zf:
+        for numero in range(1, partes + 1):
+            tramo = list(islice(rutas, COMPROBANTES_POR_PDF))
+            if not tramo:
+                break
+            # Cada tramo pasa por un archivo temporal (los PDF ya vienen comprimidos)
+            with tempfile.TemporaryFile() as temporal:
+                _escribir_pdf(tramo, temporal)
+                temporal.seek(0)
+                with zf.open(f"comprobantes_{numero:0{ancho}d}.pdf", 'w') as salida:
+                    shutil.copyfileobj(temporal, salida, 64 * 1024)
+
+
+def _con_avance(rutas, avance):
+    for i, ruta in enumerate(rutas, start=1):
+        yield ruta
+        avance(i)
@@ -1,12 +1,88 @@
+import re
 from django import forms
+from django.forms import BaseInlineFormSet
+from productos.models import Producto
 from .models import Venta, DetalleVenta
 
+
 class VentaForm(forms.ModelForm):
     class Meta:
         model = Venta
         fields = ['cliente', 'encargado', 'comentarios']
 
+
+class ProductoChoiceField(forms.ModelChoiceField):
+    """Resuelve el producto desde un diccionario precargado en vez de una consulta por línea."""
+
+    precargados = None
+
+    def to_python(self, value):
+        if self.precargados is not None and value not in self.empty_values:
+            try:
+                producto = self.precargados.get(int(value))
+            except (TypeError, ValueError):
+                producto = None
+            if producto is not None:
+                return producto
+        return super().to_python(value)
+
+
+
+class OpcionesCompartidasFormSet(BaseInlineFormSet):
+    """
+    Formset cuyas líneas comparten las opciones de los select de
+    `campos_compartidos`: el queryset se consulta una sola vez al renderizar,
+    no una vez por línea.
+    """
+
+    campos_compartidos = ('producto',)
+
+    def _construct_form(self, i, **kwargs):
+        form = super()._construct_form(i, **kwargs)
+        self._compartir_opciones(form)
+        return form
+
+    @property
+    def empty_form(self):
+        form = super().empty_form
+        self._compartir_opciones(form)
+        return form
+
+    def _compartir_opciones(self, form):
+        opciones = self.__dict__.setdefault('_opciones', {})
+        for nombre in self.campos_compartidos:
+            campo = form.fields.get(nombre)
+            if campo is None:
+                continue
+            if nombre not in opciones:
+                # iter(): list() directo sobre el iterador del queryset haría además un COUNT
+                opciones[nombre] = list(iter(campo.choices))
+            campo.choices = opciones[nombre]
+
+
 class DetalleVentaForm(forms.ModelForm):
+    def __init__(self, *args, productos=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if productos is not None:
+            self.fields['producto'].precargados = productos
+        # Vacío: se usa el precio de la lista del cliente al registrar la venta
+        self.fields['precio_unitario'].required = False
+
+    def _get_validation_exclusions(self):
+        excluidos = super()._get_validation_exclusions()
+        if self.fields['producto'].precargados is not None:
+            # El producto ya salió de los precargados: no hace falta otra consulta por línea
+            excluidos.add('producto')
+        return excluidos
+
     class Meta:
         model = DetalleVenta
         fields = ['producto', 'cantidad', 'precio_unitario']
+        field_classes = {'producto': ProductoChoiceField}
+
+
+def precargar_productos(data, prefix='detalles'):
+    """Carga en una sola consulta (con su stock) todos los productos enviados en el formset."""
+    patron = re.compile(rf'^{re.escape(prefix)}-\d+-producto$')
+    ids = {int(v) for k, v in data.items() if patron.match(k) and str(v).isdigit()}
+    return Producto.objects.in_bulk(ids) if ids else {}
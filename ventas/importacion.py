@@ -0,0 +1,406 @@
+"""
+Importación de ventas históricas desde CSV o XLSX (p.ej. al incorporar una
+sucursal nueva).
+
+El archivo trae una fila por línea de venta; las filas seguidas con el mismo
+documento forman una venta. Columnas (la primera fila es el encabezado):
+
+    documento, fecha, cliente, encargado, producto, cantidad, precio_unitario, comentarios
+
+Obligatorias: fecha, producto (código), cantidad y precio_unitario. Sin
+documento, cada fila es una venta con número nuevo. cliente acepta código o
+NIT y encargado el usuario.
+
+El archivo se recorre como flujo (csv.reader / openpyxl en modo read_only) y
+se procesa por lotes de ventas, cada uno en su propia transacción y con un
+número fijo de consultas: la memoria no crece con el tamaño del archivo. Un
+lote confirmado no se repite si se vuelve a importar el mismo archivo: sus
+documentos se rechazan como existentes.
+
+Las ventas se registran en el Kardex con la fecha del documento, en el orden
+del archivo, así que conviene que venga ordenado cronológicamente y que no
+haya movimientos posteriores ya registrados de los mismos productos.
+"""
+import csv
+import io
+from collections import Counter
+from datetime import date, datetime, time
+from decimal import Decimal, InvalidOperation
+from itertools import chain
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from archivo.utils import ultimo_corte
+from busqueda import utils as busqueda
+from clientes.models import Cliente
+from kardex.utils import Movimiento, registrar_movimientos
+from productos.models import Producto
+from secuencias.utils import avanzar_hasta, siguiente_numero
+from .models import DetalleVenta, Venta
+from . import resumenes
+
+# Ventas por lote (una transacción por lote)
+LOTE_IMPORTACION = getattr(settings, 'VENTAS_IMPORTACION_LOTE', 1000)
+
+# Nombre de cada columna y los encabezados que se aceptan para ella
+COLUMNAS = {
+    'documento': ('documento', 'numero_documento', 'no. documento'),
+    'fecha': ('fecha',),
+    'cliente': ('cliente', 'codigo_cliente', 'nit'),
+    'encargado': ('encargado', 'vendedor', 'usuario'),
+    'producto': ('producto', 'codigo', 'codigo_producto'),
+    'cantidad': ('cantidad',),
+    'precio_unitario': ('precio_unitario', 'precio'),
+    'comentarios': ('comentarios', 'observaciones'),
+}
+OBLIGATORIAS = ('fecha', 'producto', 'cantidad', 'precio_unitario')
+
+
+class ArchivoInvalido(Exception):
+    """El archivo no se puede leer o le faltan columnas obligatorias."""
+
+
+class Resultado:
+    """Contadores de la importación (se actualizan lote a lote)."""
+
+    def __init__(self):
+        self.filas = 0
+        self.ventas = 0
+        self.lineas = 0
+        self.rechazadas = 0
+        self.lineas_rechazadas = 0
+        self.desde = None
+        self.hasta = None
+
+    def __str__(self):
+        return (f"{self.filas} filas leídas · {self.ventas} ventas ({self.lineas} líneas) importadas · "
+                f"{self.rechazadas} ventas ({self.lineas_rechazadas} líneas) rechazadas")
+
+
+class _Linea:
+    def __init__(self, numero, datos):
+        self.numero = numero
+        self.datos = datos
+        self.producto = None
+        self.cantidad = None
+        self.precio = None
+
+
+class _Venta:
+    def __init__(self, documento):
+        self.documento = documento
+        self.lineas = []
+        self.error = None
+        self.fecha = None
+        self.cliente_id = None
+        self.encargado_id = None
+        self.total = Decimal('0.00')
+
+    def rechazar(self, motivo):
+        if self.error is None:
+            self.error = motivo
+
+
+# ======================
+# LECTURA DEL ARCHIVO
+# ======================
+def _columnas(encabezado):
+    """Posición de cada columna conocida según el encabezado del archivo."""
+    nombres = [str(h or '').strip().lower() for h in encabezado]
+    posiciones = {}
+    for columna, alias in COLUMNAS.items():
+        for i, nombre in enumerate(nombres):
+            if nombre in alias:
+                posiciones[columna] = i
+                break
+    faltan = [c for c in OBLIGATORIAS if c not in posiciones]
+    if faltan:
+        raise ArchivoInvalido(f"Faltan columnas obligatorias: {', '.join(faltan)}")
+    return posiciones
+
+
+def _filas_csv(archivo):
+    propio = isinstance(archivo, (str, bytes)) or hasattr(archivo, '__fspath__')
+    if propio:
+        archivo = open(archivo, 'rb')
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    try:
+        primera = texto.readline()
+        delimitador = max(',;\t', key=primera.count)
+        yield from csv.reader(chain([primera], texto), delimiter=delimitador)
+    except UnicodeDecodeError:
+        raise ArchivoInvalido("El CSV debe estar en UTF-8.")
+    finally:
+        # No cerrar un archivo ajeno al soltar el envoltorio de texto
+        texto.detach()
+        if propio:
+            archivo.close()
+
+
+def _filas_xlsx(archivo):
+    from openpyxl import load_workbook
+    try:
+        libro = load_workbook(archivo, read_only=True, data_only=True)
+    except Exception as e:
+        raise ArchivoInvalido(f"No se pudo abrir el XLSX: {e}")
+    try:
+        yield from libro.worksheets[0].iter_rows(values_only=True)
+    finally:
+        libro.close()
+
+
+def leer_filas(archivo, nombre=None):
+    """
+    Genera (número de fila, {columna: valor}) desde un CSV o XLSX, sin cargar
+    el archivo completo. `archivo` es una ruta o un archivo binario abierto.
+    """
+    nombre = str(nombre or getattr(archivo, 'name', None) or archivo).lower()
+    filas = _filas_xlsx(archivo) if nombre.endswith(('.xlsx', '.xlsm')) else _filas_csv(archivo)
+    encabezado = next(filas, None)
+    if encabezado is None:
+        raise ArchivoInvalido("El archivo está vacío.")
+    posiciones = _columnas(encabezado)
+
+    for numero, fila in enumerate(filas, start=2):
+        if not any(v not in (None, '') for v in fila):
+            continue
+        yield numero, {c: (fila[i] if i < len(fila) else None) for c, i in posiciones.items()}
+
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def _fecha(valor):
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    texto = _texto(valor)
+    try:
+        return parse_date(texto) or datetime.strptime(texto, '%d/%m/%Y').date()
+    except ValueError:
+        return None
+
+
+def _decimal(valor):
+    try:
+        return Decimal(_texto(valor).replace(',', '') if not isinstance(valor, (int, float)) else str(valor))
+    except InvalidOperation:
+        return None
+
+
+def agrupar_ventas(filas):
+    """Junta las filas seguidas con el mismo documento en una sola venta."""
+    actual = None
+    for numero, datos in filas:
+        documento = _texto(datos.get('documento'))
+        if actual is None or not documento or documento != actual.documento:
+            if actual is not None:
+                yield actual
+            actual = _Venta(documento)
+        actual.lineas.append(_Linea(numero, datos))
+    if actual is not None:
+        yield actual
+
+
+# ======================
+# VALIDACIÓN Y REGISTRO
+# ======================
+def _referencias(ventas):
+    """Productos, clientes y encargados del lote: una consulta por tabla."""
+    codigos, clientes, usuarios = set(), set(), set()
+    for v in ventas:
+        for linea in v.lineas:
+            codigos.add(_texto(linea.datos.get('producto')))
+        clientes.add(_texto(v.lineas[0].datos.get('cliente')))
+        usuarios.add(_texto(v.lineas[0].datos.get('encargado')))
+    clientes.discard('')
+    usuarios.discard('')
+
+    productos = {p.codigo: p for p in Producto.objects.filter(codigo__in=codigos).only('id', 'codigo', 'nombre', 'stock')}
+    por_cliente = {}
+    if clientes:
+        for pk, codigo, nit in Cliente.objects.filter(Q(codigo__in=clientes) | Q(nit__in=clientes)).values_list('pk', 'codigo', 'nit'):
+            por_cliente.setdefault(nit, pk)
+            por_cliente[codigo] = pk
+    por_usuario = {}
+    if usuarios:
+        por_usuario = dict(get_user_model().objects.filter(username__in=usuarios).values_list('username', 'pk'))
+    return productos, por_cliente, por_usuario
+
+
+def _validar(venta, productos, clientes, usuarios, encargado_id):
+    cabecera = venta.lineas[0].datos
+    venta.fecha = _fecha(cabecera.get('fecha'))
+    if venta.fecha is None:
+        venta.rechazar(f"Fecha inválida: {_texto(cabecera.get('fecha'))!r}")
+
+    cliente = _texto(cabecera.get('cliente'))
+    if cliente:
+        venta.cliente_id = clientes.get(cliente)
+        if venta.cliente_id is None:
+            venta.rechazar(f"Cliente no encontrado: {cliente}")
+    usuario = _texto(cabecera.get('encargado'))
+    venta.encargado_id = usuarios.get(usuario) if usuario else encargado_id
+    if usuario and venta.encargado_id is None:
+        venta.rechazar(f"Encargado no encontrado: {usuario}")
+
+    for linea in venta.lineas:
+        codigo = _texto(linea.datos.get('producto'))
+        linea.producto = productos.get(codigo)
+        cantidad = _decimal(linea.datos.get('cantidad'))
+        linea.precio = _decimal(linea.datos.get('precio_unitario'))
+        if linea.producto is None:
+            venta.rechazar(f"Fila {linea.numero}: producto no encontrado: {codigo!r}")
+        elif cantidad is None or cantidad <= 0 or cantidad != cantidad.to_integral_value():
+            venta.rechazar(f"Fila {linea.numero}: cantidad inválida: {_texto(linea.datos.get('cantidad'))!r}")
+        elif linea.precio is None or linea.precio < 0:
+            venta.rechazar(f"Fila {linea.numero}: precio inválido: {_texto(linea.datos.get('precio_unitario'))!r}")
+        else:
+            linea.cantidad = int(cantidad)
+            linea.precio = linea.precio.quantize(Decimal('0.01'))
+            venta.total += linea.cantidad * linea.precio
+
+
+@transaction.atomic
+def _importar_lote(ventas, encargado_id, resultado, rechazar):
+    productos, clientes, usuarios = _referencias(ventas)
+    cerrado = ultimo_corte()
+
+    documentos = {v.documento for v in ventas if v.documento}
+    existentes = set(Venta.objects.filter(numero_documento__in=documentos).values_list('numero_documento', flat=True))
+    vistos = set()
+    for v in ventas:
+        if v.documento in existentes:
+            v.rechazar(f"El documento {v.documento} ya existe")
+        elif v.documento in vistos:
+            v.rechazar(f"El documento {v.documento} se repite en el archivo")
+        elif v.documento:
+            vistos.add(v.documento)
+        _validar(v, productos, clientes, usuarios, encargado_id)
+        if v.fecha and cerrado and v.fecha <= cerrado:
+            v.rechazar(f"El período hasta el {cerrado:%d/%m/%Y} está cerrado y archivado")
+
+    #  Stock: se bloquean las filas del lote y se descuenta venta a venta en
+    #  memoria; la que no alcanza se rechaza sin afectar a las demás
+    ids = sorted({linea.producto.pk for v in ventas if v.error is None for linea in v.lineas})
+    disponibles = dict(Producto.objects.select_for_update().filter(pk__in=ids).order_by('pk').values_list('pk', 'stock'))
+    for v in ventas:
+        if v.error is not None:
+            continue
+        pedido = Counter()
+        for linea in v.lineas:
+            pedido[linea.producto.pk] += linea.cantidad
+        faltante = next((pk for pk, c in pedido.items() if disponibles[pk] < c), None)
+        if faltante is not None:
+            producto = next(linea.producto for linea in v.lineas if linea.producto.pk == faltante)
+            v.rechazar(f"Stock insuficiente de {producto.codigo}: hay {disponibles[faltante]}, se piden {pedido[faltante]}")
+            continue
+        for pk, c in pedido.items():
+            disponibles[pk] -= c
+
+    for v in ventas:
+        if v.error is not None:
+            rechazar(v)
+    aceptadas = [v for v in ventas if v.error is None]
+    if not aceptadas:
+        return
+
+    #  Encabezados: bulk_create no devuelve ids en MySQL, se leen por documento
+    version = siguiente_numero('ventas.version')
+    for v in aceptadas:
+        v.documento = v.documento or Venta.nuevo_numero_documento()
+    Venta.objects.bulk_create([
+        Venta(
+            numero_documento=v.documento, fecha=v.fecha, cliente_id=v.cliente_id,
+            encargado_id=v.encargado_id, comentarios=_texto(v.lineas[0].datos.get('comentarios')) or None,
+            total=v.total, version=version,
+        )
+        for v in aceptadas
+    ])
+    ids_venta = dict(Venta.objects.filter(numero_documento__in=[v.documento for v in aceptadas])
+                     .values_list('numero_documento', 'id'))
+
+    DetalleVenta.objects.bulk_create([
+        DetalleVenta(venta_id=ids_venta[v.documento], producto_id=linea.producto.pk,
+                     cantidad=linea.cantidad, precio_unitario=linea.precio)
+        for v in aceptadas for linea in v.lineas
+    ])
+
+    #  Kardex con la fecha de cada documento y saldo corrido en el orden del archivo
+    registrar_movimientos(
+        Movimiento(linea.producto, 'SALIDA', linea.cantidad, f"Venta #{v.documento}",
+                   timezone.make_aware(datetime.combine(v.fecha, time.min)))
+        for v in aceptadas for linea in v.lineas
+    )
+
+    #  Resúmenes diarios e índice de búsqueda (bulk_create no dispara señales)
+    por_fecha = {}
+    for v in aceptadas:
+        cambios = por_fecha.setdefault(v.fecha, resumenes.Cambios(v.fecha))
+        for linea in v.lineas:
+            cambios.linea(linea.producto.pk, linea.cantidad, linea.precio)
+        cambios.encabezado(v.cliente_id, v.encargado_id, 1, v.total)
+    for cambios in por_fecha.values():
+        resumenes.aplicar(cambios)
+    busqueda.indexar_en_bloque('ventas.venta', [(ids_venta[v.documento], {'numero_documento': v.documento}) for v in aceptadas])
+
+    #  Que el correlativo no vuelva a entregar un número importado
+    numericos = [int(v.documento) for v in aceptadas if v.documento.isdigit()]
+    if numericos:
+        avanzar_hasta('ventas.numero_documento', max(numericos))
+
+    resultado.ventas += len(aceptadas)
+    resultado.lineas += sum(len(v.lineas) for v in aceptadas)
+    fechas = [v.fecha for v in aceptadas]
+    resultado.desde = min(fechas + [resultado.desde] if resultado.desde else fechas)
+    resultado.hasta = max(fechas + [resultado.hasta] if resultado.hasta else fechas)
+
+
+def importar_ventas(archivo, nombre=None, lote=None, encargado=None, rechazos=None, progreso=None):
+    """
+    Importa ventas históricas desde un CSV o XLSX.
+
+    - archivo / nombre: ruta o archivo binario abierto; la extensión del
+      nombre decide el formato (.xlsx o CSV)
+    - lote: ventas por transacción (VENTAS_IMPORTACION_LOTE por defecto)
+    - encargado: usuario asignado a las filas que no indican encargado
+    - rechazos: función (número de fila, documento, motivo) que recibe cada
+      venta rechazada, p.ej. para escribirla en un archivo
+    - progreso: función que recibe el Resultado después de cada lote
+
+    Devuelve el Resultado final.
+    """
+    lote = lote or LOTE_IMPORTACION
+    encargado_id = getattr(encargado, 'pk', encargado)
+    resultado = Resultado()
+
+    def rechazar(venta):
+        resultado.rechazadas += 1
+        resultado.lineas_rechazadas += len(venta.lineas)
+        if rechazos is not None:
+            rechazos(venta.lineas[0].numero, venta.documento, venta.error)
+
+    pendientes = []
+    for venta in agrupar_ventas(leer_filas(archivo, nombre)):
+        resultado.filas += len(venta.lineas)
+        pendientes.append(venta)
+        if len(pendientes) >= lote:
+            _importar_lote(pendientes, encargado_id, resultado, rechazar)
+            pendientes = []
+            if progreso is not None:
+                progreso(resultado)
+    if pendientes:
+        _importar_lote(pendientes, encargado_id, resultado, rechazar)
+        if progreso is not None:
+            progreso(resultado)
+    return resultado
@@ -0,0 +1,101 @@
+import multiprocessing
+import random
+import time
+import uuid
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Sum
+from kardex.models import MovimientoInventario
+from kardex.utils import StockInsuficiente
+from productos.models import Producto
+from secuencias.utils import olvidar_bloques
+from ventas.models import Venta, DetalleVenta
+from ventas.services import registrar_venta
+
+
+def _inicializar_worker():
+    olvidar_bloques()
+
+
+def _vender(args):
+    """Intenta `intentos` ventas de 1 a 3 líneas sobre los productos dados."""
+    ids, intentos, marca, semilla = args
+    azar = random.Random(semilla)
+    productos = list(Producto.objects.filter(pk__in=ids))
+    vendidas, rechazadas = 0, 0
+    for _ in range(intentos):
+        elegidos = azar.sample(productos, k=min(len(productos), azar.randint(1, 3)))
+        detalles = [
+            DetalleVenta(producto=p, cantidad=azar.randint(1, 3), precio_unitario=p.precio)
+            for p in elegidos
+        ]
+        try:
+            registrar_venta(Venta(comentarios=marca), detalles)
+            vendidas += 1
+        except StockInsuficiente:
+            rechazadas += 1
+    connections.close_all()
+    return vendidas, rechazadas
+
+
+class Command(BaseCommand):
+    help = "Ventas simultáneas desde varios procesos sobre pocos productos: mide ventas/s y verifica que no se venda de más"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=8)
+        parser.add_argument('--intentos', type=int, default=200, help="Ventas por proceso")
+        parser.add_argument('--productos', type=int, default=5)
+        parser.add_argument('--stock', type=int, default=500, help="Stock inicial de cada producto")
+        parser.add_argument('--forzar', action='store_true',
+                            help="Correr aunque la base no sea de pruebas (deja movimientos en el Kardex)")
+
+    def handle(self, *args, **options):
+        nombre = str(connection.settings_dict['NAME'])
+        if not (connection.vendor == 'sqlite' or nombre.startswith('test')) and not options['forzar']:
+            raise CommandError(
+                f"La base '{nombre}' no parece de pruebas; use una base descartable o --forzar."
+            )
+        marca = f"benchmark-checkout-{uuid.uuid4().hex}"
+        productos = [
+            Producto.objects.create(nombre=f"{marca} {i}", precio=Decimal('1.00'), stock=options['stock'])
+            for i in range(options['productos'])
+        ]
+        ids = [p.pk for p in productos]
+
+        connections.close_all()
+        contexto = multiprocessing.get_context('fork')
+        tareas = [(ids, options['intentos'], marca, semilla) for semilla in range(options['procesos'])]
+        inicio = time.perf_counter()
+        with contexto.Pool(options['procesos'], initializer=_inicializar_worker) as pool:
+            resultados = pool.map(_vender, tareas)
+        duracion = time.perf_counter() - inicio
+
+        vendidas = sum(v for v, _ in resultados)
+        rechazadas = sum(r for _, r in resultados)
+
+        errores = []
+        for p in Producto.objects.filter(pk__in=ids):
+            vendido = (
+                DetalleVenta.objects.filter(producto=p, venta__comentarios=marca)
+                .aggregate(total=Sum('cantidad'))['total'] or 0
+            )
+            ultimo = MovimientoInventario.objects.filter(producto=p).order_by('-id').first()
+            if p.stock != options['stock'] - vendido:
+                errores.append(f"{p.nombre}: stock {p.stock}, esperado {options['stock'] - vendido}")
+            if ultimo and ultimo.saldo != p.stock:
+                errores.append(f"{p.nombre}: saldo Kardex {ultimo.saldo} distinto del stock {p.stock}")
+
+        # Limpieza: cada venta se anula (Venta.delete) para salir de los
+        # resúmenes diarios; los productos se llevan su Kardex en cascada
+        for venta in Venta.objects.filter(comentarios=marca).iterator():
+            venta.delete()
+        Producto.objects.filter(pk__in=ids).delete()
+
+        self.stdout.write(
+            f"{vendidas} ventas, {rechazadas} rechazadas por stock en {duracion:.2f}s "
+            f"→ {vendidas / duracion:.1f} ventas/s con {options['procesos']} procesos"
+        )
+        if errores:
+            raise CommandError("Inconsistencias:\n" + "\n".join(errores))
+        self.stdout.write(self.style.SUCCESS("✓ Sin sobreventas"))
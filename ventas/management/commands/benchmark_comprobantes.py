@@ -0,0 +1,45 @@
+import statistics
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from productos.models import Producto
+from ventas.comprobantes import renderizar_comprobante
+from ventas.models import Venta, DetalleVenta
+from ventas.services import registrar_venta
+
+
+class Command(BaseCommand):
+    help = "Compara el tiempo de generación del comprobante con xhtml2pdf (html) y con ReportLab"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lineas', type=int, default=20)
+        parser.add_argument('--repeticiones', type=int, default=10)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            productos = [
+                Producto.objects.create(nombre=f"Benchmark comprobante {i}", precio=Decimal('12.50'), stock=1000)
+                for i in range(options['lineas'])
+            ]
+            venta = registrar_venta(
+                Venta(comentarios="benchmark"),
+                [DetalleVenta(producto=p, cantidad=2, precio_unitario=p.precio) for p in productos],
+            )
+
+            resultados = {}
+            for motor in ('html', 'reportlab'):
+                renderizar_comprobante(venta, motor)  # calentamiento (fuentes, logo, plantillas)
+                tiempos = []
+                for _ in range(options['repeticiones']):
+                    inicio = time.perf_counter()
+                    renderizar_comprobante(venta, motor)
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+                resultados[motor] = statistics.median(tiempos)
+                self.stdout.write(f"{motor:>10}: mediana {resultados[motor]:.1f} ms ({options['lineas']} líneas)")
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ ReportLab es {resultados['html'] / resultados['reportlab']:.1f}x más rápido"
+        ))
@@ -0,0 +1,50 @@
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from productos.models import Producto
+from ventas.models import Venta, DetalleVenta
+from ventas.services import registrar_venta
+
+
+class Command(BaseCommand):
+    """
+    Medido en SQLite (contando los SAVEPOINT): la primera venta cuesta más
+    porque reserva los bloques de secuencia (34 consultas con 1 línea); las
+    siguientes cuestan lo mismo con 10, 40 o 100 líneas (26). Lo que importa
+    es que no crece con las líneas; ventas.tests lo comprueba.
+    """
+    help = "Mide cuántas consultas SQL cuesta registrar una venta según su número de líneas"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lineas', nargs='+', type=int, default=[1, 10, 40, 100],
+            help="Tamaños de venta a medir (número de líneas)",
+        )
+
+    def handle(self, *args, **options):
+        tamanos = sorted(options['lineas'])
+
+        # Todo se deshace al final: el benchmark no deja datos en la base
+        with transaction.atomic():
+            productos = [
+                Producto.objects.create(
+                    nombre=f"Benchmark {i}", precio=Decimal('10.00'), stock=1_000_000
+                )
+                for i in range(tamanos[-1])
+            ]
+
+            self.stdout.write("Líneas  Consultas")
+            for n in tamanos:
+                venta = Venta(comentarios="benchmark")
+                detalles = [
+                    DetalleVenta(producto=p, cantidad=1, precio_unitario=p.precio)
+                    for p in productos[:n]
+                ]
+                with CaptureQueriesContext(connection) as ctx:
+                    registrar_venta(venta, detalles)
+                self.stdout.write(f"{n:>6}  {len(ctx.captured_queries):>9}")
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS("✓ Benchmark terminado (sin cambios en la base)"))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from ventas.exportacion import PROCESOS_EXPORTACION, pdf_unido, volumenes, zip_en_stream
+from ventas.models import Venta
+from ventas.utils import filtrar_ventas
+
+
+class Command(BaseCommand):
+    help = "Exporta los comprobantes de varias ventas a un ZIP o a un solo PDF (mismos filtros que el listado)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('salida', help="Archivo de destino (.zip o .pdf)")
+        parser.add_argument('--q', default='', help="Texto a buscar (documento o cliente)")
+        parser.add_argument('--fecha-inicio', dest='fecha_inicio', default='')
+        parser.add_argument('--fecha-fin', dest='fecha_fin', default='')
+        parser.add_argument('--cliente', default='', help="Id del cliente")
+        parser.add_argument('--formato', choices=['zip', 'pdf'], default=None)
+        parser.add_argument('--procesos', type=int, default=PROCESOS_EXPORTACION)
+        parser.add_argument('--motor', choices=['html', 'reportlab'], default=None)
+
+    def handle(self, *args, **options):
+        salida = options['salida']
+        formato = options['formato'] or ('pdf' if salida.lower().endswith('.pdf') else 'zip')
+
+        ventas = filtrar_ventas(Venta.objects.all(), options).order_by('fecha', 'id')
+        ids = list(ventas.values_list('id', flat=True))
+        if not ids:
+            raise CommandError("No hay ventas con esos filtros.")
+
+        if formato == 'pdf' and volumenes(len(ids)) > 1 and salida.lower().endswith('.pdf'):
+            # Demasiados para un solo PDF: salen varios dentro de un ZIP
+            salida = salida[:-4] + '.zip'
+
+        self.stdout.write(f"Exportando {len(ids)} comprobantes a {salida}...")
+        with open(salida, 'wb') as destino:
+            if formato == 'pdf':
+                pdf_unido(ids, destino, options['procesos'], options['motor'])
+            else:
+                for parte in zip_en_stream(ids, options['procesos'], options['motor']):
+                    destino.write(parte)
+        self.stdout.write(self.style.SUCCESS(f"✓ {len(ids)} comprobantes exportados"))
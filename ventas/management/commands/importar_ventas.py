@@ -0,0 +1,52 @@
+import csv
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from ventas.importacion import ArchivoInvalido, importar_ventas
+
+
+class Command(BaseCommand):
+    help = "Importa ventas históricas desde un CSV o XLSX (una fila por línea de venta) y las registra en el Kardex"
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Archivo .csv o .xlsx")
+        parser.add_argument('--lote', type=int, default=None, help="Ventas por transacción")
+        parser.add_argument('--encargado', default=None, help="Usuario para las filas sin encargado")
+        parser.add_argument('--rechazos', default=None, help="CSV donde anotar las ventas rechazadas")
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options['archivo']):
+            raise CommandError(f"No existe el archivo {options['archivo']}")
+
+        encargado = None
+        if options['encargado']:
+            encargado = get_user_model().objects.filter(username=options['encargado']).first()
+            if encargado is None:
+                raise CommandError(f"No existe el usuario {options['encargado']}")
+
+        destino = escritor = None
+        if options['rechazos']:
+            destino = open(options['rechazos'], 'w', newline='', encoding='utf-8')
+            escritor = csv.writer(destino)
+            escritor.writerow(['fila', 'documento', 'motivo'])
+
+        try:
+            resultado = importar_ventas(
+                options['archivo'],
+                lote=options['lote'],
+                encargado=encargado,
+                rechazos=(lambda *fila: escritor.writerow(fila)) if escritor else None,
+                progreso=lambda r: self.stdout.write(f"  … {r}"),
+            )
+        except ArchivoInvalido as e:
+            raise CommandError(str(e))
+        finally:
+            if destino is not None:
+                destino.close()
+
+        self.stdout.write(self.style.SUCCESS(f"✓ {resultado}"))
+        if resultado.desde:
+            self.stdout.write(self.style.SUCCESS(f"✓ Ventas del {resultado.desde} al {resultado.hasta}"))
+        if resultado.rechazadas and not options['rechazos']:
+            self.stdout.write(self.style.WARNING("Use --rechazos archivo.csv para ver el motivo de cada rechazo"))
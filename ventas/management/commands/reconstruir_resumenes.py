@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from ventas.resumenes import reconstruir
+
+
+class Command(BaseCommand):
+    help = "Recalcula los resúmenes diarios de ventas (producto, cliente, encargado) desde las ventas registradas"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help="Fecha inicial (AAAA-MM-DD); por defecto todo el historial")
+        parser.add_argument('--hasta', help="Fecha final (AAAA-MM-DD)")
+
+    def handle(self, *args, **options):
+        fechas = {}
+        for clave in ('desde', 'hasta'):
+            if options[clave]:
+                fechas[clave] = parse_date(options[clave])
+                if fechas[clave] is None:
+                    raise CommandError(f"Fecha inválida en --{clave}: {options[clave]}")
+
+        resumen = reconstruir(**fechas)
+        for tabla, filas in resumen.items():
+            self.stdout.write(self.style.SUCCESS(f"✓ Resumen por {tabla}: {filas} filas"))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venta',
+            name='version',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+    ]
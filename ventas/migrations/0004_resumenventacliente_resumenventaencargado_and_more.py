@@ -0,0 +1,64 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:57
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0003_cliente_cliente_nombre_id_idx'),
+        ('productos', '0003_alter_producto_ultima_actualizacion'),
+        ('ventas', '0003_venta_venta_fecha_id_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenVentaCliente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('ventas', models.IntegerField(default=0, verbose_name='Ventas')),
+                ('importe', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('cliente', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='clientes.cliente')),
+            ],
+            options={
+                'verbose_name': 'Resumen diario por cliente',
+                'verbose_name_plural': 'Resúmenes diarios por cliente',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'cliente'), name='resumen_venta_cliente_unico')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenVentaEncargado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('ventas', models.IntegerField(default=0, verbose_name='Ventas')),
+                ('importe', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('encargado', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Resumen diario por encargado',
+                'verbose_name_plural': 'Resúmenes diarios por encargado',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'encargado'), name='resumen_venta_encargado_unico')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenVentaProducto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('cantidad', models.BigIntegerField(default=0, verbose_name='Unidades')),
+                ('importe', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='productos.producto')),
+            ],
+            options={
+                'verbose_name': 'Resumen diario por producto',
+                'verbose_name_plural': 'Resúmenes diarios por producto',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'producto'), name='resumen_venta_producto_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0005_venta_clave_idempotencia'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='venta',
+            name='fecha',
+            field=models.DateField(default=django.utils.timezone.localdate, verbose_name='Fecha de venta'),
+        ),
+    ]
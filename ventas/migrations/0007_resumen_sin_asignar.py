@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def marcar_sin_asignar(apps, schema_editor):
+    """Junta en una sola fila por día las ventas sin cliente (o sin encargado) y la marca."""
+    for nombre, campo in (('ResumenVentaCliente', 'cliente'), ('ResumenVentaEncargado', 'encargado')):
+        modelo = apps.get_model('ventas', nombre)
+        por_fecha = {}
+        for fila in modelo.objects.filter(**{f'{campo}__isnull': True}).order_by('fecha', 'id'):
+            primera = por_fecha.setdefault(fila.fecha, fila)
+            if primera is not fila:
+                primera.ventas += fila.ventas
+                primera.importe += fila.importe
+                fila.delete()
+        for fila in por_fecha.values():
+            fila.sin_asignar = True
+            fila.save(update_fields=['ventas', 'importe', 'sin_asignar'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0003_cliente_cliente_nombre_id_idx'),
+        ('ventas', '0006_fecha_editable'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resumenventacliente',
+            name='sin_asignar',
+            field=models.BooleanField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='resumenventaencargado',
+            name='sin_asignar',
+            field=models.BooleanField(editable=False, null=True),
+        ),
+        migrations.RunPython(marcar_sin_asignar, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='resumenventacliente',
+            constraint=models.UniqueConstraint(fields=('fecha', 'sin_asignar'), name='resumen_venta_cliente_sin_asignar_unico'),
+        ),
+        migrations.AddConstraint(
+            model_name='resumenventaencargado',
+            constraint=models.UniqueConstraint(fields=('fecha', 'sin_asignar'), name='resumen_venta_encargado_sin_asignar_unico'),
+        ),
+    ]
@@ -1,12 +1,16 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import DecimalField, F, Sum
 from django.conf import settings
 from decimal import Decimal
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from productos.models import Producto
 from clientes.models import Cliente
+from secuencias.utils import siguiente_numero, ultimo_correlativo
 
 class Venta(models.Model):
-    fecha = models.DateField(auto_now_add=True, verbose_name="Fecha de venta")
+    # Por defecto la fecha del día; la importación de históricos la indica
+    fecha = models.DateField(default=timezone.localdate, verbose_name="Fecha de venta")
 
 
     cliente = models.ForeignKey(
@@ -26,46 +30,103 @@ class Venta(models.Model):
     )
     comentarios = models.TextField(blank=True, null=True, verbose_name="Comentarios / Observaciones")
     total = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    # Cambia en cada guardado; identifica el contenido del comprobante en caché
+    version = models.BigIntegerField(default=0, editable=False)
+    # Clave que genera la terminal para cada venta; un reenvío con la misma clave no la duplica
+    clave_idempotencia = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
 
     def __str__(self):
         return f"Venta #{self.id} - {self.numero_documento} - {self.cliente}"
 
+    @staticmethod
+    def nuevo_numero_documento():
+        """Siguiente número correlativo de documento."""
+        return str(siguiente_numero(
+            'ventas.numero_documento',
+            inicial=lambda: ultimo_correlativo(Venta.objects, 'numero_documento') or 1000000,
+        ))
+
     def calcular_total(self):
-        """Recalcula el total con base en los detalles existentes."""
-        total = Decimal('0.00')
-        for d in self.detalles.all():
-            total += (d.cantidad or 0) * (d.precio_unitario or 0)
-        self.total = total
+        """Recalcula el total con base en los detalles existentes (una sola consulta)."""
+        total = self.detalles.aggregate(
+            total=Sum(F('cantidad') * F('precio_unitario'),
+                      output_field=DecimalField(max_digits=12, decimal_places=2))
+        )['total']
+        self.total = Decimal(total or 0).quantize(Decimal('0.01'))
 
-    def save(self, *args, **kwargs):
-        """Genera número correlativo y evita calcular antes de tener ID."""
-        is_new = self.pk is None
+    def save(self, *args, resumen=None, **kwargs):
+        """
+        Genera número correlativo y lleva el encabezado a los resúmenes
+        diarios. El total lo mantienen las líneas al registrarse.
 
+        - resumen: Cambios del día de la venta donde acumular la diferencia
+          en lugar de escribirla ya (registrar_venta la escribe junto con la
+          de las líneas).
+        """
         # Generar automáticamente el número de documento si no existe
         if not self.numero_documento:
-            ultimo = Venta.objects.order_by('-id').first()
-            if ultimo and ultimo.numero_documento.isdigit():
-                self.numero_documento = str(int(ultimo.numero_documento) + 1)
-            else:
-                self.numero_documento = "1000001"
+            self.numero_documento = self.nuevo_numero_documento()
+
+        # Número único por guardado (no un contador local), así dos ediciones
+        # simultáneas nunca comparten versión
+        self.version = siguiente_numero('ventas.version')
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+
+        with transaction.atomic():
+            anterior = None
+            if self.pk is not None:
+                anterior = (
+                    Venta.objects.filter(pk=self.pk)
+                    .values('fecha', 'cliente_id', 'encargado_id', 'total').first()
+                )
+            super().save(*args, **kwargs)
+            self._actualizar_resumenes(anterior, resumen)
+
+    def _actualizar_resumenes(self, anterior, resumen=None):
+        """
+        Mueve la venta (1 venta y su total) del cliente, encargado y fecha
+        anteriores a los actuales. Si cambió la fecha, también pasan sus
+        líneas al resumen por producto del nuevo día.
+        """
+        from .resumenes import Cambios, aplicar
+        if anterior is not None and (
+            anterior['fecha'], anterior['cliente_id'], anterior['encargado_id'], anterior['total']
+        ) == (self.fecha, self.cliente_id, self.encargado_id, self.total):
+            return
 
-        super().save(*args, **kwargs)
-        self.calcular_total()
-        super().save(update_fields=['total'])
+        por_fecha = {}
+
+        def cambios(fecha):
+            if resumen is not None and fecha == resumen.fecha:
+                return resumen
+            return por_fecha.setdefault(fecha, Cambios(fecha))
+
+        if anterior is not None:
+            cambios(anterior['fecha']).encabezado(
+                anterior['cliente_id'], anterior['encargado_id'], -1, -anterior['total']
+            )
+            if anterior['fecha'] != self.fecha:
+                for producto_id, cantidad, precio in self.detalles.values_list('producto_id', 'cantidad', 'precio_unitario'):
+                    cambios(anterior['fecha']).linea(producto_id, cantidad, precio, signo=-1)
+                    cambios(self.fecha).linea(producto_id, cantidad, precio)
+        cambios(self.fecha).encabezado(self.cliente_id, self.encargado_id, 1, self.total)
+        for pendientes in por_fecha.values():
+            aplicar(pendientes)
 
     def delete(self, *args, **kwargs):
         """Cuando se elimina una venta, se devuelve el stock de todos sus productos."""
-        for detalle in self.detalles.all():
-            try:
-                detalle._revert_effect(detalle.producto, detalle.cantidad)
-            except Exception as e:
-                print(f"⚠️ Error al revertir stock del producto {detalle.producto}: {e}")
-        super().delete(*args, **kwargs)
+        from .services import anular_venta
+        with transaction.atomic():
+            anular_venta(self)
+            super().delete(*args, **kwargs)
 
     class Meta:
         verbose_name = "Venta"
         verbose_name_plural = "Ventas"
         ordering = ['-fecha', '-id']
+        # Paginación por cursor (fecha, id) en el listado
+        indexes = [models.Index(fields=['fecha', 'id'], name='venta_fecha_id_idx')]
 
 
 
@@ -89,29 +150,40 @@ class DetalleVenta(models.Model):
 
 
     def _apply_effect(self, producto, cantidad):
-        """Descuenta stock solo a través de Kardex."""
+        """Descuenta stock solo a través de Kardex (StockInsuficiente si no alcanza)."""
         if cantidad and producto:
-            try:
-                from kardex.utils import registrar_movimiento
-                registrar_movimiento(producto, 'SALIDA', int(cantidad), f"Venta #{self.venta.numero_documento}")
-            except Exception as e:
-                print(f" No se pudo registrar movimiento Kardex (venta): {e}")
+            from kardex.utils import registrar_movimiento
+            registrar_movimiento(producto, 'SALIDA', int(cantidad), f"Venta #{self.venta.numero_documento}")
 
     def _revert_effect(self, producto, cantidad):
         """Devuelve stock solo a través de Kardex."""
         if cantidad and producto:
-            try:
-                from kardex.utils import registrar_movimiento
-                registrar_movimiento(producto, 'ENTRADA', int(cantidad), f"Reversión venta #{self.venta.numero_documento}")
-            except Exception as e:
-                print(f" No se pudo registrar reversión en Kardex: {e}")
-
+            from kardex.utils import registrar_movimiento
+            registrar_movimiento(producto, 'ENTRADA', int(cantidad), f"Reversión venta #{self.venta.numero_documento}")
 
+    def _actualizar_resumenes(self, anterior=None, actual=None):
+        """
+        Mueve el aporte de la línea en el resumen diario por producto
+        (anterior → actual). El importe del cliente y del encargado lo mueve
+        Venta.save al guardar el nuevo total.
+        """
+        from .resumenes import Cambios, aplicar
+        cambios = Cambios(self.venta.fecha)
+        if anterior is not None:
+            cambios.linea(anterior.producto_id, anterior.cantidad, anterior.precio_unitario, signo=-1)
+        if actual is not None:
+            cambios.linea(actual.producto_id, actual.cantidad, actual.precio_unitario)
+        aplicar(cambios)
 
+    @transaction.atomic
     def save(self, *args, **kwargs):
-        """Controla el impacto de stock al crear o editar."""
+        """
+        Controla el impacto de stock al crear o editar. Si el Kardex rechaza el
+        movimiento (p.ej. otra venta se llevó el stock), la línea no se guarda.
+        """
         self.full_clean()
         is_new = self.pk is None
+        previous = None
 
         if is_new:
             super().save(*args, **kwargs)
@@ -133,9 +205,11 @@ class DetalleVenta(models.Model):
                     else:
                         self._revert_effect(self.producto, abs(delta))
 
+        self._actualizar_resumenes(previous, self)
         self.venta.calcular_total()
         self.venta.save(update_fields=["total"])
 
+    @transaction.atomic
     def delete(self, *args, **kwargs):
         """Devuelve el stock cuando se elimina un detalle."""
         prod = self.producto
@@ -143,6 +217,7 @@ class DetalleVenta(models.Model):
         venta = self.venta
 
         self._revert_effect(prod, qty)
+        self._actualizar_resumenes(anterior=self)
         super().delete(*args, **kwargs)
         venta.calcular_total()
         venta.save(update_fields=["total"])
@@ -153,3 +228,68 @@ class DetalleVenta(models.Model):
     class Meta:
         verbose_name = "Detalle de venta"
         verbose_name_plural = "Detalles de venta"
+
+
+# ======================
+# RESÚMENES DIARIOS (los mantiene ventas/resumenes.py)
+# ======================
+class ResumenVentaProducto(models.Model):
+    """Unidades e importe vendidos de un producto en un día."""
+    fecha = models.DateField(verbose_name="Fecha")
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='+')
+    cantidad = models.BigIntegerField(default=0, verbose_name="Unidades")
+    importe = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+
+    def __str__(self):
+        return f"{self.fecha} – {self.producto}: {self.cantidad} / Q {self.importe}"
+
+    class Meta:
+        verbose_name = "Resumen diario por producto"
+        verbose_name_plural = "Resúmenes diarios por producto"
+        constraints = [models.UniqueConstraint(fields=['fecha', 'producto'], name='resumen_venta_producto_unico')]
+
+
+class ResumenVentaCliente(models.Model):
+    """Ventas e importe de un cliente en un día (cliente vacío = ventas sin cliente)."""
+    fecha = models.DateField(verbose_name="Fecha")
+    cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    ventas = models.IntegerField(default=0, verbose_name="Ventas")
+    importe = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    # True solo en la fila de las ventas sin cliente: NULL no choca con la
+    # restricción única de cliente, esta marca sí (una sola fila por día)
+    sin_asignar = models.BooleanField(null=True, editable=False)
+
+    def __str__(self):
+        return f"{self.fecha} – {self.cliente or 'Sin cliente'}: {self.ventas} / Q {self.importe}"
+
+    class Meta:
+        verbose_name = "Resumen diario por cliente"
+        verbose_name_plural = "Resúmenes diarios por cliente"
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'cliente'], name='resumen_venta_cliente_unico'),
+            models.UniqueConstraint(fields=['fecha', 'sin_asignar'], name='resumen_venta_cliente_sin_asignar_unico'),
+        ]
+
+
+class ResumenVentaEncargado(models.Model):
+    """Ventas e importe de un vendedor en un día (vacío = ventas sin encargado)."""
+    fecha = models.DateField(verbose_name="Fecha")
+    encargado = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    ventas = models.IntegerField(default=0, verbose_name="Ventas")
+    importe = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    # True solo en la fila de las ventas sin encargado: NULL no choca con la
+    # restricción única de encargado, esta marca sí (una sola fila por día)
+    sin_asignar = models.BooleanField(null=True, editable=False)
+
+    def __str__(self):
+        return f"{self.fecha} – {self.encargado or 'Sin encargado'}: {self.ventas} / Q {self.importe}"
+
+    class Meta:
+        verbose_name = "Resumen diario por encargado"
+        verbose_name_plural = "Resúmenes diarios por encargado"
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'encargado'], name='resumen_venta_encargado_unico'),
+            models.UniqueConstraint(fields=['fecha', 'sin_asignar'], name='resumen_venta_encargado_sin_asignar_unico'),
+        ]
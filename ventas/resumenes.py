@@ -0,0 +1,190 @@
+"""
+Resúmenes diarios de ventas (por producto, por cliente y por encargado).
+
+Se actualizan dentro de la misma transacción que registra, edita o anula la
+venta (ver services.py), sumando solo la diferencia que produjo el cambio.
+Venta.save mueve el encabezado y DetalleVenta.save las líneas, así también
+quedan al día las ventas editadas desde el admin.
+El tablero del inicio lee únicamente estas tablas, así que su costo depende
+de los días y productos consultados y no del historial de ventas.
+"""
+from collections import namedtuple
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import Case, F, Q, Sum, Value, When
+from django.utils import timezone
+from .models import (
+    DetalleVenta, ResumenVentaCliente, ResumenVentaEncargado, ResumenVentaProducto, Venta,
+)
+
+CERO = Decimal('0.00')
+
+
+class Cambios:
+    """
+    Diferencias pendientes de sumar a los resúmenes de un día:
+    - productos: {producto_id: [cantidad, importe]}
+    - clientes / encargados: {id o None: [ventas, importe]}
+    """
+
+    def __init__(self, fecha):
+        self.fecha = fecha
+        self.productos = {}
+        self.clientes = {}
+        self.encargados = {}
+
+    def linea(self, producto_id, cantidad, precio_unitario, signo=1):
+        """Suma (signo=1) o resta (signo=-1) el aporte de una línea de venta."""
+        importe = Decimal(cantidad or 0) * Decimal(precio_unitario or 0) * signo
+        fila = self.productos.setdefault(producto_id, [0, CERO])
+        fila[0] += (cantidad or 0) * signo
+        fila[1] += importe
+        return importe
+
+    def encabezado(self, cliente_id, encargado_id, ventas, importe):
+        """Suma ventas e importe al cliente y al encargado de la venta."""
+        for destino, clave in ((self.clientes, cliente_id), (self.encargados, encargado_id)):
+            fila = destino.setdefault(clave, [0, CERO])
+            fila[0] += ventas
+            fila[1] += importe
+
+
+def _acumular(modelo, campo, fecha, cambios, columnas):
+    """
+    Suma `cambios` ({clave: valores}) a las filas (fecha, clave) de un resumen
+    con dos consultas: crea en bloque las filas que falten (en cero, ignorando
+    las que ya existen) y luego un solo UPDATE con F() + CASE.
+    La clave None (p.ej. venta sin cliente) es la fila marcada sin_asignar:
+    NULL no choca con la restricción única de la clave, la marca sí.
+    """
+    cambios = {k: v for k, v in cambios.items() if any(v)}
+    if not cambios:
+        return
+
+    claves = sorted(k for k in cambios if k is not None)
+    nuevas = [modelo(fecha=fecha, **{f'{campo}_id': k}) for k in claves]
+    filtro = Q(**{f'{campo}_id__in': claves})
+    casos = {k: Q(**{f'{campo}_id': k}) for k in claves}
+    if None in cambios:
+        nuevas.append(modelo(fecha=fecha, sin_asignar=True))
+        filtro |= Q(sin_asignar=True)
+        casos[None] = Q(sin_asignar=True)
+    modelo.objects.bulk_create(nuevas, ignore_conflicts=True)
+
+    actualizacion = {}
+    for i, columna in enumerate(columnas):
+        salida = modelo._meta.get_field(columna)
+        actualizacion[columna] = F(columna) + Case(
+            *[When(condicion, then=Value(cambios[k][i], output_field=salida)) for k, condicion in casos.items()],
+            default=Value(0, output_field=salida),
+            output_field=salida,
+        )
+    modelo.objects.filter(filtro, fecha=fecha).order_by(f'{campo}_id').update(**actualizacion)
+
+
+def aplicar(cambios):
+    """Escribe en los tres resúmenes las diferencias acumuladas en `cambios`."""
+    _acumular(ResumenVentaProducto, 'producto', cambios.fecha, cambios.productos, ['cantidad', 'importe'])
+    _acumular(ResumenVentaCliente, 'cliente', cambios.fecha, cambios.clientes, ['ventas', 'importe'])
+    _acumular(ResumenVentaEncargado, 'encargado', cambios.fecha, cambios.encargados, ['ventas', 'importe'])
+
+
+@transaction.atomic
+def reconstruir(desde=None, hasta=None):
+    """
+    Recalcula los resúmenes desde Venta / DetalleVenta (todo el historial o el
+    rango de fechas indicado). Devuelve cuántas filas quedaron en cada tabla.
+    """
+    filtro = {}
+    if desde:
+        filtro['fecha__gte'] = desde
+    if hasta:
+        filtro['fecha__lte'] = hasta
+    filtro_detalle = {f'venta__{k}': v for k, v in filtro.items()}
+    importe = Sum(F('cantidad') * F('precio_unitario'),
+                  output_field=models.DecimalField(max_digits=14, decimal_places=2))
+
+    for modelo in (ResumenVentaProducto, ResumenVentaCliente, ResumenVentaEncargado):
+        modelo.objects.filter(**filtro).delete()
+
+    productos = [
+        ResumenVentaProducto(fecha=f['venta__fecha'], producto_id=f['producto'],
+                             cantidad=f['unidades'], importe=f['importe'])
+        for f in DetalleVenta.objects.filter(**filtro_detalle)
+        .values('venta__fecha', 'producto').annotate(unidades=Sum('cantidad'), importe=importe).order_by()
+    ]
+    ResumenVentaProducto.objects.bulk_create(productos, batch_size=1000)
+
+    resumen = {'productos': len(productos)}
+    for modelo, campo, nombre in ((ResumenVentaCliente, 'cliente', 'clientes'),
+                                  (ResumenVentaEncargado, 'encargado', 'encargados')):
+        filas = [
+            modelo(fecha=f['fecha'], ventas=f['ventas'], importe=f['importe'] or CERO,
+                   sin_asignar=True if f[campo] is None else None, **{f'{campo}_id': f[campo]})
+            for f in Venta.objects.filter(**filtro)
+            .values('fecha', campo).annotate(ventas=models.Count('id'), importe=Sum('total')).order_by()
+        ]
+        modelo.objects.bulk_create(filas, batch_size=1000)
+        resumen[nombre] = len(filas)
+    return resumen
+
+
+# ======================
+# TABLERO DEL INICIO
+# ======================
+Indicador = namedtuple('Indicador', ['ventas', 'importe'])
+
+
+def _indicador(filas):
+    datos = filas.aggregate(ventas=Sum('ventas'), importe=Sum('importe'))
+    return Indicador(datos['ventas'] or 0, datos['importe'] or CERO)
+
+
+def tablero(hoy=None, dias=14, top=5):
+    """Indicadores del inicio, leídos solo de los resúmenes (número fijo de consultas)."""
+    hoy = hoy or timezone.localdate()
+    inicio_mes = hoy.replace(day=1)
+    inicio_serie = hoy - timedelta(days=dias - 1)
+
+    mes_encargados = ResumenVentaEncargado.objects.filter(fecha__gte=inicio_mes, fecha__lte=hoy)
+    por_dia = {
+        f['fecha']: f for f in
+        ResumenVentaEncargado.objects.filter(fecha__gte=inicio_serie, fecha__lte=hoy)
+        .values('fecha').annotate(ventas=Sum('ventas'), importe=Sum('importe')).order_by()
+    }
+    serie = []
+    for i in range(dias):
+        dia = inicio_serie + timedelta(days=i)
+        fila = por_dia.get(dia, {})
+        serie.append({'fecha': dia, 'ventas': fila.get('ventas') or 0, 'importe': fila.get('importe') or CERO})
+    maximo = max((d['importe'] for d in serie), default=CERO) or Decimal('1')
+    for d in serie:
+        d['porcentaje'] = int(d['importe'] * 100 / maximo)
+
+    return {
+        'hoy': _indicador(ResumenVentaEncargado.objects.filter(fecha=hoy)),
+        'mes': _indicador(mes_encargados),
+        'serie': serie,
+        'productos': list(
+            ResumenVentaProducto.objects.filter(fecha__gte=inicio_mes, fecha__lte=hoy)
+            .values('producto__codigo', 'producto__nombre')
+            .annotate(cantidad=Sum('cantidad'), importe=Sum('importe'))
+            .order_by('-importe')[:top]
+        ),
+        'clientes': list(
+            ResumenVentaCliente.objects.filter(fecha__gte=inicio_mes, fecha__lte=hoy)
+            .values('cliente__nombre')
+            .annotate(ventas=Sum('ventas'), importe=Sum('importe'))
+            .order_by('-importe')[:top]
+        ),
+        'encargados': list(
+            mes_encargados
+            .values('encargado__username', 'encargado__first_name', 'encargado__last_name')
+            .annotate(ventas=Sum('ventas'), importe=Sum('importe'))
+            .order_by('-importe')[:top]
+        ),
+        'desde_mes': inicio_mes,
+        'hoy_fecha': hoy,
+    }
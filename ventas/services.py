@@ -0,0 +1,320 @@
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from clientes.models import Cliente
+from kardex.utils import StockInsuficiente, registrar_movimientos
+from productos.models import Producto
+from productos import precios
+from .models import Venta, DetalleVenta
+from . import resumenes
+
+# Máximo de ventas por lote en la API de terminales
+LOTE_MAXIMO = getattr(settings, 'VENTAS_LOTE_MAXIMO', 200)
+
+
+def _efectos_de_lineas(venta, detalles, eliminados, previos):
+    """
+    Traduce los cambios de líneas a movimientos de Kardex, con la misma
+    lógica que DetalleVenta._apply_effect / _revert_effect:
+    - línea nueva: SALIDA por la cantidad
+    - cambio de producto: ENTRADA del anterior y SALIDA del nuevo
+    - cambio de cantidad: SALIDA o ENTRADA por la diferencia
+    - línea eliminada: ENTRADA por la cantidad
+    Las reversiones (ENTRADA) van primero para liberar stock antes de descontar.
+    """
+    ref_venta = f"Venta #{venta.numero_documento}"
+    ref_reversion = f"Reversión venta #{venta.numero_documento}"
+    entradas, salidas = [], []
+
+    for d in detalles:
+        prev = previos.get(d.pk) if d.pk else None
+        if prev is None:
+            salidas.append((d.producto, 'SALIDA', int(d.cantidad), ref_venta))
+        elif prev.producto_id != d.producto_id:
+            entradas.append((prev.producto, 'ENTRADA', int(prev.cantidad), ref_reversion))
+            salidas.append((d.producto, 'SALIDA', int(d.cantidad), ref_venta))
+        else:
+            delta = d.cantidad - prev.cantidad
+            if delta > 0:
+                salidas.append((d.producto, 'SALIDA', int(delta), ref_venta))
+            elif delta < 0:
+                entradas.append((d.producto, 'ENTRADA', int(abs(delta)), ref_reversion))
+
+    for e in eliminados:
+        prev = previos.get(e.pk)
+        if prev is not None:
+            entradas.append((prev.producto, 'ENTRADA', int(prev.cantidad), ref_reversion))
+
+    return entradas + salidas
+
+
+def _cambios_de_lineas(cambios, detalles, eliminados, previos):
+    """Agrega a los resúmenes la diferencia de cada línea nueva, modificada o eliminada; devuelve la del importe."""
+    importe = Decimal('0.00')
+    for d in detalles:
+        prev = previos.get(d.pk) if d.pk else None
+        if prev is not None:
+            importe += cambios.linea(prev.producto_id, prev.cantidad, prev.precio_unitario, signo=-1)
+        importe += cambios.linea(d.producto_id, d.cantidad, d.precio_unitario)
+    for e in eliminados:
+        prev = previos.get(e.pk)
+        if prev is not None:
+            importe += cambios.linea(prev.producto_id, prev.cantidad, prev.precio_unitario, signo=-1)
+    return importe
+
+
+def verificar_stock(detalles):
+    """
+    Revisión previa de una venta nueva, sin escribir nada: suma lo pedido por
+    producto (incluidas líneas que repiten el mismo producto) y lo compara con
+    el stock que ya traen las instancias de producto, cargadas todas en una
+    sola consulta (ver forms.precargar_productos).
+
+    Devuelve {producto: (pedido, disponible)} de los productos que no alcanzan.
+    """
+    pedidos = {}
+    productos = {}
+    for d in detalles:
+        if d.producto_id is None or not d.cantidad:
+            continue
+        productos[d.producto.pk] = d.producto
+        pedidos[d.producto.pk] = pedidos.get(d.producto.pk, 0) + d.cantidad
+
+    return {
+        productos[pk]: (pedido, productos[pk].stock or 0)
+        for pk, pedido in pedidos.items()
+        if pedido > (productos[pk].stock or 0)
+    }
+
+
+@transaction.atomic
+def registrar_venta(venta, detalles, eliminados=()):
+    """
+    Registra una venta con todas sus líneas en una sola transacción.
+
+    - venta: encabezado (nuevo o existente) sin guardar todavía
+    - detalles: líneas nuevas o modificadas (p.ej. formset.save(commit=False))
+    - eliminados: líneas existentes que se quitan de la venta
+
+    El número de consultas no depende de la cantidad de líneas: una lectura
+    de líneas anteriores, una de stock, inserciones/actualizaciones masivas y
+    un solo cálculo del total. Si falta stock se lanza StockInsuficiente y no
+    queda nada escrito. Los resúmenes diarios se actualizan en la misma
+    transacción.
+    """
+    detalles = list(detalles)
+    eliminados = [e for e in eliminados if e.pk]
+    es_nueva = venta.pk is None
+
+    # Líneas sin precio: el de la lista de precios del cliente
+    for d in detalles:
+        if d.precio_unitario is None:
+            d.precio_unitario = precios.precio_cliente(d.producto, venta.cliente)
+
+    if es_nueva:
+        # Venta nueva: el total sale directamente de las líneas en memoria
+        venta.total = sum(
+            ((d.cantidad or 0) * (d.precio_unitario or 0) for d in detalles),
+            Decimal('0.00'),
+        )
+    # El guardado mueve el encabezado (cliente, encargado, fecha) en los
+    # resúmenes; se escribe abajo junto con las líneas
+    cambios = resumenes.Cambios(venta.fecha)
+    venta.save(resumen=cambios)
+    total_guardado = venta.total
+
+    ids_previos = [d.pk for d in detalles if d.pk] + [e.pk for e in eliminados]
+    previos = {}
+    if ids_previos:
+        previos = DetalleVenta.objects.select_related('producto').in_bulk(ids_previos)
+
+    movimientos = _efectos_de_lineas(venta, detalles, eliminados, previos)
+
+    for d in detalles:
+        d.venta = venta
+    nuevos = [d for d in detalles if d.pk is None]
+    modificados = [d for d in detalles if d.pk is not None]
+    if nuevos:
+        DetalleVenta.objects.bulk_create(nuevos)
+    if modificados:
+        DetalleVenta.objects.bulk_update(modificados, ['producto', 'cantidad', 'precio_unitario'])
+    if eliminados:
+        DetalleVenta.objects.filter(pk__in=[e.pk for e in eliminados]).delete()
+
+    registrar_movimientos(movimientos)
+
+    if not es_nueva:
+        venta.calcular_total()
+        Venta.objects.filter(pk=venta.pk).update(total=venta.total)
+        cambios.encabezado(venta.cliente_id, venta.encargado_id, 0, venta.total - total_guardado)
+
+    _cambios_de_lineas(cambios, detalles, eliminados, previos)
+    resumenes.aplicar(cambios)
+
+    return venta
+
+
+@transaction.atomic
+def anular_venta(venta):
+    """
+    Devuelve al inventario el stock de todas las líneas de la venta (sin
+    borrarla) y la descuenta de los resúmenes diarios.
+    """
+    ref_reversion = f"Reversión venta #{venta.numero_documento}"
+    detalles = list(venta.detalles.select_related('producto'))
+    registrar_movimientos(
+        (d.producto, 'ENTRADA', int(d.cantidad), ref_reversion)
+        for d in detalles
+    )
+
+    cambios = resumenes.Cambios(venta.fecha)
+    for d in detalles:
+        cambios.linea(d.producto_id, d.cantidad, d.precio_unitario, signo=-1)
+    anterior = Venta.objects.filter(pk=venta.pk).values('cliente_id', 'encargado_id', 'total').first()
+    if anterior is not None:
+        cambios.encabezado(anterior['cliente_id'], anterior['encargado_id'], -1, -anterior['total'])
+    resumenes.aplicar(cambios)
+
+
+# ======================
+# LOTES DE VENTAS (API de terminales)
+# ======================
+def _id_valido(valor):
+    """Entero desde JSON (1 o "1"); 1.5, true o texto no cuentan."""
+    try:
+        return int(str(valor))
+    except (TypeError, ValueError):
+        return None
+
+
+def _venta_desde_datos(datos, productos, clientes):
+    """
+    Arma (venta, detalles) sin guardar a partir de una venta del lote:
+    {"clave", "cliente", "comentarios", "lineas": [{"producto", "cantidad", "precio_unitario"}]}.
+    Si no se manda precio_unitario se usa el de la lista de precios del cliente.
+    Lanza ValidationError con los errores por campo.
+    """
+    errores = {}
+    venta = Venta(comentarios=datos.get('comentarios') or None)
+
+    if datos.get('cliente') not in (None, ''):
+        cliente = clientes.get(_id_valido(datos['cliente']))
+        if cliente is None:
+            errores['cliente'] = ["El cliente no existe."]
+        venta.cliente = cliente
+
+    lineas = datos.get('lineas')
+    if not isinstance(lineas, list) or not lineas:
+        errores['lineas'] = ["La venta debe tener al menos una línea."]
+        lineas = []
+
+    detalles = []
+    for i, linea in enumerate(lineas, start=1):
+        if not isinstance(linea, dict):
+            errores[f'lineas.{i}'] = ["Línea inválida."]
+            continue
+        producto = productos.get(_id_valido(linea.get('producto')))
+        cantidad = _id_valido(linea.get('cantidad'))
+        precio = linea.get('precio_unitario')
+        if precio is None and producto is not None:
+            precio = precios.precio_cliente(producto, venta.cliente)
+        try:
+            precio = Decimal(str(precio))
+        except InvalidOperation:
+            precio = None
+        if precio is not None and (not precio.is_finite() or precio < 0):
+            precio = None
+
+        errores_linea = {}
+        if producto is None:
+            errores_linea[f'lineas.{i}.producto'] = ["El producto no existe."]
+        if cantidad is None or cantidad <= 0:
+            errores_linea[f'lineas.{i}.cantidad'] = ["La cantidad debe ser un entero mayor a cero."]
+        if precio is None:
+            errores_linea[f'lineas.{i}.precio_unitario'] = ["Precio inválido."]
+        if errores_linea:
+            errores.update(errores_linea)
+            continue
+        detalles.append(DetalleVenta(
+            producto=producto, cantidad=cantidad, precio_unitario=precio.quantize(Decimal('0.01')),
+        ))
+
+    if errores:
+        raise ValidationError(errores)
+    return venta, detalles
+
+
+def _resultado(venta, estado):
+    return {
+        'estado': estado,
+        'id': venta.pk,
+        'numero_documento': venta.numero_documento,
+        'total': str(venta.total),
+    }
+
+
+@transaction.atomic
+def registrar_lote(ventas, encargado=None):
+    """
+    Registra un lote de ventas enviado por una terminal (p.ej. al recuperar la
+    conexión) en una sola transacción, con un punto de guardado por venta:
+    una venta rechazada no deshace las demás.
+
+    Cada venta trae una "clave" de idempotencia generada por la terminal. Si
+    la clave ya se registró (en un envío anterior o antes en el mismo lote) no
+    se vuelve a crear y se devuelve la venta existente, así reenviar un lote
+    es seguro. Devuelve un resultado por venta, en el mismo orden:
+    {"clave", "estado": "creada" | "duplicada" | "error", ...}.
+    """
+    ventas = list(ventas)
+    claves = [str(d.get('clave') or '').strip() if isinstance(d, dict) else '' for d in ventas]
+
+    # Todo lo que se va a consultar, en tres lecturas para el lote completo
+    existentes = {
+        v.clave_idempotencia: v
+        for v in Venta.objects.filter(clave_idempotencia__in=[c for c in claves if c])
+    }
+    ids_productos, ids_clientes = set(), set()
+    for datos in ventas:
+        if not isinstance(datos, dict):
+            continue
+        ids_clientes.add(_id_valido(datos.get('cliente')))
+        for linea in datos.get('lineas') or []:
+            if isinstance(linea, dict):
+                ids_productos.add(_id_valido(linea.get('producto')))
+    productos = Producto.objects.in_bulk([i for i in ids_productos if i is not None])
+    clientes = Cliente.objects.in_bulk([i for i in ids_clientes if i is not None])
+
+    resultados = []
+    for clave, datos in zip(claves, ventas):
+        if not clave:
+            resultados.append({'clave': clave, 'estado': 'error', 'errores': {'clave': ["Falta la clave de idempotencia."]}})
+            continue
+        if len(clave) > Venta._meta.get_field('clave_idempotencia').max_length:
+            resultados.append({'clave': clave, 'estado': 'error', 'errores': {'clave': ["Clave demasiado larga."]}})
+            continue
+        if clave in existentes:
+            resultados.append({'clave': clave, **_resultado(existentes[clave], 'duplicada')})
+            continue
+
+        try:
+            venta, detalles = _venta_desde_datos(datos, productos, clientes)
+            venta.clave_idempotencia = clave
+            venta.encargado = encargado
+            registrar_venta(venta, detalles)  # atomic anidado = punto de guardado
+        except StockInsuficiente as e:
+            resultados.append({'clave': clave, 'estado': 'error', 'producto': e.producto.pk, 'errores': e.message_dict})
+        except ValidationError as e:
+            resultados.append({'clave': clave, 'estado': 'error', 'errores': e.message_dict})
+        except IntegrityError:
+            # Otra terminal (o un reintento simultáneo) registró la misma clave
+            previa = Venta.objects.filter(clave_idempotencia=clave).first()
+            if previa is None:
+                raise
+            existentes[clave] = previa
+            resultados.append({'clave': clave, **_resultado(previa, 'duplicada')})
+        else:
+            existentes[clave] = venta
+            resultados.append({'clave': clave, **_resultado(venta, 'creada')})
+    return resultados
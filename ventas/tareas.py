@@ -0,0 +1,19 @@
+from tareas.utils import tarea
+from . import exportacion, resumenes
+
+
+@tarea('ventas.exportar_pdf', "Comprobantes de ventas en un solo PDF")
+def exportar_pdf(tarea, ids, motor=None):
+    # Fuera de la petición web: aquí sí se renderiza con varios procesos
+    nombre = "comprobantes.pdf" if exportacion.volumenes(len(ids)) == 1 else "comprobantes.zip"
+    exportacion.pdf_unido(
+        ids, tarea.archivo_resultado(nombre), procesos=exportacion.PROCESOS_EXPORTACION, motor=motor,
+        avance=lambda hechos: tarea.avanzar(99 * hechos // len(ids), f"{hechos} de {len(ids)} comprobantes"),
+    )
+    return f"{len(ids)} comprobantes"
+
+
+@tarea('ventas.reconstruir_resumenes', "Reconstruir resúmenes de ventas", manual=True)
+def reconstruir_resumenes(tarea):
+    resumen = resumenes.reconstruir()
+    return " · ".join(f"{tabla}: {filas} filas" for tabla, filas in resumen.items())
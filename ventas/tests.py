@@ -1,3 +1,223 @@
-from django.test import TestCase
+import io
+import json
+import zipfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.db import transaction
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from pypdf import PdfReader
+from accounts.models import TokenTerminal
+from clientes.models import Cliente
+from kardex.models import MovimientoInventario
+from kardex.utils import StockInsuficiente
+from productos.models import Producto
+from proyectof.testing import PruebaVistas, registrar_consultas
+from secuencias import utils as utils_secuencias
+from . import exportacion, resumenes
+from .models import DetalleVenta, ResumenVentaCliente, ResumenVentaEncargado, ResumenVentaProducto, Venta
+from .services import registrar_venta
+
+# Sentencias de registrar_venta con cualquier número de líneas, contando los
+# SAVEPOINT (ver el comando benchmark_ventas)
+PRESUPUESTO_REGISTRO = 26
+
+
+class PresupuestoVistasTests(PruebaVistas):
+    def test_inicio(self):
+        self.assertPresupuesto(8, reverse('home'))
+
+    def test_listado(self):
+        self.assertPresupuesto(3, reverse('ventas:ventas_list'))
+
+    def test_nueva(self):
+        self.assertPresupuesto(5, reverse('ventas:ventas_create'))
+
+    def test_editar(self):
+        self.assertPresupuesto(7, reverse('ventas:ventas_edit', args=[self.datos['ventas'][0].pk]))
+
+
+class ResumenesTests(PruebaVistas):
+    def _resumenes(self):
+        """Filas de los tres resúmenes sin las que quedaron en cero."""
+        return (
+            set(ResumenVentaProducto.objects.exclude(cantidad=0, importe=0).values_list('fecha', 'producto', 'cantidad', 'importe')),
+            set(ResumenVentaCliente.objects.exclude(ventas=0, importe=0).values_list('fecha', 'cliente', 'ventas', 'importe')),
+            set(ResumenVentaEncargado.objects.exclude(ventas=0, importe=0).values_list('fecha', 'encargado', 'ventas', 'importe')),
+        )
+
+    def assertCuadran(self):
+        """Los resúmenes mantenidos al guardar son los que se reconstruyen desde las ventas."""
+        mantenidos = self._resumenes()
+        with transaction.atomic():
+            resumenes.reconstruir()
+            self.assertEqual(mantenidos, self._resumenes())
+            transaction.set_rollback(True)
+
+    def test_guardado_directo(self):
+        cliente_a, cliente_b = (Cliente.objects.create(nombre=n, nit=n) for n in ('A-1', 'B-1'))
+        venta = Venta(cliente=cliente_a, encargado=self.datos['usuario'])
+        venta.save()
+        DetalleVenta(venta=venta, producto=self.datos['productos'][0], cantidad=2, precio_unitario=Decimal('10.00')).save()
+        self.assertEqual(
+            ResumenVentaCliente.objects.filter(cliente=cliente_a).values_list('ventas', 'importe').get(),
+            (1, Decimal('20.00')),
+        )
+        self.assertCuadran()
+
+        venta.cliente = cliente_b
+        venta.save()
+        self.assertCuadran()
+
+        venta.fecha = venta.fecha - timedelta(days=3)
+        venta.save()
+        self.assertCuadran()
+
+        venta.delete()
+        self.assertCuadran()
+        self.assertFalse(ResumenVentaCliente.objects.filter(cliente__in=[cliente_a, cliente_b]).exclude(ventas=0, importe=0))
+
+    def test_edicion_con_servicio(self):
+        venta = self.datos['ventas'][0]
+        venta.refresh_from_db()
+        venta.cliente = self.datos['clientes'][5]
+        detalle = venta.detalles.first()
+        detalle.cantidad += 1
+        registrar_venta(venta, [detalle])
+        self.assertCuadran()
+
+    def test_ventas_sin_cliente_en_una_sola_fila(self):
+        fecha = timezone.localdate() + timedelta(days=30)
+        for importe in (Decimal('15.00'), Decimal('25.00')):
+            cambios = resumenes.Cambios(fecha)
+            cambios.encabezado(None, None, 1, importe)
+            resumenes.aplicar(cambios)
+        for modelo in (ResumenVentaCliente, ResumenVentaEncargado):
+            self.assertEqual(
+                list(modelo.objects.filter(fecha=fecha).values_list('ventas', 'importe', 'sin_asignar')),
+                [(2, Decimal('40.00'), True)],
+            )
+
+    def test_sin_stock_no_guarda_la_linea(self):
+        venta = self.datos['ventas'][0]
+        venta.refresh_from_db()
+        producto = Producto.objects.get(pk=self.datos['productos'][0].pk)
+        # Otra venta se llevó el stock después de leer el producto
+        Producto.objects.filter(pk=producto.pk).update(stock=1)
+        lineas, total = venta.detalles.count(), venta.total
+        movimientos = MovimientoInventario.objects.count()
+
+        with self.assertRaises(StockInsuficiente):
+            DetalleVenta(venta=venta, producto=producto, cantidad=5, precio_unitario=Decimal('10.00')).save()
+        venta.refresh_from_db()
+        self.assertEqual((venta.detalles.count(), venta.total), (lineas, total))
+        self.assertEqual(MovimientoInventario.objects.count(), movimientos)
+        self.assertCuadran()
+
+
+class RegistroVentaTests(PruebaVistas):
+    def datos_venta(self, productos, cantidad=1):
+        """POST de ventas_create con una línea por producto."""
+        datos = {
+            'cliente': self.datos['clientes'][0].pk, 'encargado': '', 'comentarios': '',
+            'detalles-TOTAL_FORMS': len(productos), 'detalles-INITIAL_FORMS': 0,
+            'detalles-MIN_NUM_FORMS': 0, 'detalles-MAX_NUM_FORMS': 1000,
+        }
+        for i, producto in enumerate(productos):
+            datos.update({f'detalles-{i}-producto': producto.pk, f'detalles-{i}-cantidad': cantidad,
+                          f'detalles-{i}-precio_unitario': ''})
+        return datos
+
+    def rechazo_en_el_registro(self, lineas):
+        """Consultas de una venta que pasa la revisión de stock pero la pierde al registrarse."""
+        productos = self.datos['productos'][:lineas]
+        rechazo = StockInsuficiente(productos[-1], 0)
+        with mock.patch('ventas.views.registrar_venta', side_effect=rechazo), registrar_consultas() as registro:
+            respuesta = self.client.post(reverse('ventas:ventas_create'), self.datos_venta(productos))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn("Stock insuficiente", respuesta.context['formset'].forms[-1].errors['cantidad'][0])
+        self.assertIs(respuesta.context['formset'].instance, respuesta.context['form'].instance)
+        return len(registro)
+
+    def test_registro_con_costo_fijo(self):
+        utils_secuencias.olvidar_bloques()
+        self.addCleanup(utils_secuencias.olvidar_bloques)
+        productos = self.datos['productos']
+
+        def registrar(lineas):
+            detalles = [DetalleVenta(producto=p, cantidad=1, precio_unitario=p.precio) for p in productos[:lineas]]
+            with registrar_consultas() as registro:
+                registrar_venta(Venta(comentarios="prueba"), detalles)
+            return len(registro)
+
+        # Bloques de secuencia grandes: la reserva solo cae en la primera venta
+        with mock.patch.object(utils_secuencias, 'BLOQUE_POR_DEFECTO', 1000):
+            primera = registrar(1)
+            consultas = [registrar(n) for n in (1, 10, len(productos))]
+        self.assertGreater(primera, consultas[0])
+        self.assertEqual(consultas, [consultas[0]] * 3)
+        self.assertLessEqual(consultas[0], PRESUPUESTO_REGISTRO)
+
+    def test_rechazo_sin_consultas_por_linea(self):
+        self.assertEqual(self.rechazo_en_el_registro(2), self.rechazo_en_el_registro(10))
+
+
+class ExportacionTests(PruebaVistas):
+    def test_pdf_unido_por_tramos(self):
+        ids = [v.pk for v in self.datos['ventas'][:5]]
+        with mock.patch.object(exportacion, 'COMPROBANTES_POR_PDF', 2):
+            destino = io.BytesIO()
+            exportacion.pdf_unido(ids, destino, motor='reportlab')
+        with zipfile.ZipFile(destino) as zf:
+            nombres = zf.namelist()
+            paginas = [len(PdfReader(io.BytesIO(zf.read(n))).pages) for n in nombres]
+        self.assertEqual(nombres, ["comprobantes_1.pdf", "comprobantes_2.pdf", "comprobantes_3.pdf"])
+        self.assertEqual(paginas, [2, 2, 1])
+
+    def test_zip_en_la_peticion_sin_procesos(self):
+        with mock.patch.object(exportacion.multiprocessing, 'get_context') as contexto:
+            respuesta = self.client.get(reverse('ventas:ventas_exportar'), {'motor': 'reportlab'})
+            contenido = b''.join(respuesta.streaming_content)
+        contexto.assert_not_called()
+        with zipfile.ZipFile(io.BytesIO(contenido)) as zf:
+            self.assertEqual(len(zf.namelist()), Venta.objects.count())
+
+
+class ApiLoteTests(PruebaVistas):
+    def setUp(self):
+        # Como una terminal real: sin la excepción CSRF del cliente de pruebas
+        self.client = Client(enforce_csrf_checks=True)
+        self.url = reverse('ventas:ventas_api_lote')
+        producto = self.datos['productos'][0]
+        self.cuerpo = json.dumps({'ventas': [
+            {'clave': 'terminal-1', 'lineas': [{'producto': producto.pk, 'cantidad': 1}]},
+        ]})
+
+    def enviar(self, **cabeceras):
+        return self.client.post(self.url, self.cuerpo, content_type='application/json', headers=cabeceras)
+
+    def test_token_de_terminal(self):
+        _, clave = TokenTerminal.emitir(self.datos['usuario'], "Caja 1")
+        respuesta = self.enviar(Authorization=f"Token {clave}")
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['resultados'][0]['estado'], 'creada')
+        self.assertEqual(Venta.objects.get(clave_idempotencia='terminal-1').encargado, self.datos['usuario'])
+
+    def test_token_invalido(self):
+        self.assertEqual(self.enviar(Authorization="Token no-existe").status_code, 401)
+        self.assertEqual(self.enviar().status_code, 401)
+
+    def test_sesion_sin_csrf(self):
+        self.client.force_login(self.datos['usuario'])
+        self.assertEqual(self.enviar().status_code, 403)
+        self.assertFalse(Venta.objects.filter(clave_idempotencia='terminal-1').exists())
+
+    def test_sesion_con_csrf(self):
+        self.client.force_login(self.datos['usuario'])
+        self.client.get(reverse('ventas:ventas_create'))
+        token = self.client.cookies[settings.CSRF_COOKIE_NAME].value
+        self.assertEqual(self.enviar(**{'X-CSRFToken': token}).status_code, 200)
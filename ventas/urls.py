@@ -5,9 +5,11 @@ app_name = 'ventas'
 
 urlpatterns = [
     path('', views.ventas_list, name='ventas_list'),
+    path('exportar/', views.ventas_exportar, name='ventas_exportar'),
     path('nueva/', views.ventas_create, name='ventas_create'),
     path('<int:pk>/editar/', views.ventas_edit, name='ventas_edit'),
     path('<int:pk>/eliminar/', views.ventas_delete, name='ventas_delete'),
     path('<int:pk>/pdf/', views.venta_pdf, name='venta_pdf'),
+    path('api/lote/', views.ventas_api_lote, name='ventas_api_lote'),
     path('obtener_precio_producto/', views.obtener_precio_producto, name='obtener_precio_producto'),
 ]
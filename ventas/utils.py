@@ -1,8 +1,23 @@
 # proyectof/ventas/utils.py
+from datetime import timedelta
 from io import BytesIO
 from django.http import HttpResponse
+from django.utils.dateparse import parse_date
 from django.template.loader import render_to_string
 from xhtml2pdf import pisa
+from busqueda import utils as busqueda
+
+
+def html_a_pdf(template_src: str, context: dict):
+    """
+    Renderiza una plantilla HTML a PDF con xhtml2pdf.
+    Devuelve (bytes_del_pdf, html); bytes_del_pdf es None si hubo error.
+    """
+    html = render_to_string(template_src, context)
+    result = BytesIO()
+    pdf = pisa.CreatePDF(src=html, dest=result, encoding='utf-8')
+    return (None if pdf.err else result.getvalue()), html
+
 
 def render_to_pdf(template_src: str, context: dict, *, download: bool = False, filename: str = "comprobante.pdf"):
     """
@@ -12,14 +27,34 @@ def render_to_pdf(template_src: str, context: dict, *, download: bool = False, f
     - download: si True, fuerza descarga; si False, lo abre en el navegador
     - filename: nombre sugerido del archivo
     """
-    html = render_to_string(template_src, context)
-    result = BytesIO()
-    pdf = pisa.CreatePDF(src=html, dest=result, encoding='utf-8')
+    contenido, html = html_a_pdf(template_src, context)
 
-    if not pdf.err:
-        response = HttpResponse(result.getvalue(), content_type='application/pdf')
+    if contenido is not None:
+        response = HttpResponse(contenido, content_type='application/pdf')
         dispo = 'attachment' if download else 'inline'
         response['Content-Disposition'] = f'{dispo}; filename="{filename}"'
         return response
     # Si hay error, devolver el HTML para depurar
     return HttpResponse("Error generando PDF.<br><pre>" + html + "</pre>")
+
+
+def filtrar_ventas(queryset, params):
+    """
+    Aplica los filtros del listado de ventas (q, fecha_inicio, fecha_fin, cliente)
+    a partir de un dict tipo request.GET. Lo usan la lista y la exportación masiva.
+    """
+    query = (params.get('q') or '').strip()
+    if query:
+        queryset = busqueda.filtrar(queryset, query, ['numero_documento'], relaciones={'cliente': ['nombre']})
+
+    fi = parse_date(params.get('fecha_inicio') or '')
+    if fi:
+        queryset = queryset.filter(fecha__gte=fi)
+    ff = parse_date(params.get('fecha_fin') or '')
+    if ff:
+        queryset = queryset.filter(fecha__lt=ff + timedelta(days=1))
+
+    cliente = params.get('cliente')
+    if cliente and str(cliente).isdigit():
+        queryset = queryset.filter(cliente_id=int(cliente))
+    return queryset
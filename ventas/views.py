@@ -1,41 +1,85 @@
+import json
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.forms import inlineformset_factory
+from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.contrib import messages
 from django.http import JsonResponse
 from django.core.exceptions import ValidationError
+from clientes.models import Cliente
 from productos.models import Producto
+from productos import precios
 from .models import Venta, DetalleVenta
-from .forms import VentaForm, DetalleVentaForm
+from .forms import VentaForm, DetalleVentaForm, OpcionesCompartidasFormSet, precargar_productos
 from django.utils.timezone import now
-from .utils import render_to_pdf
+from .utils import render_to_pdf, filtrar_ventas
+from . import exportacion
+from . import comprobantes
+from . import services
+from .services import registrar_venta, verificar_stock
+from kardex.utils import StockInsuficiente
 from django.db import models 
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseNotModified, FileResponse, StreamingHttpResponse
+from django.utils.http import parse_etags
 from django.template.loader import render_to_string
 from django.db.models import Q
+from proyectof.paginacion import paginar, pide_json
+from tareas.utils import encolar
+from accounts.utils import rechazo_csrf, usuario_de_token
 
 def ventas_list(request):
     query = request.GET.get('q', '').strip()
-    ventas = Venta.objects.all().order_by('-fecha', '-id')
-
-    if query:
-        ventas = ventas.filter(
-            Q(numero_documento__icontains=query) |
-            Q(cliente__nombre__icontains=query)
-        )
+    ventas = filtrar_ventas(Venta.objects.select_related('cliente'), request.GET)
+    pagina = paginar(ventas, ('-fecha', '-id'), request.GET)
+
+    if pide_json(request):
+        return pagina.como_json(lambda v: {
+            'id': v.id,
+            'fecha': v.fecha,
+            'numero_documento': v.numero_documento,
+            'cliente': str(v.cliente) if v.cliente_id else None,
+            'total': v.total,
+        })
 
     return render(request, 'ventas/ventas_list.html', {
-        'ventas': ventas,
-        'query': query
+        'ventas': pagina,
+        'pagina': pagina,
+        'query': query,
+        'fecha_inicio': request.GET.get('fecha_inicio', ''),
+        'fecha_fin': request.GET.get('fecha_fin', ''),
+        'filtros': request.GET.urlencode(),
     })
 
 
+# ======================
+# EXPORTAR COMPROBANTES (ZIP / PDF UNIDO)
+# ======================
+def ventas_exportar(request):
+    """Exporta los comprobantes de las ventas filtradas como ZIP (por defecto) o un solo PDF."""
+    ventas = filtrar_ventas(Venta.objects.all(), request.GET).order_by('fecha', 'id')
+    ids = list(ventas.values_list('id', flat=True))
+    if not ids:
+        messages.error(request, "No hay ventas con esos filtros para exportar.")
+        return redirect('ventas:ventas_list')
+
+    motor = comprobantes.elegir_motor(request.GET.get('motor'))
+    if request.GET.get('formato') == 'pdf':
+        # Unir los PDF lleva tiempo: lo hace una tarea en segundo plano (ver ventas/tareas.py)
+        tarea = encolar('ventas.exportar_pdf', usuario=request.user, ids=ids, motor=motor)
+        return redirect('tareas:tarea_detail', pk=tarea.pk)
+
+    response = StreamingHttpResponse(exportacion.zip_en_stream(ids, motor=motor), content_type='application/zip')
+    response['Content-Disposition'] = 'attachment; filename="comprobantes.zip"'
+    return response
+
+
 # ======================
 # CREAR NUEVA VENTA
 # ======================
 def ventas_create(request):
     DetalleFormSet = inlineformset_factory(
-        Venta, DetalleVenta, form=DetalleVentaForm, extra=1, can_delete=True
+        Venta, DetalleVenta, form=DetalleVentaForm, formset=OpcionesCompartidasFormSet, extra=1, can_delete=True
     )
 
     if request.method == 'POST':
@@ -45,67 +89,78 @@ def ventas_create(request):
             venta = form.save(commit=False)
             if not venta.encargado and request.user.is_authenticated:
                 venta.encargado = request.user
-            venta.save()  # guardamos primero la venta (para tener ID)
 
-            formset = DetalleFormSet(request.POST, instance=venta)
+            # Productos (con su stock) de todas las líneas en una sola consulta
+            productos = precargar_productos(request.POST)
+            formset = DetalleFormSet(request.POST, instance=venta, form_kwargs={'productos': productos})
 
             if formset.is_valid():
-                try:
-                    detalles_validos = 0
-                    detalles = formset.save(commit=False)
-
-                    for d in detalles:
-                        d.venta = venta
-                        try:
-                            d.save()  # valida stock dentro del modelo
-                            detalles_validos += 1
-                        except ValidationError as e:
-                            producto_nombre = (
-                                d.producto.nombre if hasattr(d.producto, 'nombre') else str(d.producto)
-                            )
-                            error_texto = next(iter(e.message_dict.get('cantidad', e.messages)), str(e))
-                            messages.error(
-                                request,
-                                f" Stock insuficiente para '{producto_nombre}': {error_texto}",
-                            )
-                            venta.delete()
-                            formset = DetalleFormSet(request.POST)
-                            return render(
-                                request,
-                                'ventas/ventas_create.html',
-                                {'form': form, 'formset': formset},
-                            )
-
-                    for obj in formset.deleted_objects:
-                        obj.delete()
-
-                    if detalles_validos == 0:
-                        venta.delete()
-                        messages.error(request, " La venta debe tener al menos un producto válido.")
-                        return render(
+                detalles = formset.save(commit=False)
+
+                if not detalles:
+                    messages.error(request, " La venta debe tener al menos un producto válido.")
+                    return render(
+                        request,
+                        'ventas/ventas_create.html',
+                        {'form': form, 'formset': formset},
+                    )
+
+                # Revisión previa: si algo no alcanza, no se escribe nada
+                faltantes = verificar_stock(detalles)
+                if faltantes:
+                    for f in formset.forms:
+                        producto = f.cleaned_data.get('producto') if f.cleaned_data else None
+                        if producto in faltantes:
+                            pedido, disponible = faltantes[producto]
+                            f.add_error('cantidad', f"Stock insuficiente. Solo hay {disponible} unidades disponibles.")
+                    for producto, (pedido, disponible) in faltantes.items():
+                        messages.error(
                             request,
-                            'ventas/ventas_create.html',
-                            {'form': form, 'formset': formset},
+                            f" Stock insuficiente para '{producto.nombre}': se piden {pedido} "
+                            f"y solo hay {disponible} unidades disponibles.",
                         )
-
-                    messages.success(
+                    return render(
                         request,
-                        f"Venta #{venta.numero_documento} creada correctamente.",
+                        'ventas/ventas_create.html',
+                        {'form': form, 'formset': formset},
                     )
-                    return redirect('ventas:ventas_list')
 
+                try:
+                    # Encabezado, líneas, Kardex y total en una sola transacción
+                    registrar_venta(venta, detalles)
+                except StockInsuficiente as e:
+                    # Otra venta se llevó el stock entre la revisión y el registro
+                    for f in formset.forms:
+                        if f.cleaned_data and f.cleaned_data.get('producto') == e.producto:
+                            f.add_error('cantidad', e.message_dict['cantidad'][0])
+                    messages.error(
+                        request,
+                        f" Stock insuficiente para '{e.producto.nombre}': {e.message_dict['cantidad'][0]}",
+                    )
+                    return render(
+                        request,
+                        'ventas/ventas_create.html',
+                        {'form': form, 'formset': formset},
+                    )
                 except Exception as e:
-                    venta.delete()
                     messages.error(request, f" Error inesperado: {e}")
-                    formset = DetalleFormSet(request.POST)
                     return render(
                         request,
                         'ventas/ventas_create.html',
                         {'form': form, 'formset': formset},
                     )
 
+                if getattr(settings, 'COMPROBANTES_PRERENDER', False):
+                    # Deja el comprobante listo en caché para la primera impresión
+                    comprobantes.obtener_comprobante(venta)
+
+                messages.success(
+                    request,
+                    f"Venta #{venta.numero_documento} creada correctamente.",
+                )
+                return redirect('ventas:ventas_list')
+
             else:
-                venta.delete()
                 errores_detalle = []
                 for idx, error in enumerate(formset.errors, start=1):
                     if error:
@@ -140,22 +195,35 @@ def ventas_create(request):
 
 
 def venta_pdf(request, pk):
-    venta = get_object_or_404(
-        Venta.objects.select_related('encargado').prefetch_related('detalles__producto'),
-        pk=pk
-    )
-    detalles = venta.detalles.all().order_by('id')
+    venta = get_object_or_404(Venta.objects.only('id', 'numero_documento', 'version'), pk=pk)
 
     # Si agregas ?download=1 en la URL, forzamos descarga
     download = request.GET.get('download') == '1'
-
-    context = {
-        'venta': venta,
-        'detalles': detalles,
-        'now': now(),
-    }
     filename = f"venta_{venta.numero_documento}.pdf"
-    return render_to_pdf('ventas/pdf/venta_comprobante.html', context, download=download, filename=filename)
+
+    # ?motor=reportlab|html elige el generador; por defecto COMPROBANTES_MOTOR
+    motor = comprobantes.elegir_motor(request.GET.get('motor'))
+
+    # El navegador ya tiene esta versión del comprobante
+    etiqueta = comprobantes.etag(venta, motor)
+    if etiqueta in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+        response['ETag'] = etiqueta
+        return response
+
+    ruta = comprobantes.obtener_comprobante(venta, motor)
+    if ruta is None:
+        # Falló la generación: mismo comportamiento que antes (HTML para depurar)
+        return render_to_pdf(
+            comprobantes.TEMPLATE_COMPROBANTE, comprobantes.contexto_comprobante(venta),
+            download=download, filename=filename,
+        )
+
+    response = FileResponse(open(ruta, 'rb'), content_type='application/pdf',
+                            as_attachment=download, filename=filename)
+    response['ETag'] = etiqueta
+    response['Cache-Control'] = 'private, no-cache'
+    return response
 
 
 
@@ -165,7 +233,7 @@ def venta_pdf(request, pk):
 def ventas_edit(request, pk):
     venta = get_object_or_404(Venta, pk=pk)
     DetalleFormSet = inlineformset_factory(
-        Venta, DetalleVenta, form=DetalleVentaForm, extra=0, can_delete=True
+        Venta, DetalleVenta, form=DetalleVentaForm, formset=OpcionesCompartidasFormSet, extra=0, can_delete=True
     )
 
     if request.method == 'POST':
@@ -173,47 +241,36 @@ def ventas_edit(request, pk):
         formset = DetalleFormSet(request.POST, instance=venta)
 
         if form.is_valid() and formset.is_valid():
+            lineas_restantes = [
+                f for f in formset.forms
+                if f.cleaned_data and not f.cleaned_data.get('DELETE')
+            ]
+            if not lineas_restantes:
+                messages.error(request, " La venta debe tener al menos un producto válido.")
+                return render(
+                    request,
+                    'ventas/ventas_edit.html',
+                    {'form': form, 'formset': formset, 'venta': venta},
+                )
+
             try:
                 venta = form.save(commit=False)
-                venta.save()
-
-                detalles_validos = 0
                 detalles = formset.save(commit=False)
-
-                for d in detalles:
-                    d.venta = venta
-                    try:
-                        d.save()  # valida stock dentro del modelo
-                        detalles_validos += 1
-                    except ValidationError as e:
-                        producto_nombre = (
-                            d.producto.nombre if hasattr(d.producto, 'nombre') else str(d.producto)
-                        )
-                        error_texto = next(iter(e.message_dict.get('cantidad', e.messages)), str(e))
-                        messages.error(
-                            request,
-                            f" Stock insuficiente para '{producto_nombre}': {error_texto}",
-                        )
-                        return render(
-                            request,
-                            'ventas/ventas_edit.html',
-                            {'form': form, 'formset': formset, 'venta': venta},
-                        )
-
-                for obj in formset.deleted_objects:
-                    obj.delete()
-
-                if detalles_validos == 0:
-                    messages.error(request, " La venta debe tener al menos un producto válido.")
-                    return render(
-                        request,
-                        'ventas/ventas_edit.html',
-                        {'form': form, 'formset': formset, 'venta': venta},
-                    )
+                registrar_venta(venta, detalles, formset.deleted_objects)
 
                 messages.success(request, f" Venta #{venta.numero_documento} actualizada correctamente.")
                 return redirect('ventas:ventas_list')
 
+            except StockInsuficiente as e:
+                messages.error(
+                    request,
+                    f" Stock insuficiente para '{e.producto.nombre}': {e.message_dict['cantidad'][0]}",
+                )
+                return render(
+                    request,
+                    'ventas/ventas_edit.html',
+                    {'form': form, 'formset': formset, 'venta': venta},
+                )
             except ValidationError as e:
                 error_msg = "; ".join([f"{k}: {', '.join(v)}" for k, v in e.message_dict.items()])
                 messages.error(request, f" Error al actualizar la venta: {error_msg}")
@@ -247,14 +304,62 @@ def ventas_delete(request, pk):
     return redirect('ventas:ventas_list')
 
 
+# ======================
+# API: LOTE DE VENTAS DESDE TERMINALES
+# ======================
+@csrf_exempt
+@require_POST
+def ventas_api_lote(request):
+    """
+    Recibe {"ventas": [{"clave", "cliente", "comentarios", "lineas": [...]}, ...]}
+    y las registra en una sola transacción (ver services.registrar_lote).
+    Responde {"resultados": [...]} con el estado de cada venta en el mismo orden.
+
+    Las terminales se autentican con "Authorization: Token <clave>" (comando
+    crear_token_terminal) y no pasan por CSRF. Sin token vale la sesión del
+    navegador, con su token CSRF como cualquier formulario.
+    """
+    try:
+        usuario = usuario_de_token(request)
+    except PermissionError as e:
+        return JsonResponse({'error': str(e)}, status=401)
+    if usuario is None:
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': "Inicia sesión o envía el token de la terminal."}, status=401)
+        rechazo = rechazo_csrf(request)
+        if rechazo is not None:
+            return rechazo
+        usuario = request.user
+    try:
+        datos = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': "El cuerpo no es JSON válido."}, status=400)
+
+    ventas = datos.get('ventas') if isinstance(datos, dict) else None
+    if not isinstance(ventas, list) or not ventas:
+        return JsonResponse({'error': "Se esperaba una lista no vacía en \"ventas\"."}, status=400)
+    if len(ventas) > services.LOTE_MAXIMO:
+        return JsonResponse({'error': f"Máximo {services.LOTE_MAXIMO} ventas por lote."}, status=400)
+
+    resultados = services.registrar_lote(ventas, encargado=usuario)
+    return JsonResponse({'resultados': resultados})
+
+
 # ======================
 # OBTENER PRECIO DE PRODUCTO
 # ======================
 def obtener_precio_producto(request):
-    """Devuelve el precio unitario del producto seleccionado."""
+    """
+    Devuelve el precio unitario del producto seleccionado; con cliente_id,
+    el de la lista de precios de su tipo (productos/precios.py).
+    """
     producto_id = request.GET.get('producto_id')
+    cliente_id = request.GET.get('cliente_id')
     try:
-        producto = Producto.objects.get(id=producto_id)
-        return JsonResponse({'precio': float(producto.precio)})
-    except Producto.DoesNotExist:
+        producto = Producto.objects.only('id', 'precio').get(id=producto_id)
+    except (Producto.DoesNotExist, ValueError):
         return JsonResponse({'precio': 0})
+    tipo = None
+    if cliente_id and cliente_id.isdigit():
+        tipo = Cliente.objects.filter(pk=cliente_id).values_list('tipo', flat=True).first()
+    return JsonResponse({'precio': float(precios.precio_para(producto, tipo))})